@@ -0,0 +1,219 @@
+import asyncio
+import importlib.util
+import time
+import httpx
+import pandas as pd
+from config import Config
+from metrics import metrics
+from supabase_manager import SupabaseManager
+
+class AsyncSupabaseManager:
+    """
+    Async counterpart of SupabaseManager with the same methods (awaitable).
+    Talks to the Supabase REST API (PostgREST) through one shared
+    httpx.AsyncClient, so every call reuses the same connection pool
+    (HTTP/2 when the `h2` package is installed) and independent reads can
+    run concurrently, e.g. with asyncio.gather().
+    Use it as `async with AsyncSupabaseManager() as mgr:` or call aclose().
+    Reads log failures and return an empty result, or re-raise them with
+    raise_errors=True (the API server's caches, which must not keep a failed load).
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport = None):
+        self.client: httpx.AsyncClient = None
+
+        if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
+            print("⚠️ Warning: SUPABASE_URL or SUPABASE_KEY not set in .env")
+            return
+
+        self.client = httpx.AsyncClient(
+            base_url=f"{Config.SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": Config.SUPABASE_KEY,
+                "Authorization": f"Bearer {Config.SUPABASE_KEY}",
+            },
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=Config.SUPABASE_MAX_CONNECTIONS,
+                                max_keepalive_connections=Config.SUPABASE_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            transport=transport,
+        )
+        # Caps in-flight requests, e.g. the analysis_results chunks of one save
+        self.semaphore = asyncio.Semaphore(Config.SUPABASE_MAX_CONNECTIONS)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self.client:
+            await self.client.aclose()
+
+    async def _select(self, table: str, params: dict) -> list:
+        metrics.inc("supabase_requests", table=table, method="select")
+        async with self.semaphore:
+            response = await self.client.get(f"/{table}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _upsert(self, table: str, rows: list, on_conflict: str):
+        metrics.inc("supabase_requests", table=table, method="upsert")
+        async with self.semaphore:
+            response = await self.client.post(
+                f"/{table}", params={"on_conflict": on_conflict}, json=rows,
+                headers={"Prefer": "resolution=merge-duplicates,return=minimal"})
+        response.raise_for_status()
+
+    async def fetch_stock_list(self) -> list:
+        """Enabled stock codes from 'stocks', e.g. ['2330', '2317']."""
+        if not self.client:
+            return []
+
+        try:
+            data = await self._select('stocks', {'select': 'code', 'enabled': 'eq.true'})
+            enabled_stocks = [item['code'] for item in data]
+            print(f"✅ Fetched {len(enabled_stocks)} enabled stocks from Supabase.")
+            return enabled_stocks
+        except Exception as e:
+            print(f"❌ Failed to fetch stock list: {e}")
+            return []
+
+    async def fetch_all_stocks(self, raise_errors: bool = False) -> list:
+        """ALL stocks (including disabled) for the Settings page, as SupabaseManager.fetch_all_stocks."""
+        if not self.client:
+            return []
+
+        try:
+            data = await self._select('stocks', {'select': '*', 'order': 'code.asc'})
+            return [SupabaseManager._stock_row(item) for item in data]
+        except Exception as e:
+            print(f"❌ Failed to fetch all stocks: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    async def fetch_strategy_config(self) -> dict:
+        """'strategy_params' as a simple dict: { 'MA_SHORT_DAYS': 10, ... }"""
+        if not self.client:
+            return {}
+
+        try:
+            data = await self._select('strategy_params', {'select': 'param_key,param_value'})
+            return {item['param_key']: item['param_value'] for item in data}
+        except Exception as e:
+            print(f"❌ Failed to fetch strategy config: {e}")
+            return {}
+
+    async def fetch_strategy_config_full(self, raise_errors: bool = False) -> list:
+        """Full strategy config with descriptions, as SupabaseManager.fetch_strategy_config_full."""
+        if not self.client:
+            return []
+
+        try:
+            data = await self._select('strategy_params', {'select': '*', 'order': 'created_at.asc'})
+            return [SupabaseManager._strategy_row(item) for item in data]
+        except Exception as e:
+            print(f"❌ Failed to fetch config full: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    async def fetch_latest_results(self, raise_errors: bool = False) -> list:
+        """Latest analysis row per stock, as SupabaseManager.fetch_latest_results."""
+        if not self.client:
+            return []
+
+        try:
+            data = await self._select('latest_analysis_results', {'select': '*', 'order': 'stock_code.asc'})
+            return [SupabaseManager._latest_row(item) for item in data]
+        except Exception as e:
+            print(f"❌ Failed to fetch latest analysis results: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    async def save_analysis_result(self, df: pd.DataFrame, batch_size: int = None) -> dict:
+        """
+        Upserts analysis results on (date, stock_code) like
+        SupabaseManager.save_analysis_result, but sends the chunks
+        concurrently (up to Config.SUPABASE_MAX_CONNECTIONS at a time).
+        Returns the same write report.
+        """
+        batch_size = batch_size or Config.SUPABASE_BATCH_SIZE
+        report = {'rows': len(df), 'written': 0, 'chunks': 0, 'failed_chunks': 0, 'retries': 0, 'seconds': 0.0}
+        if not self.client or df.empty:
+            return report
+
+        started = time.perf_counter()
+        records = SupabaseManager._analysis_records(df)
+        report['rows'] = len(records)
+
+        async def save_chunk(i: int):
+            chunk = records[i:i + batch_size]
+            report['chunks'] += 1
+            for attempt in range(Config.SUPABASE_MAX_RETRIES + 1):
+                try:
+                    await self._upsert('analysis_results', chunk, on_conflict='date,stock_code')
+                    report['written'] += len(chunk)
+                    return
+                except Exception as e:
+                    if attempt == Config.SUPABASE_MAX_RETRIES:
+                        report['failed_chunks'] += 1
+                        print(f"❌ Failed to save analysis results {i + 1}-{i + len(chunk)}: {e}")
+                        return
+                    report['retries'] += 1
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        await asyncio.gather(*(save_chunk(i) for i in range(0, len(records), batch_size)))
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        metrics.inc("supabase_rows_written", report['written'], table='analysis_results')
+        metrics.inc("supabase_retries", report['retries'], table='analysis_results')
+        metrics.inc("supabase_failed_chunks", report['failed_chunks'], table='analysis_results')
+
+        if report['failed_chunks']:
+            print(f"⚠️ Saved {report['written']}/{len(records)} analysis results to Supabase ({report['failed_chunks']} chunks failed).")
+        else:
+            print(f"✅ Saved {report['written']} analysis results to Supabase in {report['chunks']} chunks ({report['seconds']}s).")
+        return report
+
+    async def save_stock_list(self, stock_list: list) -> bool:
+        """Upserts the stock list: [{'Stock': '2330', 'Name': '...', 'Enabled': 'TRUE'}]"""
+        if not self.client:
+            return False
+
+        try:
+            upsert_data = SupabaseManager._stock_upserts(stock_list)
+            if upsert_data:
+                await self._upsert('stocks', upsert_data, on_conflict='code')
+                print(f"✅ Saved {len(upsert_data)} stocks to Supabase.")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to save stock list: {e}")
+            return False
+
+    async def save_strategy_config(self, config_dict: dict) -> bool:
+        """Upserts parameter values: {'MA_SHORT_DAYS': 10}"""
+        if not self.client:
+            return False
+
+        try:
+            upsert_data = SupabaseManager._strategy_upserts(config_dict)
+            if upsert_data:
+                await self._upsert('strategy_params', upsert_data, on_conflict='param_key')
+                print("✅ Saved strategy config to Supabase.")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to save strategy config: {e}")
+            return False
+
+if __name__ == "__main__":
+    async def check():
+        async with AsyncSupabaseManager() as mgr:
+            if mgr.client:
+                stocks, config = await asyncio.gather(mgr.fetch_stock_list(), mgr.fetch_strategy_config())
+                print("Stocks:", stocks)
+                print("Config:", config)
+
+    asyncio.run(check())
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from strategy_analyzer import StrategyAnalyzer
+
+class Backtester:
+    """
+    Replays the 🟢/🔴 signals of StrategyAnalyzer over history for a whole
+    watchlist at once. Long-only: a green light buys at that day's close, a
+    red light sells at that day's close, yellow keeps the current position.
+    Everything is computed on dates x stocks arrays, with no per-bar loop.
+    """
+
+    # Taiwan stock trading costs: broker fee on both sides, transaction tax on sells
+    FEE_RATE = 0.001425
+    TAX_RATE = 0.003
+    TRADING_DAYS = 252
+
+    @staticmethod
+    def hold(green: np.ndarray, red: np.ndarray) -> np.ndarray:
+        """
+        Turns dates x stocks green/red masks into 1 (holding) / 0 (flat)
+        positions at each day's close. Red wins where both are set.
+        """
+        events = np.where(red, 0.0, np.where(green, 1.0, np.nan))
+        rows = np.arange(len(events))[:, None]
+        last_event = np.maximum.accumulate(np.where(np.isnan(events), -1, rows), axis=0)
+        held = np.take_along_axis(events, np.maximum(last_event, 0), axis=0)
+        return np.where(last_event >= 0, held, 0.0)
+
+    @staticmethod
+    def positions(signal: pd.DataFrame) -> pd.DataFrame:
+        """Backtester.hold() for a dates x stocks Signal frame of 🟢/🔴/🟡."""
+        held = Backtester.hold((signal == '🟢').to_numpy(), (signal == '🔴').to_numpy())
+        return pd.DataFrame(held, index=signal.index, columns=signal.columns)
+
+    @staticmethod
+    def simulate(close: np.ndarray, held: np.ndarray, fee_rate: float = None, tax_rate: float = None) -> dict:
+        """
+        Daily strategy returns for dates x stocks positions: yesterday's
+        position times today's move, net of costs on trade days.
+        `close` is forward-filled over suspensions.
+        Returns {'returns', 'entries', 'exits', 'equity'} arrays.
+        """
+        fee_rate = Backtester.FEE_RATE if fee_rate is None else fee_rate
+        tax_rate = Backtester.TAX_RATE if tax_rate is None else tax_rate
+
+        daily = np.zeros_like(close)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily[1:] = close[1:] / close[:-1] - 1
+        daily = np.nan_to_num(daily, nan=0.0, posinf=0.0, neginf=0.0)
+        change = np.diff(held, axis=0, prepend=0.0)
+        entries = change > 0
+        exits = change < 0
+        costs = entries * fee_rate + exits * (fee_rate + tax_rate)
+        returns = np.zeros_like(close)
+        returns[1:] = held[:-1] * daily[1:]
+        returns = (1 + returns) * (1 - costs) - 1
+        return {'returns': returns, 'entries': entries, 'exits': exits,
+                'equity': np.cumprod(1 + returns, axis=0)}
+
+    @staticmethod
+    def round_trips(simulation: dict, held: np.ndarray) -> dict:
+        """
+        Pairs each entry with the next exit (or the last bar if still open).
+        Returns arrays entry_rows, exit_rows, cols, returns and is_open.
+        """
+        entries, exits, equity = simulation['entries'], simulation['exits'], simulation['equity']
+        T, N = held.shape
+        # np.nonzero on the transposed arrays walks stock by stock, so
+        # entries and exits line up one to one per stock
+        entry_cols, entry_rows = np.nonzero(entries.T)
+        exit_cols, exit_rows = np.nonzero(exits.T)
+        open_cols = np.flatnonzero(held[-1] > 0)
+        exit_rows = np.concatenate([exit_rows, np.full(len(open_cols), T - 1)])
+        exit_cols = np.concatenate([exit_cols, open_cols])
+        is_open = np.concatenate([np.zeros(len(exit_cols) - len(open_cols), dtype=bool), np.ones(len(open_cols), dtype=bool)])
+        order = np.lexsort((exit_rows, exit_cols))
+        exit_rows, is_open = exit_rows[order], is_open[order]
+
+        before_entry = np.vstack([np.ones((1, N)), equity])[entry_rows, entry_cols]
+        return {
+            'entry_rows': entry_rows,
+            'exit_rows': exit_rows,
+            'cols': entry_cols,
+            'returns': equity[exit_rows, entry_cols] / before_entry - 1,
+            'is_open': is_open,
+        }
+
+    @staticmethod
+    def portfolio_stats(returns: np.ndarray) -> dict:
+        """Equal-weight (rebalanced daily) statistics of dates x stocks strategy returns."""
+        daily = returns.mean(axis=1)
+        equity = np.cumprod(1 + daily)
+        std = daily.std()
+        return {
+            'Total_Return': equity[-1] - 1 if len(equity) else 0.0,
+            'Sharpe': daily.mean() / std * np.sqrt(Backtester.TRADING_DAYS) if std > 0 else 0.0,
+            'Max_Drawdown': (equity / np.maximum.accumulate(equity) - 1).min() if len(equity) else 0.0,
+        }
+
+    @staticmethod
+    def run(panel: dict, config: dict = {}, fee_rate: float = None, tax_rate: float = None) -> dict:
+        """
+        Backtests the strategy on a BarStore.load_panel() panel.
+        Returns a dict with:
+          'summary': one row per stock (Total_Return, CAGR, Max_Drawdown,
+                     Trades, Win_Rate, Avg_Trade_Return, Avg_Holding_Days, Exposure),
+          'trades':  one row per round trip (Stock, Entry, Exit, Return, Holding_Days, Open),
+          'equity':  dates x stocks equity curves starting at 1.0,
+          'portfolio': equity curve of the watchlist, equal-weighted daily.
+        """
+        signal = StrategyAnalyzer.analyze_panel(panel, config)['Signal']
+        dates, stocks = signal.index, signal.columns
+        close = panel['Close'].reindex(index=dates, columns=stocks).ffill().to_numpy(dtype='float64')
+        held = Backtester.positions(signal).to_numpy()
+
+        # 1. Daily strategy returns
+        simulation = Backtester.simulate(close, held, fee_rate, tax_rate)
+        equity = simulation['equity']
+
+        # 2. Round trips
+        trips = Backtester.round_trips(simulation, held)
+        holding_days = trips['exit_rows'] - trips['entry_rows']
+        trades = pd.DataFrame({
+            'Stock': stocks[trips['cols']],
+            'Entry': dates[trips['entry_rows']],
+            'Exit': dates[trips['exit_rows']],
+            'Return': trips['returns'],
+            'Holding_Days': holding_days,
+            'Open': trips['is_open'],
+        })
+
+        # 3. Per-stock statistics
+        T, N = held.shape
+        cols, trade_returns = trips['cols'], trips['returns']
+        first_trade = np.argmax(~np.isnan(close), axis=0)
+        years = np.maximum(T - first_trade, 1) / Backtester.TRADING_DAYS
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        trade_count = np.bincount(cols, minlength=N)
+        wins = np.bincount(cols, weights=trade_returns > 0, minlength=N)
+        return_sum = np.bincount(cols, weights=trade_returns, minlength=N)
+        holding_sum = np.bincount(cols, weights=holding_days, minlength=N)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            summary = pd.DataFrame({
+                'Total_Return': equity[-1] - 1,
+                'CAGR': equity[-1] ** (1 / years) - 1,
+                'Max_Drawdown': drawdown.min(axis=0),
+                'Trades': trade_count,
+                'Win_Rate': wins / trade_count,
+                'Avg_Trade_Return': return_sum / trade_count,
+                'Avg_Holding_Days': holding_sum / trade_count,
+                'Exposure': held.sum(axis=0) / np.maximum(T - first_trade, 1),
+            }, index=pd.Index(stocks, name='Stock'))
+
+        equity_df = pd.DataFrame(equity, index=dates, columns=stocks)
+        portfolio = pd.Series(np.cumprod(1 + simulation['returns'].mean(axis=1)), index=dates, name='Portfolio')
+        return {'summary': summary, 'trades': trades, 'equity': equity_df, 'portfolio': portfolio}
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from bar_store import BarStore
+
+    codes = sys.argv[1:] or ["2330", "2317", "2454", "2308", "2303"]
+    panel = BarStore().load_panel(codes)
+    if panel['Close'].empty:
+        print("Data file not found. Please run data_fetcher.py first.")
+    else:
+        started = time.perf_counter()
+        result = Backtester.run(panel)
+        print(f"✅ Backtested {panel['Close'].shape[1]} stocks x {len(panel['Close'])} days in {time.perf_counter() - started:.2f}s")
+        print(result['summary'].round(4).to_string())
+        portfolio = result['portfolio']
+        print(f"\nPortfolio (equal weight): {portfolio.iloc[-1] - 1:.2%}, max drawdown {(portfolio / portfolio.cummax() - 1).min():.2%}")
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+
+class BarStore:
+    """
+    Local OHLCV cache, one Arrow IPC file per stock under data/ (daily bars)
+    or data/<timeframe>/ (minute bars and their rollups).
+    Columns are typed (float32 prices, int64 volume) and files are read
+    through a memory map, so loading the universe does not parse any text.
+    Keeps track of which date range has already been requested from Shioaji,
+    so callers only need to download what is missing.
+    """
+
+    MANIFEST_FILE = "bar_store.json"
+    PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+    # TWSE tick sizes never go below 0.01, so rounding float32 prices back to
+    # 2 decimals restores the exact values Shioaji returned.
+    PRICE_DECIMALS = 2
+    SCHEMA = pa.schema([
+        ('Date', pa.timestamp('ns')),
+        ('Open', pa.float32()),
+        ('High', pa.float32()),
+        ('Low', pa.float32()),
+        ('Close', pa.float32()),
+        ('Volume', pa.int64()),
+    ])
+
+    # Daily bars live directly in data_dir, other timeframes in data_dir/<timeframe>/
+    DAILY = "1d"
+    TIMEFRAMES = ["1m", "5m", "15m", "60m", DAILY, "1w"]
+
+    def __init__(self, data_dir: str = "data", timeframe: str = DAILY):
+        if timeframe not in self.TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe {timeframe}, expected one of {self.TIMEFRAMES}")
+        self.timeframe = timeframe
+        self.data_dir = data_dir if timeframe == self.DAILY else os.path.join(data_dir, timeframe)
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+        self.manifest_path = os.path.join(self.data_dir, self.MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        # Fetch workers merge different stocks concurrently but share the manifest
+        self.manifest_lock = threading.Lock()
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Bar store manifest unreadable, rebuilding: {e}")
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def path(self, stock_code: str) -> str:
+        return os.path.join(self.data_dir, f"{stock_code}.arrow")
+
+    def _legacy_csv_path(self, stock_code: str) -> str:
+        return os.path.join(self.data_dir, f"{stock_code}.csv")
+
+    def coverage(self, stock_code: str):
+        """
+        Returns (start, end) date strings already requested for this stock,
+        or None if nothing is cached.
+        """
+        entry = self.manifest.get(stock_code)
+        if not entry:
+            return None
+        if not os.path.exists(self.path(stock_code)) and not os.path.exists(self._legacy_csv_path(stock_code)):
+            return None
+        return entry['start'], entry['end']
+
+    def read_table(self, stock_code: str, memory_map: bool = True) -> pa.Table:
+        """
+        Returns the stock's bars as an Arrow table. With memory_map the file is
+        mapped and read zero-copy; otherwise it is read into memory and closed,
+        so the file can be rewritten while the table is alive (needed on Windows).
+        Legacy CSV files written by older versions are converted on first access.
+        Returns None if the stock is not cached.
+        """
+        filename = self.path(stock_code)
+        if not os.path.exists(filename):
+            if not os.path.exists(self._legacy_csv_path(stock_code)):
+                return None
+            self._migrate_csv(stock_code)
+
+        if memory_map:
+            return pa.ipc.open_file(pa.memory_map(filename, 'r')).read_all()
+        with pa.OSFile(filename, 'rb') as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def load(self, stock_code: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        Loads cached bars, optionally limited to [start_date, end_date] (whole days).
+        Prices are returned as float64 for the indicator math.
+        Returns None if the stock is not cached.
+        """
+        # Not memory-mapped: the DataFrame may keep zero-copy views of the
+        # file's buffers, and merge() rewrites the file right after loading it,
+        # which fails on Windows while a mapping is open. The float64 cast
+        # copies the prices anyway; the bulk readers below do map the files.
+        table = self.read_table(stock_code, memory_map=False)
+        if table is None:
+            return None
+
+        df = table.to_pandas().set_index('Date')
+        df[self.PRICE_COLUMNS] = df[self.PRICE_COLUMNS].astype('float64').round(self.PRICE_DECIMALS)
+        return df.loc[start_date:end_date]
+
+    def read_universe_table(self, stock_codes: list) -> pa.Table:
+        """
+        Returns one Arrow table (Stock, Date, OHLCV) for all cached stocks in stock_codes.
+        The per-stock files are memory-mapped and concatenated without copying.
+        """
+        tables = []
+        for code in stock_codes:
+            table = self.read_table(code)
+            if table is None:
+                continue
+            stock_col = pa.array([code] * table.num_rows, type=pa.string())
+            tables.append(table.add_column(0, 'Stock', stock_col))
+
+        if not tables:
+            return self.SCHEMA.insert(0, pa.field('Stock', pa.string())).empty_table()
+        return pa.concat_tables(tables)
+
+    def load_universe(self, stock_codes: list) -> pd.DataFrame:
+        """
+        Loads all cached stocks in stock_codes into one DataFrame indexed by (Stock, Date).
+        Columns keep their stored float32/int64 types.
+        """
+        df = self.read_universe_table(stock_codes).to_pandas()
+        return df.set_index(['Stock', 'Date']).sort_index()
+
+    def load_panel(self, stock_codes: list) -> dict:
+        """
+        Loads cached stocks as a panel: {'Open': df, ..., 'Volume': df} where each
+        DataFrame is dates x stocks, for TechIndicators.calculate_panel.
+        Prices are float64 rounded to the tick, like load().
+        """
+        universe = self.read_universe_table(stock_codes).to_pandas()
+        panel = {}
+        for column in self.SCHEMA.names[1:]:
+            frame = universe.pivot(index='Date', columns='Stock', values=column)
+            frame = frame.reindex(columns=[c for c in stock_codes if c in frame.columns])
+            if column in self.PRICE_COLUMNS:
+                frame = frame.astype('float64').round(self.PRICE_DECIMALS)
+            panel[column] = frame
+        return panel
+
+    def _write(self, stock_code: str, df: pd.DataFrame):
+        frame = df.reset_index()
+        frame = frame.rename(columns={frame.columns[0]: 'Date'})
+        table = pa.Table.from_pandas(frame[self.SCHEMA.names], schema=self.SCHEMA, preserve_index=False)
+        table = table.replace_schema_metadata({'symbol': stock_code})
+
+        # Write to a temp file first so readers never see a half-written file
+        filename = self.path(stock_code)
+        tmp_path = filename + ".tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, self.SCHEMA.with_metadata(table.schema.metadata)) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, filename)
+
+    def _migrate_csv(self, stock_code: str):
+        legacy_path = self._legacy_csv_path(stock_code)
+        df = pd.read_csv(legacy_path, index_col=0, parse_dates=True)
+        df.index.name = 'Date'
+        self._write(stock_code, df)
+        os.remove(legacy_path)
+        print(f"ℹ️ Migrated {legacy_path} to {self.path(stock_code)}")
+
+    def merge(self, stock_code: str, df_new: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Merges freshly fetched bars for [start_date, end_date] into the cache.
+        Fetched rows replace cached rows of the same date (the last cached day
+        may have been a partial intraday bar).
+        """
+        cached = self.load(stock_code)
+        frames = [df for df in (cached, df_new) if df is not None and not df.empty]
+        if not frames:
+            return None
+
+        combined = pd.concat(frames)
+        combined = combined[~combined.index.duplicated(keep='last')]
+        combined = combined.sort_index()
+        self._write(stock_code, combined)
+
+        with self.manifest_lock:
+            covered = self.coverage(stock_code)
+            if covered:
+                start_date = min(start_date, covered[0])
+                end_date = max(end_date, covered[1])
+            self.manifest[stock_code] = {'start': start_date, 'end': end_date}
+            self._save_manifest()
+        return combined
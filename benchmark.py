@@ -0,0 +1,324 @@
+"""
+Benchmarks for the scan pipeline on synthetic data.
+
+Stages (each at every universe size x history length):
+  indicators  TechIndicators.calculate() per stock
+  analyze     StrategyAnalyzer.analyze() per stock
+  panel       StrategyAnalyzer.analyze_panel() on the whole universe
+  aggregate   DataFetcher.aggregate_bars(), 1-minute kbars -> daily bars
+  save        SupabaseManager.save_analysis_result() into a client that
+              only JSON-encodes the requests (no network)
+  scan        MarketScanner.run_scan() end to end against FakeShioaji, on a
+              warm bar store (only the last day is fetched, as in the
+              daily run); uses the scanner's own 365-day window, so it runs
+              once per universe size. Each run gets a freshly written store
+              and state dir, so repeats do the same work
+
+Every case runs in a fresh process and records the best wall time of
+`--repeat` runs, the process's peak RSS, and the peak of Python
+allocations (tracemalloc, one extra run).
+
+Usage:
+  python benchmark.py --output benchmark.json
+  python benchmark.py --sizes 50 500 --compare benchmark.json --threshold 0.2
+Comparing exits with status 1 if any case is slower or bigger than the
+baseline by more than the threshold, failed to run (e.g. `save` without
+the supabase package), or has no baseline entry to compare with.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from strategy_analyzer import StrategyAnalyzer
+from tech_indicators import TechIndicators
+
+STAGES = ['indicators', 'analyze', 'panel', 'aggregate', 'save', 'scan']
+SIZES = [50, 500, 2000]
+HISTORY_BARS = [250, 1250]
+# Metrics compared against a baseline
+METRICS = ['seconds', 'peak_rss_mb', 'alloc_peak_mb']
+
+def synthetic_daily(symbols: int, bars: int, seed: int = 0) -> dict:
+    """{code: daily OHLCV DataFrame} of random walks ending yesterday, rounded to 0.01."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=datetime.now().date() - timedelta(days=1), periods=bars, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, symbols)), axis=0))
+    spread = rng.uniform(0.001, 0.02, (2, bars, symbols))
+    volume = rng.integers(100, 100000, (bars, symbols))
+    frames = {}
+    for i in range(symbols):
+        c = np.round(close[:, i], 2)
+        frames[str(1000 + i)] = pd.DataFrame({
+            'Open': np.round(c * (1 + spread[0, :, i] - spread[1, :, i]), 2),
+            'High': np.round(c * (1 + spread[0, :, i]), 2),
+            'Low': np.round(c * (1 - spread[1, :, i]), 2),
+            'Close': c,
+            'Volume': volume[:, i],
+        }, index=dates)
+    return frames
+
+def synthetic_kbars(days: int, rng: np.random.Generator):
+    """One stock's 1-minute kbars (270 per day, stamped at the minute's close) as DataFetcher receives them."""
+    minutes = 270
+    day_ns = np.arange(days, dtype='int64') * 86_400_000_000_000 + pd.Timestamp("2020-01-01 09:00").value
+    ts = (day_ns[:, None] + np.arange(1, minutes + 1) * 60_000_000_000).ravel()
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(ts)))), 2)
+    opens = np.r_[close[0], close[:-1]]
+    kbars = {
+        'ts': ts.tolist(),
+        'Open': opens.tolist(),
+        'High': np.maximum(opens, close).tolist(),
+        'Low': np.minimum(opens, close).tolist(),
+        'Close': close.tolist(),
+        'Volume': rng.integers(1, 200, len(ts)).tolist(),
+    }
+    return kbars, ts
+
+def summary_rows(frames: dict) -> pd.DataFrame:
+    """A MarketScanner.run_scan()-shaped summary per stock and history day."""
+    rows = []
+    for code, df in frames.items():
+        df = StrategyAnalyzer.analyze(df)
+        rows.append(pd.DataFrame({
+            'Stock': code, 'Name': f"Stock {code}", 'Date': df.index.strftime("%Y-%m-%d"),
+            'Close': df['Close'], 'Signal': df['Signal'], 'Memo': df['Signal_Memo'],
+            'K': df['K'].round(2), 'D': df['D'].round(2), 'RSI': df['RSI'].round(2),
+            'MA_SHORT': df['MA_SHORT'].round(2), 'MA_LONG': df['MA_LONG'].round(2),
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+class JsonClient:
+    """Stands in for the supabase client: each upsert is JSON-encoded like the real request body."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def table(self, name: str):
+        return self
+
+    def upsert(self, rows: list, on_conflict: str = None):
+        self.bytes_sent += len(json.dumps(rows, default=str).encode('utf-8'))
+        return self
+
+    def execute(self):
+        return self
+
+def prepare(stage: str, symbols: int, bars: int, workdir: str):
+    """
+    Builds the stage's input (not timed) and returns the call to time.
+    A `reset` attribute on the call, if set, runs (untimed) before every run.
+    """
+    if stage in ('indicators', 'analyze'):
+        frames = synthetic_daily(symbols, bars)
+        if stage == 'indicators':
+            return lambda: [TechIndicators.calculate(df) for df in frames.values()]
+        return lambda: [StrategyAnalyzer.analyze(df) for df in frames.values()]
+
+    if stage == 'panel':
+        frames = synthetic_daily(symbols, bars)
+        panel = {column: pd.DataFrame({code: df[column] for code, df in frames.items()})
+                 for column in ['Open', 'High', 'Low', 'Close', 'Volume']}
+        return lambda: StrategyAnalyzer.analyze_panel(panel)
+
+    if stage == 'aggregate':
+        from data_fetcher import DataFetcher
+        rng = np.random.default_rng(0)
+        # One stock's kbars at a time, so memory stays per-stock as in fetch_daily_k
+        day = DataFetcher.DAY_NS
+
+        def run():
+            for _ in range(symbols):
+                kbars, ts = synthetic_kbars(bars, rng)
+                started = time.perf_counter()
+                DataFetcher.aggregate_bars(kbars, ts, ts // day * day)
+                run.elapsed += time.perf_counter() - started
+        # Only the aggregation is timed; generating the kbars is not
+        run.timed = True
+        return run
+
+    if stage == 'save':
+        from config import Config
+        from supabase_manager import SupabaseManager
+        df = summary_rows(synthetic_daily(symbols, bars))
+        Config.SUPABASE_URL = Config.SUPABASE_KEY = None
+        manager = SupabaseManager()
+        manager.client = JsonClient()
+        return lambda: manager.save_analysis_result(df)
+
+    if stage == 'scan':
+        from bar_store import BarStore
+        from config import Config
+        from fake_shioaji import FakeShioaji
+        from market_scanner import MarketScanner
+        from shioaji_login import ShioajiLogin
+        Config.STORE_INTRADAY_BARS = False
+        Config.INDICATOR_STATE_DIR = os.path.join("data", "state")
+        frames = synthetic_daily(symbols, bars)
+        codes = list(frames)
+
+        def reset():
+            # Warm daily cache up to yesterday, in a new directory each run so no
+            # merged last day or checkpoint is left from the previous one;
+            # the scan re-fetches the last day only
+            os.chdir(tempfile.mkdtemp(dir=workdir))
+            store = BarStore()
+            for code, df in frames.items():
+                store.merge(code, df, "2000-01-01", df.index[-1].strftime("%Y-%m-%d"))
+            ShioajiLogin._api_instance = FakeShioaji(latency=0.0, quota_requests=10 ** 9, quota_period=1)
+
+        def run():
+            MarketScanner(stock_list=codes).run_scan()
+        run.reset = reset
+        return run
+
+    raise ValueError(f"Unknown stage {stage}, expected one of {STAGES}")
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (None where the resource module is missing, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def measure(stage: str, symbols: int, bars: int, repeat: int) -> dict:
+    """Runs one case in this process and returns its metrics."""
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        try:
+            run = prepare(stage, symbols, bars, workdir)
+            timed = getattr(run, 'timed', False)
+            reset = getattr(run, 'reset', None)
+            times = []
+            # Scan output is noise here
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    for _ in range(repeat):
+                        if reset:
+                            reset()
+                        run.elapsed = 0.0
+                        started = time.perf_counter()
+                        run()
+                        times.append(run.elapsed if timed else time.perf_counter() - started)
+                    if reset:
+                        reset()
+                    tracemalloc.start()
+                    run()
+                    _, alloc_peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                finally:
+                    sys.stdout = stdout
+        finally:
+            os.chdir(cwd)
+    best = min(times)
+    return {
+        'stage': stage,
+        'symbols': symbols,
+        'bars': bars,
+        'seconds': round(best, 4),
+        'mean_seconds': round(sum(times) / len(times), 4),
+        'per_symbol_ms': round(best / symbols * 1000, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'alloc_peak_mb': round(alloc_peak / 1024 / 1024, 1),
+    }
+
+def _measure_into(results, *args):
+    try:
+        results.put(measure(*args))
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+
+def run_case(stage: str, symbols: int, bars: int, repeat: int) -> dict:
+    """measure() in a fresh process, so peak RSS and caches belong to this case only."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_measure_into, args=(results, stage, symbols, bars, repeat))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def case_id(result: dict) -> str:
+    """'stage/symbolsxbars' ('scan/symbols') of a result or {'stage', 'symbols', 'bars'}."""
+    if result['stage'] == 'scan':
+        return f"scan/{result['symbols']}"
+    return f"{result['stage']}/{result['symbols']}x{result['bars']}"
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose metrics grew by more than `threshold` (e.g. 0.2 = 20%) over the baseline."""
+    regressions = []
+    for case, result in results.items():
+        previous = baseline.get(case)
+        if not previous:
+            continue
+        for metric in METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append({'case': case, 'metric': metric, 'baseline': old, 'current': new,
+                                    'change': round(new / old - 1, 3)})
+    return regressions
+
+def environment() -> dict:
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the scan pipeline on synthetic data")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="universe sizes (symbols)")
+    parser.add_argument("--bars", nargs="+", type=int, default=HISTORY_BARS, help="history lengths (daily bars)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("--output", default="benchmark.json", help="where to write the results")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed growth over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results, errors = {}, {}
+    for stage in args.stages:
+        for symbols in args.sizes:
+            for bars in ([args.bars[0]] if stage == 'scan' else args.bars):
+                case = case_id({'stage': stage, 'symbols': symbols, 'bars': bars})
+                result = run_case(stage, symbols, bars, args.repeat)
+                if 'error' in result:
+                    errors[case] = result['error']
+                    print(f"⚠️ {case} skipped: {result['error']}")
+                    continue
+                results[case] = result
+                print(f"✅ {case:<24} {result['seconds']:>9.3f}s  {result['per_symbol_ms']:>8.3f} ms/symbol  "
+                      f"RSS {result['peak_rss_mb']} MB  alloc {result['alloc_peak_mb']} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"❌ {r['case']} {r['metric']}: {r['baseline']} -> {r['current']} (+{r['change']:.0%})")
+        # A case that failed or has no baseline was not checked, which must not pass as "no regressions"
+        uncompared = {**errors, **{case: "not in the baseline" for case in results if case not in baseline}}
+        for case, reason in uncompared.items():
+            print(f"❌ {case} not compared: {reason}")
+        if regressions or uncompared:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.compare}")
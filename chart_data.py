@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from bar_store import BarStore
+from strategy_analyzer import StrategyAnalyzer
+from tech_indicators import TechIndicators
+
+class ChartData:
+    """
+    Price and indicator series for charts, read from the local BarStore.
+    Indicators are computed over the whole cached history (so the first
+    visible bars are warmed up), cut to the requested range, and reduced to
+    at most `points` bars, either by OHLC bucketing or by
+    Largest-Triangle-Three-Buckets on Close.
+    Output is columnar: one array per field, all sharing the `t` axis.
+    """
+
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume',
+               'MA_SHORT', 'MA_LONG', 'MA60', 'MACD_DIF', 'MACD_DEM', 'MACD_OSC', 'RSI', 'K', 'D']
+    METHODS = ['ohlc', 'lttb']
+    # Computed indicator frames kept per (stock, timeframe), keyed by file version and params
+    CACHE_SIZE = 64
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self.stores = {}
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _store(self, timeframe: str) -> BarStore:
+        if timeframe not in self.stores:
+            self.stores[timeframe] = BarStore(self.data_dir, timeframe)
+        return self.stores[timeframe]
+
+    def indicators(self, stock_code: str, timeframe: str = BarStore.DAILY, config: dict = {}) -> pd.DataFrame:
+        """All cached bars of the stock with TechIndicators columns, or None if not cached."""
+        store = self._store(timeframe)
+        filename = store.path(stock_code)
+        if not os.path.exists(filename):
+            return None
+        params = StrategyAnalyzer.indicator_params(config)
+        key = (stock_code, timeframe)
+        version = (os.stat(filename).st_mtime_ns, tuple(sorted(params.items())))
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] == version:
+                self.cache.move_to_end(key)
+                return cached[1]
+
+        df = store.load(stock_code)
+        if df is None:
+            return None
+        df = TechIndicators.calculate(df, **params)
+        with self.lock:
+            self.cache[key] = (version, df)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return df
+
+    @staticmethod
+    def bucket_ohlc(df: pd.DataFrame, points: int) -> pd.DataFrame:
+        """
+        Merges consecutive bars into `points` buckets: Open=first, High=max,
+        Low=min, Close=last, Volume=sum; indicator lines take the bucket's
+        last value (their value at that Close). Each bucket is stamped with
+        its first bar's time.
+        """
+        n = len(df)
+        starts = np.unique(np.arange(points) * n // points)
+        ends = np.r_[starts[1:], n] - 1
+        out = df.iloc[ends].copy()
+        out.index = df.index[starts]
+        out['Open'] = df['Open'].to_numpy()[starts]
+        out['High'] = np.fmax.reduceat(df['High'].to_numpy(), starts)
+        out['Low'] = np.fmin.reduceat(df['Low'].to_numpy(), starts)
+        out['Volume'] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+        return out
+
+    @staticmethod
+    def lttb_indices(y: np.ndarray, points: int) -> np.ndarray:
+        """
+        Largest-Triangle-Three-Buckets: picks `points` row indices whose line
+        keeps the visual shape of y (x = row number). Keeps the first and last row.
+        """
+        n = len(y)
+        if points >= n or points < 3:
+            return np.arange(n) if points >= n else np.array([0, n - 1])[:points]
+        y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+        # Rows 1..n-2 split into points-2 buckets; the last bucket is followed by the last row
+        edges = (np.arange(points - 1) * (n - 2) / (points - 2)).astype(int) + 1
+        edges = np.r_[edges[:-1], n - 1, n]
+        selected = np.empty(points, dtype=int)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+        for i in range(points - 2):
+            start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+            avg_x = (end + next_end - 1) / 2
+            avg_y = y[end:next_end].mean()
+            xs = np.arange(start, end)
+            area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+            a = start + int(area.argmax())
+            selected[i + 1] = a
+        return selected
+
+    def series(self, stock_code: str, start_date: str = None, end_date: str = None,
+               timeframe: str = BarStore.DAILY, points: int = None, method: str = 'ohlc',
+               config: dict = {}) -> pd.DataFrame:
+        """
+        Bars with indicator columns for [start_date, end_date], reduced to at
+        most `points` rows. Returns None if the stock is not cached.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"method must be one of {self.METHODS}")
+        df = self.indicators(stock_code, timeframe, config)
+        if df is None:
+            return None
+        df = df.loc[start_date:end_date, self.COLUMNS]
+        if points and len(df) > points:
+            if method == 'ohlc':
+                df = self.bucket_ohlc(df, points)
+            else:
+                df = df.iloc[self.lttb_indices(df['Close'].to_numpy(), points)]
+        return df
+
+    @staticmethod
+    def to_columns(df: pd.DataFrame, stock_code: str, timeframe: str) -> dict:
+        """
+        Columnar JSON: {'symbol', 'timeframe', 't': [epoch seconds], '<field>': [...]}
+        with lower-case field names, values rounded to 4 decimals and NaN as null.
+        """
+        result = {
+            'symbol': stock_code,
+            'timeframe': timeframe,
+            't': (df.index.as_unit('s').asi8).tolist(),
+        }
+        for column in ChartData.COLUMNS:
+            values = df[column].to_numpy()
+            if column == 'Volume':
+                result['volume'] = values.astype('int64').tolist()
+                continue
+            values = np.round(values.astype('float64'), 4)
+            result[column.lower()] = [None if v != v else v for v in values.tolist()]
+        return result
+
+    @staticmethod
+    def to_arrow(df: pd.DataFrame, stock_code: str, timeframe: str) -> bytes:
+        """The same columns as an Arrow IPC stream: t as timestamp[s], float32 prices/indicators, int64 volume."""
+        arrays = {'t': pa.array(df.index.as_unit('s').asi8, type=pa.timestamp('s'))}
+        for column in ChartData.COLUMNS:
+            values = df[column].to_numpy()
+            if column == 'Volume':
+                arrays['volume'] = pa.array(values.astype('int64'))
+            else:
+                arrays[column.lower()] = pa.array(values.astype('float32'), from_pandas=True)
+        table = pa.table(arrays).replace_schema_metadata({'symbol': stock_code, 'timeframe': timeframe})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
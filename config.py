@@ -10,10 +10,44 @@ class Config:
     SHIOAJI_SECRET_KEY = os.getenv("SHIOAJI_SECRET_KEY")
     SHIOAJI_PFX_PATH = os.getenv("SHIOAJI_PFX_PATH")
     SHIOAJI_PFX_PASSWORD = os.getenv("SHIOAJI_PFX_PASSWORD")
+    # Market data query quota (kbars/ticks/snapshots): 50 requests per 5 seconds
+    SHIOAJI_QUOTA_REQUESTS = int(os.getenv("SHIOAJI_QUOTA_REQUESTS", "50"))
+    SHIOAJI_QUOTA_PERIOD = float(os.getenv("SHIOAJI_QUOTA_PERIOD", "5"))
+    FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "3"))
+    # Keep the 1-minute kbars (and 5/15/60-minute rollups) next to the daily bars.
+    # Off by default: turning it on re-downloads every cached stock once (the
+    # minute store starts empty) and adds a few BarStore writes per fetch
+    STORE_INTRADAY_BARS = os.getenv("STORE_INTRADAY_BARS", "false").lower() == "true"
+    # "shioaji" (live API) or "fake" (offline FakeShioaji, for benchmarks and tests)
+    MARKET_DATA_SOURCE = os.getenv("MARKET_DATA_SOURCE", "shioaji")
+    # FakeShioaji: recorded data dir (BarStore layout with 1m bars; synthetic data if unset),
+    # seconds per query, and the seed of the synthetic prices
+    FAKE_SHIOAJI_DATA_DIR = os.getenv("FAKE_SHIOAJI_DATA_DIR")
+    FAKE_SHIOAJI_LATENCY = float(os.getenv("FAKE_SHIOAJI_LATENCY", "0.05"))
+    FAKE_SHIOAJI_SEED = int(os.getenv("FAKE_SHIOAJI_SEED", "0"))
+
+    # Market Scanner
+    SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "5"))
+    SCAN_ANALYSIS_WORKERS = int(os.getenv("SCAN_ANALYSIS_WORKERS", "2"))
+    SCAN_QUEUE_SIZE = int(os.getenv("SCAN_QUEUE_SIZE", "32"))
+    # "full": recompute every indicator over the whole history (the published signals)
+    # "latest": recompute over just the trailing warm-up window today's bar needs
+    # "incremental" (opt-in): advance per-stock indicator checkpoints by the new bars only;
+    #   EMA/RSI values keep the seed of the day the checkpoint was built, so they drift
+    #   from "full" (which seeds at the start of the fetched window)
+    SCAN_ANALYSIS_MODE = os.getenv("SCAN_ANALYSIS_MODE", "full")
+    INDICATOR_STATE_DIR = os.getenv("INDICATOR_STATE_DIR", os.path.join("data", "state"))
+    # main.py writes a JSON timing/counter report of every run here
+    RUN_REPORT_DIR = os.getenv("RUN_REPORT_DIR", os.path.join("data", "reports"))
+
+    # Intraday Monitor: tick subscriptions end at this local time (HH:MM)
+    INTRADAY_SESSION_END = os.getenv("INTRADAY_SESSION_END", "13:30")
     
     # Google Sheets
     GOOGLE_SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "service_account.json")
     GOOGLE_SHEET_URL = os.getenv("GOOGLE_SHEET_URL")
+    # Seconds worksheet reads are served from cache when we have not written to the sheet
+    SHEET_CACHE_TTL = float(os.getenv("SHEET_CACHE_TTL", "60"))
     
     # Line Messaging API
     LINE_CHANNEL_ACCESS_TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
@@ -22,6 +56,20 @@ class Config:
     # Supabase
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    # Rows per analysis_results upsert request, and retries per failed request
+    SUPABASE_BATCH_SIZE = int(os.getenv("SUPABASE_BATCH_SIZE", "500"))
+    SUPABASE_MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", "3"))
+    # Pooled connections (and concurrent requests) of AsyncSupabaseManager
+    SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "10"))
+
+    # API Server
+    API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+    # Seconds before /api/signals/latest reloads on its own if no scan refreshed it
+    SIGNAL_CACHE_TTL = float(os.getenv("SIGNAL_CACHE_TTL", "300"))
+    # Seconds /api/config is served from cache when nothing was saved through the API
+    CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "300"))
+    # Allow ?profile=1 (or an X-Profile: 1 header) to sample single requests into RUN_REPORT_DIR
+    PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
 
     @classmethod
     def check_required(cls):
@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+
+async def call_loader(loader):
+    """Awaits an async loader, or runs a blocking one in a worker thread."""
+    if inspect.iscoroutinefunction(loader):
+        return await loader()
+    return await asyncio.to_thread(loader)
+
+class ConfigCache:
+    """
+    In-process cache of the /api/config payload with an ETag.
+    `loaders` maps payload keys to fetch functions (e.g.
+    AsyncSupabaseManager.fetch_all_stocks); on a miss they run concurrently,
+    blocking ones in worker threads. A loader must raise when its read fails:
+    the error reaches the caller and nothing is cached, so an empty payload
+    never gets an ETag. The save handlers call invalidate(); `ttl` bounds how
+    long changes made outside the server (seed script, param sweep) take to show.
+    """
+
+    def __init__(self, loaders: dict, ttl: float = 300):
+        self.loaders = loaders
+        self.ttl = ttl
+        self.payload = None
+        self.etag = None
+        self.loaded_at = 0.0
+        self.version = 0
+        self.lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+        self.payload = None
+
+    def _fresh(self) -> bool:
+        return self.payload is not None and time.monotonic() - self.loaded_at <= self.ttl
+
+    async def get(self):
+        """Returns (payload, etag), loading it if missing or expired."""
+        if self._fresh():
+            return self.payload, self.etag
+        async with self.lock:
+            # Another request may have loaded it while we waited
+            if self._fresh():
+                return self.payload, self.etag
+            version = self.version
+            keys = list(self.loaders)
+            values = await asyncio.gather(*(call_loader(self.loaders[key]) for key in keys))
+            payload = dict(zip(keys, values))
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest() + '"'
+            # Don't keep a payload that a save invalidated while it was loading
+            if version == self.version:
+                self.payload, self.etag, self.loaded_at = payload, etag, time.monotonic()
+            return payload, etag
+
+    @staticmethod
+    def matches(if_none_match: str, etag: str) -> bool:
+        """True if an If-None-Match header value covers `etag`."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
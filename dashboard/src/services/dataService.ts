@@ -3,15 +3,12 @@ import type { StockData } from '../types/stock';
 
 export const fetchStockData = async (): Promise<StockData[]> => {
     try {
-        // Fetch latest analysis results
-        // standard Postgres hack for "latest item per group": 
+        // Latest analysis row per stock; the view does the
         // distinct on (stock_code) ... order by stock_code, date desc
-
         const { data, error } = await supabase
-            .from('analysis_results')
-            .select('*')
-            .order('stock_code', { ascending: true })
-            .order('date', { ascending: false });
+            .from('latest_analysis_results')
+            .select('stock_code, name, date, signal, price, memo, k, d, rsi, ma_short, ma_long')
+            .order('stock_code', { ascending: true });
 
         if (error) {
             console.error("Supabase fetch error:", error);
@@ -20,34 +17,20 @@ export const fetchStockData = async (): Promise<StockData[]> => {
 
         if (!data) return [];
 
-        // Manual "Distinct On" filter if we don't assume the SQL distinct worked perfectly via API options
-        // (Supabase JS client sometimes needs specific syntax for distinct, doing it in JS is safer for small datasets)
-        const latestMap = new Map();
-        data.forEach(item => {
-            if (!latestMap.has(item.stock_code)) {
-                latestMap.set(item.stock_code, item);
-            }
-        });
-
-        const latestData = Array.from(latestMap.values());
-
         // Map to StockData interface
-        return latestData.map(item => {
-            // indicators is stored as JSONB, which comes back as an object
-            const indicators = item.indicators || {};
-
-            return {
-                Stock: item.stock_code,
-                Name: indicators.Name || '', // We stored Name in indicators
-                Date: item.date,
-                Signal: item.signal,
-                Close: item.price,
-                Memo: indicators.Memo || indicators.Signal_Memo || '', // Mapped to Memo
-                K: indicators.K || 0,
-                D: indicators.D || 0,
-                RSI: indicators.RSI || 0
-            } as StockData;
-        });
+        return data.map(item => ({
+            Stock: item.stock_code,
+            Name: item.name || '',
+            Date: item.date,
+            Signal: item.signal,
+            Close: item.price,
+            Memo: item.memo || '',
+            K: item.k ?? 0,
+            D: item.d ?? 0,
+            RSI: item.rsi ?? 0,
+            MA_SHORT: item.ma_short ?? undefined,
+            MA_LONG: item.ma_long ?? undefined
+        } as StockData));
 
     } catch (err) {
         console.error("Fetching stock data failed:", err);
@@ -8,4 +8,6 @@ export interface StockData {
     K: number;
     D: number;
     RSI: number;
+    MA_SHORT?: number;
+    MA_LONG?: number;
 }
@@ -1,64 +1,207 @@
+import numpy as np
 import pandas as pd
-import os
 from datetime import datetime, timedelta
+from config import Config
 from shioaji_login import ShioajiLogin
+from bar_store import BarStore
+from rate_limiter import TokenBucket
+from metrics import metrics
 
 class DataFetcher:
-    def __init__(self):
-        self.api = ShioajiLogin.get_api()
+    # Substrings of API errors that mean we exceeded the query quota
+    THROTTLE_MARKERS = ("too many", "rate limit", "exceed", "429")
+    MINUTE_NS = 60_000_000_000
+    DAY_NS = 86_400_000_000_000
+    # Intraday rollups of the 1-minute bars
+    ROLLUP_MINUTES = {"5m": 5, "15m": 15, "60m": 60}
+
+    def __init__(self, rate_limiter: TokenBucket = None, api=None):
+        # `api` overrides the logged-in Shioaji API (e.g. a FakeShioaji)
+        self.api = api or ShioajiLogin.get_api()
         self.data_dir = "data"
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        self.store = BarStore(self.data_dir)
+        # Minute bars and their rollups, kept from the same kbars downloads
+        self.stores = {tf: BarStore(self.data_dir, tf) for tf in BarStore.TIMEFRAMES if tf != BarStore.DAILY}
+        self.stores[BarStore.DAILY] = self.store
+        # One bucket per fetcher; share the fetcher across worker threads
+        self.rate_limiter = rate_limiter or TokenBucket(Config.SHIOAJI_QUOTA_REQUESTS, Config.SHIOAJI_QUOTA_PERIOD)
 
     def fetch_daily_k(self, stock_code: str, start_date: str = None, end_date: str = None):
         """
         Fetch daily K-lines for a given stock code.
         Default fetches last 365 days.
+        Bars already in the local BarStore are reused; only the missing
+        date range is requested from Shioaji.
         """
         if not start_date:
             start_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
         if not end_date:
             end_date = datetime.now().strftime("%Y-%m-%d")
 
-        print(f"📥 Fetching {stock_code} from {start_date} to {end_date}...")
-        
         try:
             contract = self.api.Contracts.Stocks[stock_code]
-            kbars = self.api.kbars(
-                contract=contract, 
-                start=start_date, 
-                end=end_date
-            )
-            
-            df = pd.DataFrame({**kbars})
-            df.ts = pd.to_datetime(df.ts)
-            df.set_index('ts', inplace=True)
-            df.index.name = 'Date'
-            
-            # Resample to Daily
-            # Open=first, High=max, Low=min, Close=last, Volume=sum
-            df_daily = df.resample('D').agg({
-                'Open': 'first',
-                'High': 'max',
-                'Low': 'min',
-                'Close': 'last',
-                'Volume': 'sum'
-            })
-            # Remove empty days (non-trading days)
-            df_daily.dropna(inplace=True)
-            
-            # Save to CSV
-            filename = os.path.join(self.data_dir, f"{stock_code}.csv")
-            df_daily.to_csv(filename)
-            print(f"✅ Saved {len(df_daily)} rows (Daily K) to {filename}")
-            
+
+            for fetch_start, fetch_end in self._missing_ranges(stock_code, start_date, end_date):
+                print(f"📥 Fetching {stock_code} from {fetch_start} to {fetch_end}...")
+                kbars, ts = self._fetch_kbars(contract, fetch_start, fetch_end)
+                metrics.inc("kbars_rows", len(ts))
+                # Shioaji stamps kbars in exchange local time, so whole days of
+                # nanoseconds are trading-day keys
+                df_new = self.aggregate_bars(kbars, ts, ts // self.DAY_NS * self.DAY_NS)
+                self.store.merge(stock_code, df_new, fetch_start, fetch_end)
+                if Config.STORE_INTRADAY_BARS:
+                    self._merge_intraday(stock_code, kbars, ts, fetch_start, fetch_end)
+                self._merge_weekly(stock_code, fetch_start, fetch_end)
+
+            df_daily = self.store.load(stock_code, start_date, end_date)
+            if df_daily is None:
+                df_daily = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+            print(f"✅ {stock_code}: {len(df_daily)} rows (Daily K) from {self.store.path(stock_code)}")
+
             return df_daily
-            
-            
+
         except Exception as e:
+            metrics.inc("fetch_errors")
             print(f"❌ Failed to fetch {stock_code}: {e}")
             return None
 
+    def _missing_ranges(self, stock_code: str, start_date: str, end_date: str) -> list:
+        """
+        Works out which (start, end) ranges are not yet in the local store.
+        The last cached day is always re-fetched since it may have been
+        saved from a partial (intraday) session.
+        The store records one covered range per stock, so a request that
+        does not touch it is widened to reach it; otherwise the days in
+        between would be marked covered without being downloaded.
+        """
+        # With intraday bars on, the minute store decides, so days cached
+        # before minute bars were kept are downloaded once more
+        store = self.stores["1m"] if Config.STORE_INTRADAY_BARS else self.store
+        covered = store.coverage(stock_code)
+        if covered is None:
+            return [(start_date, end_date)]
+
+        covered_start, covered_end = covered
+        ranges = []
+        if start_date < covered_start:
+            head_end = (datetime.strptime(covered_start, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+            ranges.append((start_date, head_end))
+        if end_date >= covered_end:
+            ranges.append((covered_end, end_date))
+        return ranges
+
+    def fetch_bars(self, stock_code: str, timeframe: str = BarStore.DAILY, start_date: str = None, end_date: str = None):
+        """
+        Bars of any stored timeframe ("1m", "5m", "15m", "60m", "1d", "1w")
+        for [start_date, end_date], for TechIndicators / StrategyAnalyzer.
+        Missing days are downloaded once (as 1-minute kbars) and every
+        timeframe is rolled up from them; no extra query per timeframe.
+        """
+        df_daily = self.fetch_daily_k(stock_code, start_date, end_date)
+        if df_daily is None or timeframe == BarStore.DAILY:
+            return df_daily
+        if not start_date:
+            start_date = df_daily.index[0].strftime("%Y-%m-%d") if not df_daily.empty else None
+        df = self.stores[timeframe].load(stock_code, start_date, end_date)
+        if df is None:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        return df
+
+    def _fetch_kbars(self, contract, start_date: str, end_date: str):
+        """
+        Downloads 1-minute kbars for [start_date, end_date].
+        Returns (kbars dict of lists, int64 ts array).
+        """
+        kbars = {**self._request_kbars(contract, start_date, end_date)}
+        return kbars, np.asarray(kbars.get('ts', []), dtype='int64')
+
+    def _merge_intraday(self, stock_code: str, kbars: dict, ts: np.ndarray, start_date: str, end_date: str):
+        """
+        Stores the 1-minute bars and rolls them up into 5/15/60-minute bars.
+        Fetched ranges are whole days and no bucket spans two days, so only
+        the buckets of the fetched days are rebuilt.
+        """
+        if len(ts) == 0:
+            return
+        self.stores["1m"].merge(stock_code, self.aggregate_bars(kbars, ts, ts), start_date, end_date)
+        # Kbars are stamped at the minute's close; buckets are labeled by their start
+        opened = ts - self.MINUTE_NS
+        for timeframe, minutes in self.ROLLUP_MINUTES.items():
+            width = minutes * self.MINUTE_NS
+            rollup = self.aggregate_bars(kbars, ts, opened // width * width)
+            self.stores[timeframe].merge(stock_code, rollup, start_date, end_date)
+
+    def _merge_weekly(self, stock_code: str, start_date: str, end_date: str):
+        """Rebuilds the weekly bars (labeled by Monday) of the weeks touched by [start_date, end_date]."""
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        week_start = (start - timedelta(days=start.weekday())).strftime("%Y-%m-%d")
+        daily = self.store.load(stock_code, week_start, end_date)
+        if daily is None or daily.empty:
+            return
+        ts = daily.index.as_unit('ns').asi8
+        days = ts // self.DAY_NS
+        # 1970-01-01 was a Thursday
+        mondays = (days - (days + 3) % 7) * self.DAY_NS
+        columns = {name: daily[name].to_numpy() for name in daily.columns}
+        self.stores["1w"].merge(stock_code, self.aggregate_bars(columns, ts, mondays), week_start, end_date)
+
+    @staticmethod
+    def aggregate_bars(kbars: dict, ts: np.ndarray, keys: np.ndarray) -> pd.DataFrame:
+        """
+        Folds kbars ({'Open', 'High', 'Low', 'Close', 'Volume'} lists with
+        int64 timestamps `ts`) into one OHLCV bar per distinct key (nanosecond
+        timestamps, e.g. the trading day). Works on sorted runs of equal keys
+        with ufunc.reduceat, so besides the input arrays only one row per
+        output bar is allocated (no calendar grid, no minute DataFrame).
+        Open=first, High=max, Low=min, Close=last, Volume=sum
+        """
+        if len(ts) == 0:
+            return pd.DataFrame()
+        order = None
+        if len(ts) > 1 and (np.diff(ts) < 0).any():
+            order = np.argsort(ts, kind='stable')
+            keys = keys[order]
+
+        def column(name, dtype='float64'):
+            values = np.asarray(kbars[name], dtype=dtype)
+            return values if order is None else values[order]
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)] - 1
+        df = pd.DataFrame({
+            'Open': column('Open')[starts],
+            'High': np.maximum.reduceat(column('High'), starts),
+            'Low': np.minimum.reduceat(column('Low'), starts),
+            'Close': column('Close')[ends],
+            'Volume': np.add.reduceat(column('Volume', 'int64'), starts),
+        }, index=pd.DatetimeIndex(keys[starts].astype('datetime64[ns]'), name='Date'))
+        return df
+
+    def _request_kbars(self, contract, start_date: str, end_date: str):
+        """
+        Calls api.kbars within the shared rate limit.
+        Throttled requests are retried after the limiter backs off.
+        """
+        for attempt in range(Config.FETCH_MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            metrics.inc("shioaji_requests", endpoint="kbars")
+            try:
+                kbars = self.api.kbars(
+                    contract=contract,
+                    start=start_date,
+                    end=end_date
+                )
+            except Exception as e:
+                message = str(e).lower()
+                if attempt == Config.FETCH_MAX_RETRIES or not any(m in message for m in self.THROTTLE_MARKERS):
+                    raise
+                metrics.inc("shioaji_throttled", endpoint="kbars")
+                self.rate_limiter.throttled()
+                continue
+
+            self.rate_limiter.succeeded()
+            return kbars
+
     def get_stock_name(self, stock_code: str) -> str:
         """
         Get stock name from contract.
@@ -0,0 +1,261 @@
+"""
+Offline stand-in for the parts of the Shioaji API this project uses:
+Contracts.Stocks[...], kbars, snapshots and v1 stock tick subscriptions.
+
+Market data is either synthetic (a seeded random walk per stock, identical
+for every run with the same seed) or replayed from recorded 1-minute bars
+in a BarStore directory (data/1m/ as written by DataFetcher with
+STORE_INTRADAY_BARS on). Every query
+sleeps for `latency` seconds and counts against a `quota_requests` per
+`quota_period` window; exceeding it raises the same kind of "too many
+requests" error as the live API, so the fetch pipeline (rate limiter,
+retries, worker pools) can be benchmarked without credentials or network.
+
+Enable it with MARKET_DATA_SOURCE=fake; ShioajiLogin.get_api() then returns
+a FakeShioaji built from the FAKE_SHIOAJI_* settings.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from config import Config
+
+# Mirrors shioaji.constant for the values used with quote.subscribe()
+constant = SimpleNamespace(
+    QuoteType=SimpleNamespace(Tick="tick", BidAsk="bidask", Quote="quote"),
+    QuoteVersion=SimpleNamespace(v0="v0", v1="v1"),
+    Exchange=SimpleNamespace(TSE="TSE", OTC="OTC"),
+)
+
+class FakeStocks:
+    """api.Contracts.Stocks: contract lookup by code (None if unknown, like Shioaji)."""
+
+    def __init__(self, api: 'FakeShioaji'):
+        self.api = api
+        self.contracts = {}
+
+    def __getitem__(self, code: str):
+        code = str(code)
+        if code not in self.contracts:
+            if not self.api.has_stock(code):
+                return None
+            self.contracts[code] = SimpleNamespace(
+                code=code, symbol=f"TSE{code}", name=f"Stock {code}",
+                exchange=constant.Exchange.TSE, category="00", unit=1000,
+                reference=round(self.api.day_anchor(code, pd.Timestamp(datetime.now().date())), 2))
+        return self.contracts[code]
+
+class FakeQuote:
+    """api.quote: tick subscriptions played from the session day's minute bars."""
+
+    def __init__(self, api: 'FakeShioaji'):
+        self.api = api
+        self.callback = None
+        self.subscribed = []
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def set_on_tick_stk_v1_callback(self, callback):
+        self.callback = callback
+
+    def subscribe(self, contract, quote_type: str = constant.QuoteType.Tick, version: str = constant.QuoteVersion.v1):
+        with self.lock:
+            if contract.code not in self.subscribed:
+                self.subscribed.append(contract.code)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._play, daemon=True)
+                self.thread.start()
+
+    def unsubscribe(self, contract, quote_type: str = constant.QuoteType.Tick, version: str = constant.QuoteVersion.v1):
+        with self.lock:
+            if contract.code in self.subscribed:
+                self.subscribed.remove(contract.code)
+
+    def _play(self):
+        """Emits one tick per subscribed stock and session minute, `tick_interval` seconds apart."""
+        day = self.api.session_day()
+        bars = {}
+        for minute in range(self.api.MINUTES_PER_DAY):
+            with self.lock:
+                codes = list(self.subscribed)
+            if not codes:
+                break
+            for code in codes:
+                if code not in bars:
+                    bars[code] = self.api.minute_bars(code, day, day)
+                kbars = bars[code]
+                if minute >= len(kbars['ts']) or self.callback is None:
+                    continue
+                tick = SimpleNamespace(
+                    code=code,
+                    datetime=pd.Timestamp(kbars['ts'][minute]).to_pydatetime(),
+                    open=kbars['Open'][0],
+                    high=max(kbars['High'][:minute + 1]),
+                    low=min(kbars['Low'][:minute + 1]),
+                    close=kbars['Close'][minute],
+                    volume=kbars['Volume'][minute],
+                    total_volume=sum(kbars['Volume'][:minute + 1]),
+                    amount=kbars['Amount'][minute],
+                    simtrade=False,
+                )
+                self.callback(constant.Exchange.TSE, tick)
+            time.sleep(self.api.tick_interval)
+        with self.lock:
+            self.thread = None
+
+class FakeShioaji:
+    # 09:01 .. 13:30, kbars stamped at the minute's close
+    MINUTES_PER_DAY = 270
+    SESSION_OPEN = pd.Timedelta(hours=9)
+    # Synthetic prices walk from this date, so any range gives the same bars
+    EPOCH = pd.Timestamp("2015-01-01")
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, quota_requests: int = None,
+                 quota_period: float = None, data_dir: str = None, tick_interval: float = 0.1):
+        self.seed = seed
+        self.latency = latency
+        self.quota_requests = quota_requests or Config.SHIOAJI_QUOTA_REQUESTS
+        self.quota_period = quota_period or Config.SHIOAJI_QUOTA_PERIOD
+        self.tick_interval = tick_interval
+        self.recorded = None
+        if data_dir:
+            # Imported here so the synthetic mode has no storage dependency
+            from bar_store import BarStore
+            self.recorded = BarStore(data_dir, "1m")
+        self.requests = deque()
+        self.request_count = 0
+        self.throttled_count = 0
+        self.lock = threading.Lock()
+        self.anchors = {}
+        self.Contracts = SimpleNamespace(Stocks=FakeStocks(self))
+        self.quote = FakeQuote(self)
+        self.stock_account = SimpleNamespace(person_id="FAKE", account_id="0000000")
+        self.constant = constant
+
+    @classmethod
+    def from_config(cls) -> 'FakeShioaji':
+        return cls(seed=Config.FAKE_SHIOAJI_SEED, latency=Config.FAKE_SHIOAJI_LATENCY,
+                   data_dir=Config.FAKE_SHIOAJI_DATA_DIR)
+
+    # --- Session ---
+
+    def login(self, api_key: str = None, secret_key: str = None, contracts_cb=None, **kwargs):
+        if contracts_cb:
+            contracts_cb("STK")
+        return [self.stock_account]
+
+    def activate_ca(self, **kwargs):
+        return True
+
+    def logout(self):
+        return True
+
+    # --- Queries ---
+
+    def _request(self):
+        """Applies the quota and the simulated round trip of one market data query."""
+        with self.lock:
+            now = time.monotonic()
+            while self.requests and now - self.requests[0] >= self.quota_period:
+                self.requests.popleft()
+            if len(self.requests) >= self.quota_requests:
+                self.throttled_count += 1
+                raise Exception(f"Too many requests: exceed {self.quota_requests} requests per {self.quota_period:g}s")
+            self.requests.append(now)
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def kbars(self, contract, start: str, end: str, timeout: int = 30000):
+        """1-minute kbars for [start, end] as a dict of lists (ts, Open, High, Low, Close, Volume, Amount)."""
+        self._request()
+        if contract is None:
+            raise ValueError("contract is required")
+        return self.minute_bars(contract.code, pd.Timestamp(start), pd.Timestamp(end))
+
+    def snapshots(self, contracts: list) -> list:
+        """Session-day summary per contract, with the fields of shioaji Snapshot that callers read."""
+        self._request()
+        day = self.session_day()
+        result = []
+        for contract in contracts:
+            kbars = self.minute_bars(contract.code, day, day)
+            if not kbars['ts']:
+                continue
+            close, previous = kbars['Close'][-1], self.day_anchor(contract.code, day)
+            result.append(SimpleNamespace(
+                ts=kbars['ts'][-1], code=contract.code, exchange=contract.exchange,
+                open=kbars['Open'][0], high=max(kbars['High']), low=min(kbars['Low']), close=close,
+                change_price=round(close - previous, 2),
+                change_rate=round((close / previous - 1) * 100, 2) if previous else 0.0,
+                volume=kbars['Volume'][-1], total_volume=sum(kbars['Volume']),
+                amount=kbars['Amount'][-1], total_amount=sum(kbars['Amount']),
+                buy_price=close, sell_price=close,
+            ))
+        return result
+
+    # --- Data ---
+
+    def has_stock(self, code: str) -> bool:
+        if self.recorded is not None:
+            return os.path.exists(self.recorded.path(code))
+        return code.isdigit()
+
+    def session_day(self) -> pd.Timestamp:
+        """Day that snapshots and ticks replay: the latest recorded day, or the last weekday up to today."""
+        today = pd.Timestamp(datetime.now().date())
+        if self.recorded is not None:
+            days = [pd.Timestamp(entry['end']) for entry in self.recorded.manifest.values()]
+            return min(max(days), today) if days else today
+        return today if today.weekday() < 5 else today - pd.offsets.BDay(1)
+
+    def _rng(self, *keys) -> np.random.Generator:
+        return np.random.default_rng([self.seed, *(zlib.crc32(str(key).encode()) for key in keys)])
+
+    def day_anchor(self, code: str, day: pd.Timestamp) -> float:
+        """Synthetic previous close of `day` (a daily random walk from EPOCH)."""
+        with self.lock:
+            anchors = self.anchors.get(code)
+            if anchors is None or day > anchors.index[-1]:
+                days = pd.bdate_range(self.EPOCH, max(day, pd.Timestamp(datetime.now().date())) + pd.offsets.BDay(1))
+                rng = self._rng(code)
+                start = rng.uniform(20, 800)
+                anchors = pd.Series(start * np.exp(np.cumsum(rng.normal(0.0002, 0.018, len(days)))), index=days)
+                self.anchors[code] = anchors
+        return float(anchors.asof(day))
+
+    def minute_bars(self, code: str, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        if self.recorded is not None:
+            df = self.recorded.load(code, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+            if df is None or df.empty:
+                return {'ts': [], 'Open': [], 'High': [], 'Low': [], 'Close': [], 'Volume': [], 'Amount': []}
+            return {
+                'ts': df.index.as_unit('ns').asi8.tolist(),
+                'Open': df['Open'].tolist(), 'High': df['High'].tolist(),
+                'Low': df['Low'].tolist(), 'Close': df['Close'].tolist(),
+                'Volume': df['Volume'].tolist(),
+                'Amount': (df['Close'] * df['Volume']).round(2).tolist(),
+            }
+
+        days = pd.bdate_range(start.normalize(), min(end.normalize(), pd.Timestamp(datetime.now().date())))
+        n = self.MINUTES_PER_DAY
+        columns = {name: [] for name in ['ts', 'Open', 'High', 'Low', 'Close', 'Volume', 'Amount']}
+        for day in days:
+            rng = self._rng(code, day.strftime("%Y%m%d"))
+            path = self.day_anchor(code, day - pd.offsets.BDay(1)) * np.exp(np.cumsum(rng.normal(0, 0.0015, n + 1)))
+            opens, closes = path[:-1], path[1:]
+            wick = 1 + np.abs(rng.normal(0, 0.0008, (2, n)))
+            volume = rng.integers(1, 200, n)
+            columns['ts'].append((day + self.SESSION_OPEN).value + np.arange(1, n + 1) * 60_000_000_000)
+            columns['Open'].append(np.round(opens, 2))
+            columns['High'].append(np.round(np.maximum(opens, closes) * wick[0], 2))
+            columns['Low'].append(np.round(np.minimum(opens, closes) / wick[1], 2))
+            columns['Close'].append(np.round(closes, 2))
+            columns['Volume'].append(volume)
+            columns['Amount'].append(np.round(closes * volume * 1000, 2))
+        return {name: np.concatenate(values).tolist() if values else [] for name, values in columns.items()}
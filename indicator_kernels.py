@@ -0,0 +1,261 @@
+"""
+NumPy indicator kernels over (dates x symbols) float64 arrays.
+
+Each kernel reproduces the pandas_ta 0.4.71b0 function it replaces (and the
+pandas rolling/ewm code underneath it) step for step, including the series
+too short for pandas_ta to return anything. ema/macd/rsi are bit-identical to
+that release; sma (and stoch, which smooths with it) agree to within
+rounding, since pandas_ta 0.4.71b0 sums each window with a BLAS dot product
+whose summation order depends on the BLAS build.
+Columns may start with NaN rows (stocks listed later than others); every
+column is then treated as if its series started at its first valid row.
+"""
+import sys
+import numpy as np
+
+def _first_valid(valid: np.ndarray) -> np.ndarray:
+    """Row of the first non-NaN value per column (len(rows) if none)."""
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), valid.shape[0])
+
+def _blank_short(values: np.ndarray, x: np.ndarray, min_length: int) -> np.ndarray:
+    """NaNs the columns whose series (from its first valid row of x) has fewer than min_length rows."""
+    short = x.shape[0] - _first_valid(~np.isnan(x)) < min_length
+    if short.any():
+        values[:, short] = np.nan
+    return values
+
+def _rolling_count(flags: np.ndarray, window: int) -> np.ndarray:
+    counts = np.cumsum(flags, axis=0, dtype=np.int64)
+    counts[window:] -= counts[:-window].copy()
+    return counts
+
+def _ffill(x: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    idx = np.where(valid, np.arange(x.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(x, idx, axis=0)
+
+def _kahan_rolling_sum(x: np.ndarray, valid: np.ndarray, window: int) -> np.ndarray:
+    """
+    The sequential part of pandas' roll_mean: a running sum where values
+    leaving the window are subtracted and new values added, each side with
+    its own Kahan compensation term. NaNs are skipped.
+    """
+    T, N = x.shape
+    sums = np.empty((T, N))
+    if N == 1:
+        # Plain floats are much faster than 1-element arrays; same IEEE math
+        col = x[:, 0].tolist()
+        ok = valid[:, 0].tolist()
+        total = comp_add = comp_remove = 0.0
+        for i in range(T):
+            if i >= window and ok[i - window]:
+                y = -col[i - window] - comp_remove
+                t = total + y
+                comp_remove = t - total - y
+                total = t
+            if ok[i]:
+                y = col[i] - comp_add
+                t = total + y
+                comp_add = t - total - y
+                total = t
+            sums[i, 0] = total
+        return sums
+
+    has_nan = not valid.all()
+    total = np.zeros(N)
+    comp_add = np.zeros(N)
+    comp_remove = np.zeros(N)
+    for i in range(T):
+        if i >= window:
+            y = -x[i - window] - comp_remove
+            t = total + y
+            if has_nan:
+                m = valid[i - window]
+                comp_remove = np.where(m, t - total - y, comp_remove)
+                total = np.where(m, t, total)
+            else:
+                comp_remove = t - total - y
+                total = t
+        y = x[i] - comp_add
+        t = total + y
+        if has_nan:
+            m = valid[i]
+            comp_add = np.where(m, t - total - y, comp_add)
+            total = np.where(m, t, total)
+        else:
+            comp_add = t - total - y
+            total = t
+        sums[i] = total
+    return sums
+
+def rolling_mean(x: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """Equivalent of DataFrame.rolling(window, min_periods).mean()."""
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    if window == 1:
+        return np.where(valid, x, np.nan) if min_periods <= 1 else np.full(x.shape, np.nan)
+
+    sums = _kahan_rolling_sum(x, valid, window)
+    nobs = _rolling_count(valid, window)
+    neg_ct = _rolling_count(valid & np.signbit(x), window)
+
+    # pandas returns the value itself when the last `nobs` observations are
+    # all equal, to avoid floating point noise on flat series
+    prev_value = _ffill(x, valid)
+    prev_valid = np.vstack([np.full((1, x.shape[1]), np.nan), prev_value[:-1]])
+    changed = valid & ~(x == prev_valid)
+    rows = np.arange(x.shape[0])[:, None]
+    last_change = np.maximum.accumulate(np.where(changed, rows, -1), axis=0)
+    seen = np.cumsum(valid, axis=0, dtype=np.int64)
+    seen_before_change = np.take_along_axis(seen, np.maximum(last_change, 0), axis=0) - 1
+    num_same = np.where(last_change >= 0, seen - seen_before_change, 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / nobs
+    result = np.select(
+        [num_same >= nobs, (neg_ct == 0) & (mean < 0), (neg_ct == nobs) & (mean > 0)],
+        [prev_value, 0.0, 0.0],
+        default=mean
+    )
+    result[(nobs < min_periods) | (nobs == 0)] = np.nan
+    return result
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """Equivalent of DataFrame.rolling(window).min()."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=0).min(axis=-1)
+    return out
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Equivalent of DataFrame.rolling(window).max()."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=0).max(axis=-1)
+    return out
+
+def ewm_mean(x: np.ndarray, com: float, adjust: bool, min_periods: int = 0) -> np.ndarray:
+    """
+    Equivalent of DataFrame.ewm(com=com, adjust=adjust, min_periods=min_periods).mean()
+    (ignore_na=False), following pandas' weighted update including its
+    constant-series shortcut.
+    """
+    T, N = x.shape
+    out = np.empty((T, N))
+    if T == 0:
+        return out
+    min_periods = max(min_periods, 1)
+    alpha = 1. / (1. + com)
+    old_wt_factor = 1. - alpha
+    new_wt = 1. if adjust else alpha
+    valid = ~np.isnan(x)
+    nobs_out = np.cumsum(valid, axis=0, dtype=np.int64)
+
+    if N == 1:
+        col = x[:, 0].tolist()
+        weighted = col[0]
+        old_wt = 1.
+        out[0, 0] = weighted
+        for i in range(1, T):
+            cur = col[i]
+            is_observation = cur == cur
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if is_observation:
+                    if weighted != cur:
+                        weighted = old_wt * weighted + new_wt * cur
+                        weighted /= (old_wt + new_wt)
+                    if adjust:
+                        old_wt += new_wt
+                    else:
+                        old_wt = 1.
+            elif is_observation:
+                weighted = cur
+            out[i, 0] = weighted
+    else:
+        weighted = x[0].copy()
+        old_wt = np.ones(N)
+        out[0] = weighted
+        for i in range(1, T):
+            cur = x[i]
+            is_observation = valid[i]
+            started = weighted == weighted
+            old_wt = np.where(started, old_wt * old_wt_factor, old_wt)
+            observed = started & is_observation
+            update = observed & (weighted != cur)
+            blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+            weighted = np.where(update, blended, weighted)
+            if adjust:
+                old_wt = np.where(observed, old_wt + new_wt, old_wt)
+            else:
+                old_wt = np.where(observed, 1., old_wt)
+            weighted = np.where(~started & is_observation, cur, weighted)
+            out[i] = weighted
+
+    out[nobs_out < min_periods] = np.nan
+    return out
+
+def sma(x: np.ndarray, length: int) -> np.ndarray:
+    """pandas_ta.sma (within rounding, see above)"""
+    return rolling_mean(x, length)
+
+def ema(x: np.ndarray, length: int) -> np.ndarray:
+    """
+    pandas_ta.ema (sma=True, adjust=False): the first value is the simple
+    mean of the first `length` observations, then a recursive EMA.
+    """
+    T, N = x.shape
+    seeded = np.full((T, N), np.nan)
+    first = _first_valid(~np.isnan(x))
+    for j in range(N):
+        f = first[j]
+        if T - f < length:
+            continue # pandas_ta returns None for series shorter than length
+        window = np.ascontiguousarray(x[f:f + length, j])
+        mask = np.isnan(window)
+        count = length - mask.sum()
+        if mask.any():
+            window = np.where(mask, 0., window)
+        seeded[f + length - 1, j] = window.sum() / count if count > 0 else np.nan
+        seeded[f + length:, j] = x[f + length:, j]
+    return ewm_mean(seeded, com=(length - 1) / 2, adjust=False)
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    """pandas_ta.rma: Wilder's smoothing via ewm(alpha=1/length, adjust=False), no warm-up NaNs."""
+    alpha = 1.0 / length
+    return ewm_mean(x, com=(1 - alpha) / alpha, adjust=False)
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9):
+    """pandas_ta.macd -> (MACD, MACDs, MACDh)"""
+    dif = ema(close, fast) - ema(close, slow)
+    dem = ema(dif, signal)
+    # pandas_ta returns None for series shorter than slow + signal - 1
+    for values in (dif, dem):
+        _blank_short(values, close, slow + signal - 1)
+    return dif, dem, dif - dem
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """pandas_ta.rsi (None, i.e. all NaN, for series shorter than length + 1)"""
+    change = np.full(close.shape, np.nan)
+    change[1:] = close[1:] - close[:-1]
+    positive = np.where(change < 0, 0., change)
+    negative = np.where(change > 0, 0., change)
+    positive_avg = rma(positive, length)
+    negative_avg = rma(negative, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _blank_short(100 * positive_avg / (positive_avg + np.abs(negative_avg)), close, length + 1)
+
+def stoch(high: np.ndarray, low: np.ndarray, close: np.ndarray, k: int = 14, d: int = 3, smooth_k: int = 3):
+    """pandas_ta.stoch (mamode='sma') -> (STOCHk, STOCHd); all NaN for series shorter than k + d + smooth_k"""
+    lowest_low = rolling_min(low, k)
+    highest_high = rolling_max(high, k)
+    value = 100 * (close - lowest_low)
+    price_range = highest_high - lowest_low
+    # pandas_ta.utils.non_zero_range: nudge the whole series if any range is 0
+    price_range = np.where((price_range == 0).any(axis=0), price_range + sys.float_info.epsilon, price_range)
+    value /= price_range
+    stoch_k = rolling_mean(value, smooth_k)
+    stoch_d = rolling_mean(stoch_k, d)
+    for values in (stoch_k, stoch_d):
+        _blank_short(values, close, k + d + smooth_k)
+    return stoch_k, stoch_d
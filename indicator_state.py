@@ -0,0 +1,397 @@
+"""
+Streaming (bar by bar) versions of the TechIndicators columns.
+
+Every state mirrors the batch kernel in indicator_kernels step for step,
+so advancing a state over a stock's history yields exactly the values
+TechIndicators.calculate() returns for the last bar, at O(1) cost per new
+bar. States can be checkpointed to JSON and restored the next day.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+from collections import deque
+import numpy as np
+
+NaN = float('nan')
+
+class RollingMeanState:
+    """Streaming DataFrame.rolling(window).mean() (pandas roll_mean with Kahan sums)."""
+
+    def __init__(self, window: int, min_periods: int = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.total = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.num_same = 0
+        self.prev_value = NaN
+
+    def update(self, val: float, commit: bool = True) -> float:
+        total, comp_add, comp_remove = self.total, self.comp_add, self.comp_remove
+        nobs, neg_ct, num_same, prev_value = self.nobs, self.neg_ct, self.num_same, self.prev_value
+
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_remove
+                t = total + y
+                comp_remove = t - total - y
+                total = t
+                if math.copysign(1.0, old) < 0:
+                    neg_ct -= 1
+
+        if val == val:
+            nobs += 1
+            y = val - comp_add
+            t = total + y
+            comp_add = t - total - y
+            total = t
+            if math.copysign(1.0, val) < 0:
+                neg_ct += 1
+            num_same = num_same + 1 if val == prev_value else 1
+            prev_value = val
+
+        if nobs >= self.min_periods and nobs > 0:
+            result = total / nobs
+            if num_same >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        else:
+            result = NaN
+
+        if commit:
+            if len(self.values) == self.window:
+                self.values.popleft()
+            self.values.append(val)
+            self.total, self.comp_add, self.comp_remove = total, comp_add, comp_remove
+            self.nobs, self.neg_ct, self.num_same, self.prev_value = nobs, neg_ct, num_same, prev_value
+        return result
+
+class EwmState:
+    """Streaming DataFrame.ewm(com, adjust).mean() (ignore_na=False)."""
+
+    def __init__(self, com: float, adjust: bool, min_periods: int = 0):
+        self.alpha = 1. / (1. + com)
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NaN
+        self.old_wt = 1.
+        self.nobs = 0
+
+    def update(self, cur: float, commit: bool = True) -> float:
+        weighted, old_wt, nobs = self.weighted, self.old_wt, self.nobs
+        new_wt = 1. if self.adjust else self.alpha
+        is_observation = cur == cur
+        nobs += is_observation
+
+        if weighted == weighted:
+            old_wt *= 1. - self.alpha
+            if is_observation:
+                if weighted != cur:
+                    weighted = old_wt * weighted + new_wt * cur
+                    weighted /= (old_wt + new_wt)
+                if self.adjust:
+                    old_wt += new_wt
+                else:
+                    old_wt = 1.
+        elif is_observation:
+            weighted = cur
+
+        if commit:
+            self.weighted, self.old_wt, self.nobs = weighted, old_wt, nobs
+        return weighted if nobs >= self.min_periods else NaN
+
+class EmaState:
+    """Streaming pandas_ta.ema: seeded with the mean of the first `length` bars."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.seed_values = []
+        self.ewm = EwmState(com=(length - 1) / 2, adjust=False)
+
+    def update(self, val: float, commit: bool = True) -> float:
+        seeding = len(self.seed_values) < self.length
+        if seeding:
+            # Nothing counts until the series' first valid value
+            if not self.seed_values and val != val:
+                return NaN
+            seed_values = self.seed_values + [val]
+            if commit:
+                self.seed_values = seed_values
+            if len(seed_values) < self.length:
+                return NaN
+            # Same reduction as pandas' Series.mean() (pairwise NumPy sum)
+            window = np.array(seed_values)
+            mask = np.isnan(window)
+            count = self.length - int(mask.sum())
+            val = float(np.where(mask, 0., window).sum() / count) if count > 0 else NaN
+        return self.ewm.update(val, commit)
+
+class RsiState:
+    """Streaming pandas_ta.rsi (0.4.71b0: Wilder smoothing via ewm adjust=False)."""
+
+    def __init__(self, length: int):
+        self.prev_close = NaN
+        alpha = 1.0 / length
+        self.positive = EwmState(com=(1 - alpha) / alpha, adjust=False)
+        self.negative = EwmState(com=(1 - alpha) / alpha, adjust=False)
+
+    def update(self, close: float, commit: bool = True) -> float:
+        change = close - self.prev_close
+        positive = 0. if change < 0 else change
+        negative = 0. if change > 0 else change
+        positive_avg = self.positive.update(positive, commit)
+        negative_avg = self.negative.update(negative, commit)
+        if commit:
+            self.prev_close = close
+        denominator = positive_avg + abs(negative_avg)
+        if denominator == 0:
+            return NaN
+        return 100 * positive_avg / denominator
+
+class StochState:
+    """
+    Streaming pandas_ta.stoch (sma smoothing).
+    pandas_ta nudges the whole series by epsilon if any K window has a zero
+    high-low range; a stream cannot see the future, so the nudge applies from
+    the first such bar onwards. After that bar K/D may differ from the batch
+    values in the last bit; stocks that never hit a zero range match exactly.
+    """
+
+    def __init__(self, k: int, d: int, smooth_k: int = 3):
+        self.k = k
+        self.highs = deque()
+        self.lows = deque()
+        self.zero_range_seen = False
+        self.smooth = RollingMeanState(smooth_k)
+        self.signal = RollingMeanState(d)
+
+    def update(self, high: float, low: float, close: float, commit: bool = True):
+        highs = list(self.highs)[-(self.k - 1):] + [high] if self.k > 1 else [high]
+        lows = list(self.lows)[-(self.k - 1):] + [low] if self.k > 1 else [low]
+
+        value = NaN
+        zero_range_seen = self.zero_range_seen
+        if len(highs) == self.k and not any(v != v for v in highs + lows):
+            lowest_low = min(lows)
+            highest_high = max(highs)
+            price_range = highest_high - lowest_low
+            if price_range == 0:
+                zero_range_seen = True
+            if zero_range_seen:
+                price_range += sys.float_info.epsilon
+            value = 100 * (close - lowest_low)
+            value /= price_range
+
+        stoch_k = self.smooth.update(value, commit)
+        stoch_d = self.signal.update(stoch_k, commit)
+        if commit:
+            self.highs = deque(highs, maxlen=self.k)
+            self.lows = deque(lows, maxlen=self.k)
+            self.zero_range_seen = zero_range_seen
+        return stoch_k, stoch_d
+
+class IndicatorState:
+    """
+    All TechIndicators.calculate() columns for one stock, advanced one daily bar at a time.
+    """
+    # Bumped when the saved layout or the indicator semantics change; older checkpoints are rebuilt
+    FORMAT = 2
+
+    def __init__(self, ma_short: int = 10, ma_long: int = 20,
+                 rsi_len: int = 14,
+                 kd_k: int = 9, kd_d: int = 3,
+                 macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9):
+        self.params = {
+            'ma_short': ma_short, 'ma_long': ma_long, 'rsi_len': rsi_len,
+            'kd_k': kd_k, 'kd_d': kd_d,
+            'macd_fast': macd_fast, 'macd_slow': macd_slow, 'macd_signal': macd_signal
+        }
+        self.ma_short = RollingMeanState(ma_short)
+        self.ma_long = RollingMeanState(ma_long)
+        self.ma60 = RollingMeanState(60)
+        self.ema_fast = EmaState(macd_fast)
+        self.ema_slow = EmaState(macd_slow)
+        self.ema_signal = EmaState(macd_signal)
+        self.rsi = RsiState(rsi_len)
+        self.stoch = StochState(kd_k, kd_d)
+        self.last_date = None
+        self.last_values = {'K': NaN, 'D': NaN}
+        # Bars since the first valid close (pandas_ta leaves series that are too short all NaN)
+        self.bars = 0
+        # Hash of the last `fingerprint_bars` folded bars, see IndicatorStateStore.advance()
+        self.fingerprint = None
+        self.fingerprint_bars = 0
+
+    def update(self, date: str, high: float, low: float, close: float, commit: bool = True) -> dict:
+        """
+        Advances the indicators with one bar and returns the latest values
+        (plus the previous bar's K/D for cross detection). With commit=False
+        the state is left untouched, e.g. to evaluate a still-forming bar.
+        """
+        high, low, close = float(high), float(low), float(close)
+        bars = self.bars + 1 if self.bars or close == close else 0
+        dif = self.ema_fast.update(close, commit) - self.ema_slow.update(close, commit)
+        dem = self.ema_signal.update(dif, commit)
+        k, d = self.stoch.update(high, low, close, commit)
+        rsi = self.rsi.update(close, commit)
+        if commit:
+            self.last_date = date
+            self.bars = bars
+            k_prev, d_prev = self.last_values['K'], self.last_values['D']
+            self.last_values = {'K': k, 'D': d}
+        else:
+            k_prev, d_prev = self.last_values['K'], self.last_values['D']
+
+        # The kernels' short-series rule, for a series ending at this bar
+        params = self.params
+        if bars < params['macd_slow'] + params['macd_signal'] - 1:
+            dif = dem = NaN
+        if bars < params['rsi_len'] + 1:
+            rsi = NaN
+        if bars < params['kd_k'] + params['kd_d'] + 3:
+            k = d = NaN
+
+        return {
+            'Date': date,
+            'Close': close,
+            'MA_SHORT': self.ma_short.update(close, commit),
+            'MA_LONG': self.ma_long.update(close, commit),
+            'MA60': self.ma60.update(close, commit),
+            'MACD_DIF': dif,
+            'MACD_DEM': dem,
+            'MACD_OSC': dif - dem,
+            'RSI': rsi,
+            'K': k,
+            'D': d,
+            'K_PREV': k_prev,
+            'D_PREV': d_prev,
+        }
+
+    @classmethod
+    def from_history(cls, df, **params) -> 'IndicatorState':
+        """Builds a state by replaying a daily OHLC DataFrame (index = Date)."""
+        state = cls(**params)
+        for date, high, low, close in zip(df.index.strftime("%Y-%m-%d"), df['High'], df['Low'], df['Close']):
+            state.update(date, high, low, close)
+        return state
+
+    def to_dict(self) -> dict:
+        def dump(obj):
+            if isinstance(obj, deque):
+                return {'__deque__': list(obj), 'maxlen': obj.maxlen}
+            if hasattr(obj, '__dict__'):
+                return {key: dump(value) for key, value in vars(obj).items()}
+            return obj
+        return {**dump(self), 'format': self.FORMAT}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'IndicatorState':
+        state = cls(**data['params'])
+        data = {key: value for key, value in data.items() if key != 'format'}
+
+        def restore(obj, saved):
+            for key, value in saved.items():
+                current = getattr(obj, key)
+                if isinstance(value, dict) and '__deque__' in value:
+                    setattr(obj, key, deque(value['__deque__'], maxlen=value['maxlen']))
+                elif hasattr(current, '__dict__'):
+                    restore(current, value)
+                else:
+                    setattr(obj, key, value)
+        restore(state, data)
+        return state
+
+class IndicatorStateStore:
+    """
+    Per-stock indicator checkpoints under data/state/.
+    Only completed bars are committed; the newest bar is evaluated without
+    committing since it may still be a partial (intraday) session that will
+    be re-fetched.
+    """
+    # Trailing folded bars whose OHLC must be unchanged for a checkpoint to be reused
+    FINGERPRINT_BARS = 60
+
+    @staticmethod
+    def fingerprint(df) -> str:
+        """Hash of the dates and High/Low/Close of `df`'s rows."""
+        digest = hashlib.sha1("|".join(df.index.strftime("%Y-%m-%d")).encode('utf-8'))
+        digest.update(df[['High', 'Low', 'Close']].to_numpy(dtype='float64').tobytes())
+        return digest.hexdigest()
+
+    def __init__(self, state_dir: str = os.path.join("data", "state")):
+        self.state_dir = state_dir
+        if not os.path.exists(self.state_dir):
+            os.makedirs(self.state_dir)
+
+    def path(self, stock_code: str) -> str:
+        return os.path.join(self.state_dir, f"{stock_code}.json")
+
+    def load(self, stock_code: str, params: dict) -> IndicatorState:
+        """Returns the saved state, or None if missing or built with other parameters."""
+        filename = self.path(stock_code)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Indicator state for {stock_code} unreadable, rebuilding: {e}")
+            return None
+        if data.get('params') != params or data.get('format') != IndicatorState.FORMAT:
+            return None
+        return IndicatorState.from_dict(data)
+
+    def save(self, stock_code: str, state: IndicatorState):
+        filename = self.path(stock_code)
+        tmp_path = filename + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp_path, filename)
+
+    def advance(self, stock_code: str, df, **params) -> IndicatorState:
+        """
+        Brings the stock's checkpoint up to the last row of `df` (all rows
+        must be completed bars), saves it, and returns the state.
+        The checkpoint is rebuilt from `df` if it is missing, was built with
+        other parameters, its last bar is not in `df`, or any of the last
+        FINGERPRINT_BARS bars it folded in differ from `df` (revised or
+        adjusted history).
+        """
+        dates = df.index.strftime("%Y-%m-%d")
+        state = self.load(stock_code, IndicatorState(**params).params)
+        position = dates.get_loc(state.last_date) if state and state.last_date in dates else None
+        if position is not None:
+            start = position + 1 - state.fingerprint_bars
+            if start < 0 or self.fingerprint(df.iloc[start:position + 1]) != state.fingerprint:
+                print(f"ℹ️ History of {stock_code} changed since its indicator checkpoint, rebuilding.")
+                position = None
+        if position is None:
+            state = IndicatorState.from_history(df, **params)
+        else:
+            # Commit the completed bars added since the checkpoint
+            pending = df.iloc[position + 1:]
+            for date, high, low, close in zip(dates[position + 1:], pending['High'], pending['Low'], pending['Close']):
+                state.update(date, high, low, close)
+        state.fingerprint_bars = min(self.FINGERPRINT_BARS, len(df))
+        state.fingerprint = self.fingerprint(df.iloc[len(df) - state.fingerprint_bars:])
+        self.save(stock_code, state)
+        return state
+
+    def latest(self, stock_code: str, df, **params) -> dict:
+        """
+        Brings the stock's checkpoint up to the bar before the last row of `df`,
+        saves it, and returns the indicator values for the last row.
+        """
+        state = self.advance(stock_code, df.iloc[:-1], **params)
+        last = df.iloc[-1]
+        return state.update(df.index[-1].strftime("%Y-%m-%d"), last['High'], last['Low'], last['Close'], commit=False)
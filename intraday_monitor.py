@@ -0,0 +1,258 @@
+import queue
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import Config
+from indicator_state import IndicatorStateStore
+from strategy_analyzer import StrategyAnalyzer
+
+class TickReplaySource:
+    """
+    Recorded ticks fed to IntradayMonitor in place of the live feed.
+    Ticks are dicts with code, datetime, close and volume (the columns of
+    a recorded CSV). `speed` replays with the recorded gaps divided by
+    `speed` (e.g. 60 = one minute per second); None replays at once.
+    """
+
+    def __init__(self, ticks, speed: float = None):
+        self.ticks = ticks
+        self.speed = speed
+
+    @classmethod
+    def from_csv(cls, path: str, speed: float = None) -> 'TickReplaySource':
+        df = pd.read_csv(path, dtype={'code': str}, parse_dates=['datetime'])
+        return cls(df.sort_values('datetime', kind='stable').to_dict('records'), speed)
+
+    def stream(self):
+        previous = None
+        for tick in self.ticks:
+            if self.speed and previous is not None:
+                gap = (tick['datetime'] - previous).total_seconds() / self.speed
+                if gap > 0:
+                    time.sleep(gap)
+            previous = tick['datetime']
+            yield tick
+
+    def stop(self):
+        pass
+
+class ShioajiTickSource:
+    """
+    Live stock ticks from Shioaji quote subscriptions (QuoteVersion.v1).
+    Shioaji calls back on its own thread; ticks are handed to the consumer
+    through a queue so the monitor's state is only touched by one thread.
+    The stream ends at Config.INTRADAY_SESSION_END or when stop() is called.
+    """
+
+    def __init__(self, stock_list: list, api=None):
+        self.stock_list = stock_list
+        self.api = api
+        self.ticks = queue.Queue()
+        self.stopped = False
+
+    def _on_tick(self, exchange, tick):
+        self.ticks.put({
+            'code': tick.code,
+            'datetime': tick.datetime,
+            'close': float(tick.close),
+            'volume': int(tick.volume),
+        })
+
+    def stream(self):
+        from shioaji_login import ShioajiLogin
+
+        api = self.api or ShioajiLogin.get_api()
+        # FakeShioaji carries its own constants
+        constant = getattr(api, 'constant', None)
+        if constant is None:
+            import shioaji
+            constant = shioaji.constant
+        api.quote.set_on_tick_stk_v1_callback(self._on_tick)
+        contracts = [api.Contracts.Stocks[code] for code in self.stock_list]
+        for contract in contracts:
+            api.quote.subscribe(contract, quote_type=constant.QuoteType.Tick, version=constant.QuoteVersion.v1)
+        print(f"✅ Subscribed to ticks for {len(contracts)} stocks")
+
+        try:
+            while not self.stopped and datetime.now().strftime("%H:%M") < Config.INTRADAY_SESSION_END:
+                try:
+                    yield self.ticks.get(timeout=1)
+                except queue.Empty:
+                    continue
+        finally:
+            for contract in contracts:
+                api.quote.unsubscribe(contract, quote_type=constant.QuoteType.Tick, version=constant.QuoteVersion.v1)
+            print("ℹ️ Tick subscriptions closed")
+
+    def stop(self):
+        self.stopped = True
+
+class IntradayMonitor:
+    """
+    Re-evaluates the StrategyAnalyzer rules on every tick.
+    Each stock keeps an IndicatorState of its completed daily bars; ticks
+    are folded into today's forming bar, which is evaluated with
+    IndicatorState.update(commit=False), so a tick costs O(1) whatever the
+    history length. `on_change(event)` is called only when a stock's
+    signal colour differs from its previous evaluation (at startup, the
+    last completed bar's signal).
+    """
+
+    def __init__(self, config: dict = {}, on_change=None, state_dir: str = None):
+        self.config = config
+        self.params = StrategyAnalyzer.indicator_params(config)
+        self.on_change = on_change
+        self.state_store = IndicatorStateStore(state_dir or Config.INDICATOR_STATE_DIR)
+        self.states = {}
+        self.bars = {}
+        self.signals = {}
+        self.latency = []
+
+    def prime(self, stock_code: str, df: pd.DataFrame, session_date: str = None):
+        """
+        Loads a stock's daily bars (BarStore / DataFetcher frame) before the
+        session. Bars on or after `session_date` (default today) are dropped:
+        today's bar is rebuilt from ticks.
+        """
+        session_date = session_date or datetime.now().strftime("%Y-%m-%d")
+        history = df[df.index < pd.Timestamp(session_date)]
+        if history.empty:
+            print(f"⚠️ No daily history for {stock_code}, skipping")
+            return
+
+        # Checkpoint up to the day before the last bar, then commit the last
+        # bar here to get its signal as the baseline
+        state = self.state_store.advance(stock_code, history.iloc[:-1], **self.params)
+        last = history.iloc[-1]
+        values = state.update(history.index[-1].strftime("%Y-%m-%d"), last['High'], last['Low'], last['Close'])
+        self.states[stock_code] = state
+        self.signals[stock_code] = StrategyAnalyzer.evaluate_snapshot(values, self.config)['Signal']
+
+    def on_tick(self, tick: dict) -> dict:
+        """
+        Folds one tick into its stock's forming bar and re-evaluates it.
+        Returns the change event, or None if the colour did not change
+        (or the stock was not primed).
+        """
+        code = tick['code']
+        state = self.states.get(code)
+        if state is None:
+            return None
+        started = time.perf_counter()
+
+        price = float(tick['close'])
+        date = pd.Timestamp(tick['datetime']).strftime("%Y-%m-%d")
+        bar = self.bars.get(code)
+        if bar is None or bar['Date'] != date:
+            if bar is not None:
+                # A new session started: the previous forming bar is complete
+                state.update(bar['Date'], bar['High'], bar['Low'], bar['Close'])
+            bar = self.bars[code] = {'Date': date, 'Open': price, 'High': price, 'Low': price, 'Close': price, 'Volume': 0}
+        bar['High'] = max(bar['High'], price)
+        bar['Low'] = min(bar['Low'], price)
+        bar['Close'] = price
+        bar['Volume'] += int(tick.get('volume', 0))
+
+        values = state.update(date, bar['High'], bar['Low'], price, commit=False)
+        result = StrategyAnalyzer.evaluate_snapshot(values, self.config)
+        previous = self.signals.get(code)
+        self.signals[code] = result['Signal']
+        self.latency.append(time.perf_counter() - started)
+
+        if result['Signal'] == previous:
+            return None
+        event = {
+            'Stock': code,
+            'Time': tick['datetime'],
+            'Close': price,
+            'Signal': result['Signal'],
+            'Previous': previous,
+            'Memo': result['Signal_Memo'],
+            'K': values['K'],
+            'D': values['D'],
+            'RSI': values['RSI'],
+        }
+        if self.on_change:
+            self.on_change(event)
+        return event
+
+    def run(self, source) -> list:
+        """Consumes a tick source (TickReplaySource / ShioajiTickSource) until it ends. Returns the change events."""
+        events = []
+        try:
+            for tick in source.stream():
+                event = self.on_tick(tick)
+                if event:
+                    events.append(event)
+        except KeyboardInterrupt:
+            source.stop()
+        return events
+
+    def stats(self) -> dict:
+        """Per-tick evaluation latency in microseconds."""
+        if not self.latency:
+            return {'ticks': 0}
+        latency = np.array(self.latency) * 1e6
+        return {
+            'ticks': len(latency),
+            'mean_us': round(float(latency.mean()), 1),
+            'p99_us': round(float(np.percentile(latency, 99)), 1),
+            'max_us': round(float(latency.max()), 1),
+        }
+
+def format_event(event: dict) -> str:
+    return (f"{event['Signal']} {event['Stock']} @ {event['Close']} "
+            f"({event['Previous'] or '-'} → {event['Signal']}) {event['Memo']} "
+            f"[{pd.Timestamp(event['Time']).strftime('%H:%M:%S')}]")
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    from async_supabase_manager import AsyncSupabaseManager
+    from bar_store import BarStore
+
+    parser = argparse.ArgumentParser(description="Intraday signal monitor on live (or recorded) ticks.")
+    parser.add_argument("--replay", help="CSV of recorded ticks (code, datetime, close, volume) instead of the live feed")
+    parser.add_argument("--speed", type=float, default=None, help="Replay speed multiplier (default: as fast as possible)")
+    parser.add_argument("--notify", action="store_true", help="Push signal changes to LINE")
+    parser.add_argument("stocks", nargs="*", help="Stock codes (default: enabled stocks in Supabase)")
+    args = parser.parse_args()
+
+    async def load_settings():
+        async with AsyncSupabaseManager() as mgr:
+            return await asyncio.gather(mgr.fetch_stock_list(), mgr.fetch_strategy_config())
+
+    stock_list, config = asyncio.run(load_settings())
+    stock_list = args.stocks or stock_list
+
+    notifier = None
+    if args.notify:
+        from line_notifier import LineNotifier
+        notifier = LineNotifier()
+
+    def on_change(event):
+        message = format_event(event)
+        print(message)
+        if notifier:
+            notifier.send_message(message)
+
+    if args.replay:
+        source = TickReplaySource.from_csv(args.replay, args.speed)
+        session_date = pd.Timestamp(source.ticks[0]['datetime']).strftime("%Y-%m-%d") if source.ticks else None
+        store = BarStore()
+        histories = {code: store.load(code) for code in stock_list}
+    else:
+        from data_fetcher import DataFetcher
+        source = ShioajiTickSource(stock_list)
+        session_date = None
+        fetcher = DataFetcher()
+        histories = {code: fetcher.fetch_daily_k(code) for code in stock_list}
+
+    monitor = IntradayMonitor(config, on_change=on_change)
+    for code, df in histories.items():
+        if df is not None:
+            monitor.prime(code, df, session_date)
+    print(f"🚀 Monitoring {len(monitor.states)} stocks...")
+    events = monitor.run(source)
+    print(f"✅ {len(events)} signal changes; tick latency {monitor.stats()}")
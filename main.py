@@ -1,32 +1,88 @@
+import argparse
+import asyncio
 from datetime import datetime
+from urllib import request
+from config import Config
 from market_scanner import MarketScanner
-from supabase_manager import SupabaseManager
+from async_supabase_manager import AsyncSupabaseManager
 from line_notifier import LineNotifier
+from metrics import metrics
+from profiler import SamplingProfiler
 
-def main():
+def notify_signal_refresh():
+    """Tells a running API server to reload its latest-signal cache (skipped if it is not running)."""
+    try:
+        req = request.Request(f"{Config.API_BASE_URL}/api/signals/refresh", method="POST")
+        request.urlopen(req, timeout=5).close()
+        print("✅ API server signal cache refreshed.")
+    except Exception as e:
+        print(f"ℹ️ API server not refreshed ({e}); it reloads within {Config.SIGNAL_CACHE_TTL:.0f}s.")
+
+async def scan_and_save(analysis_workers: int = None):
+    """Steps 1-2: fetches the watchlist and config concurrently, scans, and saves the results."""
+    async with AsyncSupabaseManager() as supabase_manager:
+        with metrics.span("load_settings"):
+            stock_list, config = await asyncio.gather(
+                supabase_manager.fetch_stock_list(), supabase_manager.fetch_strategy_config())
+
+        if not stock_list:
+            print("⚠️ Warning: Stock list is empty. Check Supabase 'stocks' table.")
+
+        scanner = MarketScanner(stock_list=stock_list, config=config, analysis_workers=analysis_workers)
+        with metrics.span("scan"):
+            df = await asyncio.to_thread(scanner.run_scan)
+
+        if df.empty:
+            return df
+
+        # 2. Update Database
+        print("\n[Step 2] Updating Supabase...")
+        with metrics.span("save_results"):
+            await supabase_manager.save_analysis_result(df)
+    return df
+
+def main(profile: bool = False, profile_interval: float = 0.005, profile_top: int = 20):
+    """
+    Runs the daily job and saves a timing/counter report of it to Config.RUN_REPORT_DIR.
+    With profile=True a sampling profile of the run (folded stacks + top-N
+    functions per stage) is saved next to the report; stocks are then
+    analyzed in-process so the indicator and signal stages show up in it.
+    """
+    profiler = SamplingProfiler(profile_interval) if profile else None
+    status = "error"
+    try:
+        if profiler:
+            profiler.start()
+        run_daily(analysis_workers=0 if profiler else None)
+        status = "ok"
+    finally:
+        try:
+            path = metrics.save_report(Config.RUN_REPORT_DIR, status)
+            print(f"📊 Run report saved to {path}")
+        except Exception as e:
+            print(f"⚠️ Failed to save run report: {e}")
+        if profiler:
+            profiler.stop()
+            try:
+                profiler.print_summary(min(profile_top, 10))
+                folded, summary = profiler.save(Config.RUN_REPORT_DIR, top=profile_top)
+                print(f"📊 Profile saved to {folded} and {summary}")
+            except Exception as e:
+                print(f"⚠️ Failed to save profile: {e}")
+
+def run_daily(analysis_workers: int = None):
     print("=== 🚀 AI Stock Assistant Automation Started ===")
     
     # 1. Run Market Scan
     print("\n[Step 1] Scanning Market...")
-    
-    # Initialize SupabaseManager
-    supabase_manager = SupabaseManager()
-    stock_list = supabase_manager.fetch_stock_list()
-    config = supabase_manager.fetch_strategy_config()
-    
-    if not stock_list:
-        print("⚠️ Warning: Stock list is empty. Check Supabase 'stocks' table.")
-    
-    scanner = MarketScanner(stock_list=stock_list, config=config)
-    df = scanner.run_scan()
+    df = asyncio.run(scan_and_save(analysis_workers))
     
     if df.empty:
         print("⚠️ No data found or market closed.")
         return
 
-    # 2. Update Database
-    print("\n[Step 2] Updating Supabase...")
-    supabase_manager.save_analysis_result(df)
+    with metrics.span("signal_refresh"):
+        notify_signal_refresh()
     
     # 3. Send Line Notification
     print("\n[Step 3] Sending Line Notification...")
@@ -50,9 +106,16 @@ def main():
     msg += f"\n🟡 其餘 {len(df) - len(green_stocks) - len(red_stocks)} 檔為黃燈觀望。\n"
     msg += "\n📈 完整報表已更新至 Dashboard / 資料庫。"
     
-    notifier.send_message(msg)
+    with metrics.span("line_push"):
+        notifier.send_message(msg)
     
     print("\n=== ✅ All Tasks Completed Successfully ===")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Daily scan, save and LINE report.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample the run and save a flamegraph-compatible profile next to the run report")
+    parser.add_argument("--profile-interval", type=float, default=5.0, help="Sampling interval in ms")
+    parser.add_argument("--profile-top", type=int, default=20, help="Hot functions kept in the profile summary")
+    args = parser.parse_args()
+    main(profile=args.profile, profile_interval=args.profile_interval / 1000, profile_top=args.profile_top)
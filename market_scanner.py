@@ -1,10 +1,58 @@
 import pandas as pd
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from config import Config
 from data_fetcher import DataFetcher
+from indicator_state import IndicatorStateStore
 from strategy_analyzer import StrategyAnalyzer
+from metrics import metrics
+
+def summarize_stock(code: str, stock_name: str, df: pd.DataFrame, config: dict) -> dict:
+    """
+    Analysis stage: runs the strategy on one stock and returns its summary row.
+    Module-level so it can be pickled into the analysis process pool.
+    """
+    if Config.SCAN_ANALYSIS_MODE == "incremental":
+        # 2. Advance the stock's indicator checkpoint and evaluate today's bar only
+        params = StrategyAnalyzer.indicator_params(config)
+        latest = IndicatorStateStore(Config.INDICATOR_STATE_DIR).latest(code, df, **params)
+        latest.update(StrategyAnalyzer.evaluate_snapshot(latest, config))
+    elif Config.SCAN_ANALYSIS_MODE == "latest":
+        # 2. Analyze just the warm-up window needed for today's bar
+        latest = StrategyAnalyzer.analyze_latest(df, config)
+    else:
+        # 2. Analyze Strategy over the full history
+        df = StrategyAnalyzer.analyze(df, config=config)
+
+        # 3. Get Latest Signal (Today)
+        latest = df.iloc[-1].to_dict()
+        latest['Date'] = df.index[-1].strftime("%Y-%m-%d")
+
+    return {
+        "Stock": code,
+        "Name": stock_name,
+        "Date": latest['Date'],
+        "Close": latest['Close'],
+        "Signal": latest['Signal'],
+        "Memo": latest['Signal_Memo'],
+        "K": round(latest['K'], 2),
+        "D": round(latest['D'], 2),
+        "RSI": round(latest['RSI'], 2),
+        "MA_SHORT": round(latest['MA_SHORT'], 2),
+        "MA_LONG": round(latest['MA_LONG'], 2)
+    }
+
+def timed_summary(code: str, stock_name: str, df: pd.DataFrame, config: dict):
+    """summarize_stock() plus its duration, since spans recorded in a pool worker would stay there."""
+    started = time.perf_counter()
+    row = summarize_stock(code, stock_name, df, config)
+    return row, time.perf_counter() - started
 
 class MarketScanner:
-    def __init__(self, stock_list: list = None, config: dict = {}):
+    def __init__(self, stock_list: list = None, config: dict = {}, max_workers: int = None,
+                 analysis_workers: int = None, queue_size: int = None):
         if stock_list is None:
             # Default list (Top weighted stocks in TWSE)
             self.stock_list = ["2330", "2317", "2454", "2308", "2303"] 
@@ -12,48 +60,101 @@ class MarketScanner:
             self.stock_list = stock_list
             
         self.config = config
+        self.max_workers = max_workers or Config.SCAN_WORKERS
+        # 0 runs the analysis stage inline in the dispatcher thread (no process pool)
+        self.analysis_workers = Config.SCAN_ANALYSIS_WORKERS if analysis_workers is None else analysis_workers
+        # Bounds both the fetched-but-not-analyzed queue and in-flight analysis jobs
+        self.queue_size = queue_size or Config.SCAN_QUEUE_SIZE
+        # A single fetcher (and its rate limiter) is shared by all workers
         self.fetcher = DataFetcher()
 
-    def run_scan(self) -> pd.DataFrame:
+    def _fetch(self, code: str):
+        with metrics.span("fetch", symbol=code):
+            df = self.fetcher.fetch_daily_k(code)
+            stock_name = self.fetcher.get_stock_name(code)
+        return code, stock_name, df
+
+    def _fetch_into(self, index: int, code: str, fetched: queue.Queue, stop: threading.Event):
         """
-        Iterates over the stock list, fetches data, runs analysis,
-        and returns a summary DataFrame of today's signals.
+        Fetch stage: waits on a full queue so fetching never runs far ahead of
+        analysis, and gives up once `stop` is set (the dispatcher has ended).
         """
-        results = []
+        if stop.is_set():
+            return
+        try:
+            _, stock_name, df = self._fetch(code)
+        except Exception as e:
+            print(f"❌ Failed to fetch {code}: {e}")
+            stock_name, df = code, None
+        while not stop.is_set():
+            try:
+                fetched.put((index, code, stock_name, df), timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def run_scan(self, sink=None) -> pd.DataFrame:
+        """
+        Runs the scan as a bounded pipeline: fetch workers (paced by the
+        fetcher's rate limiter) feed a queue, a process pool analyzes each
+        stock as soon as it arrives, and every summary row is streamed to
+        `sink(row)` when it is ready.
+        Returns a summary DataFrame of today's signals.
+        """
+        results = {}
         print(f"🚀 Starting Market Scan for {len(self.stock_list)} stocks...")
 
-        for code in self.stock_list:
+        def emit(index, row):
+            results[index] = row
+            if sink:
+                sink(row)
+
+        fetched = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        fetch_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        analysis_pool = ProcessPoolExecutor(max_workers=self.analysis_workers) if self.analysis_workers > 0 else None
+        pending = {}
+
+        try:
             # 1. Fetch Data
-            df = self.fetcher.fetch_daily_k(code)
-            stock_name = self.fetcher.get_stock_name(code)
-            
-            if df is None or df.empty:
-                print(f"⚠️ No data for {code}")
-                continue
-                
-            # 2. Analyze Strategy
-            df = StrategyAnalyzer.analyze(df, config=self.config)
-            
-            # 3. Get Latest Signal (Today)
-            latest = df.iloc[-1]
-            
-            results.append({
-                "Stock": code,
-                "Name": stock_name,
-                "Date": latest.name.strftime("%Y-%m-%d"),
-                "Close": latest['Close'],
-                "Signal": latest['Signal'],
-                "Memo": latest['Signal_Memo'],
-                "K": round(latest['K'], 2),
-                "D": round(latest['D'], 2),
-                "RSI": round(latest['RSI'], 2)
-            })
-            
-            # Rate limit prevents API throttling
-            time.sleep(1)
+            for index, code in enumerate(self.stock_list):
+                fetch_pool.submit(self._fetch_into, index, code, fetched, stop)
+
+            for _ in range(len(self.stock_list)):
+                # Stream finished analyses while waiting for the next fetch
+                while True:
+                    self._drain([future for future in pending if future.done()], pending, emit)
+                    try:
+                        index, code, stock_name, df = fetched.get(timeout=0.05 if pending else None)
+                        break
+                    except queue.Empty:
+                        continue
 
-        # 4. Create Summary DataFrame
-        summary_df = pd.DataFrame(results)
+                if df is None or df.empty:
+                    metrics.inc("empty_symbols")
+                    print(f"⚠️ No data for {code}")
+                    continue
+
+                if analysis_pool is None:
+                    self._collect(code, lambda: timed_summary(code, stock_name, df, self.config), index, emit)
+                    continue
+
+                future = analysis_pool.submit(timed_summary, code, stock_name, df, self.config)
+                pending[future] = (index, code)
+                if len(pending) >= self.queue_size:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self._drain(done, pending, emit)
+
+            self._drain(as_completed(list(pending)), pending, emit)
+        finally:
+            # Releases fetch workers waiting on a full queue if the dispatcher failed
+            stop.set()
+            fetch_pool.shutdown(cancel_futures=True)
+            if analysis_pool:
+                analysis_pool.shutdown(cancel_futures=True)
+
+        # 4. Create Summary DataFrame (input order)
+        summary_df = pd.DataFrame([results[i] for i in sorted(results)])
         
         # Sort by Signal (Green first for excitement!)
         if not summary_df.empty:
@@ -61,6 +162,22 @@ class MarketScanner:
         
         return summary_df
 
+    def _drain(self, futures, pending: dict, emit):
+        for future in futures:
+            index, code = pending.pop(future)
+            self._collect(code, future.result, index, emit)
+
+    def _collect(self, code: str, get_row, index: int, emit):
+        try:
+            row, seconds = get_row()
+        except Exception as e:
+            metrics.inc("analysis_errors")
+            print(f"❌ Failed to analyze {code}: {e}")
+            return
+        metrics.observe("analyze", seconds, symbol=code)
+        metrics.inc("signals", signal=row['Signal'])
+        emit(index, row)
+
 if __name__ == "__main__":
     # Test Run
     scanner = MarketScanner() # Default list
@@ -0,0 +1,150 @@
+"""
+Process-wide timing spans and counters.
+
+    from metrics import metrics
+    with metrics.span("fetch", symbol="2330"):
+        ...
+    metrics.inc("shioaji_requests", endpoint="kbars")
+
+Spans are summarized per (name, labels) as count / total / max seconds.
+`symbol` is kept out of the summary labels (one series per stock would
+swamp Prometheus) and goes to the per-symbol breakdown of the run report
+instead. main.py saves report() as JSON at the end of every run; server.py
+serves prometheus() on /metrics.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+class Metrics:
+    PREFIX = "stock_assistant"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.timings = {}
+        self.counters = {}
+        self.symbols = {}
+        # Open span names per thread, innermost last (read by the profiler)
+        self.open_spans = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    @contextmanager
+    def span(self, name: str, symbol: str = None, **labels):
+        """Times the block; failed blocks are counted with error="true"."""
+        thread = threading.get_ident()
+        with self.lock:
+            self.open_spans.setdefault(thread, []).append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.perf_counter() - started, symbol=symbol, error="true", **labels)
+            raise
+        finally:
+            with self.lock:
+                spans = self.open_spans[thread]
+                spans.pop()
+                if not spans:
+                    del self.open_spans[thread]
+        self.observe(name, time.perf_counter() - started, symbol=symbol, **labels)
+
+    def current_span(self, thread: int) -> str:
+        """Innermost open span of a thread (by threading ident), or None."""
+        with self.lock:
+            spans = self.open_spans.get(thread)
+            return spans[-1] if spans else None
+
+    def observe(self, name: str, seconds: float, symbol: str = None, **labels):
+        """Records a duration measured elsewhere (e.g. in a worker process)."""
+        key = self._key(name, labels)
+        with self.lock:
+            timing = self.timings.setdefault(key, {'count': 0, 'total': 0.0, 'max': 0.0})
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            if symbol is not None:
+                stages = self.symbols.setdefault(str(symbol), {})
+                stages[name] = stages.get(name, 0.0) + seconds
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def report(self, status: str = "ok", slowest: int = 20) -> dict:
+        """Machine-readable summary of the run so far."""
+        with self.lock:
+            stages = [{'name': name, 'labels': dict(labels), 'count': t['count'],
+                       'seconds': round(t['total'], 4), 'max_seconds': round(t['max'], 4)}
+                      for (name, labels), t in sorted(self.timings.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            symbols = {code: {name: round(seconds, 4) for name, seconds in per_stage.items()}
+                       for code, per_stage in self.symbols.items()}
+        ranked = sorted(symbols.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return {
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'status': status,
+            'stages': stages,
+            'counters': counters,
+            'slowest_symbols': [{'symbol': code, **timings} for code, timings in ranked[:slowest]],
+            'symbols': symbols,
+        }
+
+    def save_report(self, report_dir: str, status: str = "ok") -> str:
+        """Writes report() to report_dir/run-YYYYmmdd-HHMMSS.json and returns the path."""
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+        path = os.path.join(report_dir, f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(status), f, ensure_ascii=False, indent=2)
+        return path
+
+    @staticmethod
+    def _labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition: spans as <name>_seconds summaries (+ _max), counters as <name>_total."""
+        lines = []
+        with self.lock:
+            timings = sorted(self.timings.items())
+            counters = sorted(self.counters.items())
+
+        # Each family's lines must be contiguous
+        families = {}
+        for (name, labels), t in timings:
+            families.setdefault(f"{self.PREFIX}_{name}_seconds", []).append((labels, t))
+        for metric, series in families.items():
+            lines.append(f"# TYPE {metric} summary")
+            for labels, t in series:
+                lines.append(f"{metric}_count{self._labels(labels)} {t['count']}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {t['total']:.6f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines += [f"{metric}_max{self._labels(labels)} {t['max']:.6f}" for labels, t in series]
+
+        families = {}
+        for (name, labels), value in counters:
+            families.setdefault(f"{self.PREFIX}_{name}_total", []).append((labels, value))
+        for metric, series in families.items():
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f"{metric}{self._labels(labels)} {value:g}" for labels, value in series]
+        uptime = f"{self.PREFIX}_uptime_seconds"
+        lines += [f"# TYPE {uptime} gauge", f"{uptime} {time.perf_counter() - self.started:.3f}"]
+        return "\n".join(lines) + "\n"
+
+# Shared by every module of the process
+metrics = Metrics()
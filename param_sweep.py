@@ -0,0 +1,272 @@
+import itertools
+import math
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import indicator_kernels as kernels
+from backtester import Backtester
+from strategy_analyzer import StrategyAnalyzer
+from tech_indicators import TechIndicators
+
+# strategy_params values tried when no grid is given
+DEFAULT_GRID = {
+    'MA_SHORT_DAYS': [5, 10, 20],
+    'MA_LONG_DAYS': [20, 40, 60],
+    'RSI_THRESHOLD': [70, 75, 80, 85],
+    'KD_THRESHOLD': [30, 40, 50],
+    'MACD_FAST': [8, 12],
+    'MACD_SLOW': [21, 26],
+    'MACD_SIGNAL': [9],
+}
+
+# Arrays of the current sweep, attached by each pool worker from shared memory
+_arrays = {}
+_segments = []
+
+def _attach(layout: dict):
+    """Pool initializer: maps the parent's shared-memory arrays without copying."""
+    for name, (segment_name, shape) in layout.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _segments.append(segment)
+        _arrays[name] = np.ndarray(shape, dtype='float64', buffer=segment.buf)
+
+def _evaluate_chunk(configs: list, windows: list, fee_rate: float, tax_rate: float) -> list:
+    return [ParamSweep.evaluate(_arrays, config, windows, fee_rate, tax_rate) for config in configs]
+
+class ParamSweep:
+    """
+    Grid search over strategy_params on a BarStore.load_panel() panel.
+    Every distinct indicator in the grid (e.g. the SMA of each length, the
+    MACD histogram of each fast/slow/signal triple) is computed once for the
+    whole watchlist. The arrays are placed in shared memory, and worker
+    processes evaluate parameter combinations against them with the
+    Backtester, on walk-forward train/test windows.
+    """
+
+    def __init__(self, panel: dict, grid: dict = None, splits: int = 0, train_bars: int = 500,
+                 test_bars: int = 120, workers: int = None, fee_rate: float = None, tax_rate: float = None):
+        self.panel = panel
+        self.grid = grid or DEFAULT_GRID
+        # splits=0 evaluates each combination once over the whole history
+        self.splits = splits
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        # 0 evaluates inline without a process pool
+        self.workers = workers
+        self.fee_rate = fee_rate
+        self.tax_rate = tax_rate
+
+    def combinations(self) -> list:
+        """All grid configs, skipping ones where the short MA/EMA is not shorter than the long one."""
+        keys = list(self.grid)
+        configs = [dict(zip(keys, values)) for values in itertools.product(*self.grid.values())]
+        return [c for c in configs
+                if c.get('MA_SHORT_DAYS', 10) < c.get('MA_LONG_DAYS', 20)
+                and c.get('MACD_FAST', 12) < c.get('MACD_SLOW', 26)]
+
+    def windows(self, T: int) -> list:
+        """
+        Walk-forward (train, test) row ranges: the last `splits` blocks of
+        test_bars rows are each tested after training on the train_bars rows
+        before them. Without splits there is a single test window over all rows.
+        """
+        if self.splits <= 0:
+            return [(None, (0, T))]
+        windows = []
+        for i in range(self.splits, 0, -1):
+            test_start = T - i * self.test_bars
+            train_start = test_start - self.train_bars
+            if train_start < 0:
+                continue
+            windows.append(((train_start, test_start), (test_start, test_start + self.test_bars)))
+        if not windows:
+            raise ValueError(f"Not enough history ({T} bars) for {self.splits} splits of {self.train_bars}+{self.test_bars} bars")
+        return windows
+
+    def indicator_cache(self, combinations: list) -> dict:
+        """
+        Computes each distinct indicator the combinations need once.
+        Returns {name: dates x stocks float64 array}: Close (forward-filled),
+        Traded, SMA_<n>, OSC_<fast>_<slow>_<signal>, RSI, K, D, K_PREV and D_PREV.
+        """
+        close_df = self.panel['Close']
+        index, columns = close_df.index, close_df.columns
+        close = close_df.to_numpy(dtype='float64')
+        high = self.panel['High'].reindex(index=index, columns=columns).to_numpy(dtype='float64')
+        low = self.panel['Low'].reindex(index=index, columns=columns).to_numpy(dtype='float64')
+
+        params = [StrategyAnalyzer.indicator_params(config) for config in combinations]
+        sma_lengths = sorted({p['ma_short'] for p in params} | {p['ma_long'] for p in params})
+        macd_triples = sorted({(p['macd_fast'], p['macd_slow'], p['macd_signal']) for p in params})
+
+        def compute(c, h, l):
+            result = {f'SMA_{n}': kernels.sma(c, n) for n in sma_lengths}
+            emas = {n: kernels.ema(c, n) for n in sorted({n for triple in macd_triples for n in triple[:2]})}
+            for fast, slow, signal in macd_triples:
+                dif = emas[fast] - emas[slow]
+                result[f'OSC_{fast}_{slow}_{signal}'] = dif - kernels.ema(dif, signal)
+            # RSI and KD lengths are not strategy_params, so they are shared by every combination
+            result['RSI'] = kernels.rsi(c, 14)
+            result['K'], result['D'] = kernels.stoch(h, l, c, k=9, d=3)
+            return result
+
+        cache = TechIndicators.apply_panel(compute, close, high, low)
+        traded = pd.DataFrame(~np.isnan(close), index=index, columns=columns)
+        for name in ['K', 'D']:
+            frame = pd.DataFrame(cache[name], index=index, columns=columns)
+            cache[f'{name}_PREV'] = StrategyAnalyzer.previous_bar(frame, traded).to_numpy()
+        cache['Close'] = close_df.ffill().to_numpy(dtype='float64')
+        cache['Traded'] = traded.to_numpy(dtype='float64')
+        return cache
+
+    @staticmethod
+    def evaluate(arrays: dict, config: dict, windows: list, fee_rate: float = None, tax_rate: float = None) -> dict:
+        """Backtests one parameter combination on every window; returns one ranked-table row."""
+        params = StrategyAnalyzer.indicator_params(config)
+        osc = f"OSC_{params['macd_fast']}_{params['macd_slow']}_{params['macd_signal']}"
+        traded = arrays['Traded'] > 0
+        green, red = StrategyAnalyzer.signal_masks({
+            'Close': np.where(traded, arrays['Close'], np.nan),
+            'MA_SHORT': arrays[f"SMA_{params['ma_short']}"],
+            'MA_LONG': arrays[f"SMA_{params['ma_long']}"],
+            'MACD_OSC': arrays[osc],
+            'RSI': arrays['RSI'],
+            'K': arrays['K'], 'D': arrays['D'],
+            'K_PREV': arrays['K_PREV'], 'D_PREV': arrays['D_PREV'],
+        }, config)
+
+        def stats(start: int, end: int) -> dict:
+            # Each window starts flat
+            held = Backtester.hold(green[start:end], red[start:end])
+            simulation = Backtester.simulate(arrays['Close'][start:end], held, fee_rate, tax_rate)
+            trips = Backtester.round_trips(simulation, held)
+            result = Backtester.portfolio_stats(simulation['returns'])
+            result['Trades'] = len(trips['returns'])
+            result['Wins'] = int((trips['returns'] > 0).sum())
+            return result
+
+        row = dict(config)
+        tests = []
+        for i, (train, test) in enumerate(windows):
+            if train is not None:
+                row[f'Train_Sharpe_{i + 1}'] = stats(*train)['Sharpe']
+            tests.append(stats(*test))
+            row[f'Test_Sharpe_{i + 1}'] = tests[-1]['Sharpe']
+
+        trades = sum(t['Trades'] for t in tests)
+        row['Test_Return'] = math.prod(1 + t['Total_Return'] for t in tests) - 1
+        row['Test_Sharpe'] = float(np.mean([t['Sharpe'] for t in tests]))
+        row['Test_Max_Drawdown'] = min(t['Max_Drawdown'] for t in tests)
+        row['Trades'] = trades
+        row['Win_Rate'] = sum(t['Wins'] for t in tests) / trades if trades else np.nan
+        return row
+
+    def run(self, score: str = 'Test_Sharpe') -> pd.DataFrame:
+        """
+        Evaluates every combination and returns them ranked by `score`
+        (best first). With splits, Train_Sharpe_<i>/Test_Sharpe_<i> hold the
+        in-sample and out-of-sample result of each walk-forward window;
+        walk_forward() picks the best in-sample combination per window.
+        """
+        combinations = self.combinations()
+        cache = self.indicator_cache(combinations)
+        windows = self.windows(len(cache['Close']))
+        print(f"🚀 Sweeping {len(combinations)} parameter combinations over "
+              f"{cache['Close'].shape[1]} stocks x {len(cache['Close'])} days, {len(windows)} window(s)...")
+
+        if self.workers == 0:
+            rows = [self.evaluate(cache, config, windows, self.fee_rate, self.tax_rate) for config in combinations]
+        else:
+            rows = self._run_pool(cache, combinations, windows)
+
+        table = pd.DataFrame(rows).sort_values(score, ascending=False, kind='stable').reset_index(drop=True)
+        table.index = pd.RangeIndex(1, len(table) + 1, name='Rank')
+        self.table = table
+        return table
+
+    def _run_pool(self, cache: dict, combinations: list, windows: list) -> list:
+        segments = []
+        try:
+            layout = {}
+            for name, values in cache.items():
+                segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                segments.append(segment)
+                np.ndarray(values.shape, dtype='float64', buffer=segment.buf)[:] = values
+                layout[name] = (segment.name, values.shape)
+
+            # None means one worker per CPU, as ProcessPoolExecutor does
+            workers = self.workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(layout,)) as pool:
+                chunk_size = max(1, len(combinations) // (workers * 4))
+                chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+                futures = [pool.submit(_evaluate_chunk, chunk, windows, self.fee_rate, self.tax_rate) for chunk in chunks]
+                return [row for future in futures for row in future.result()]
+        finally:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+
+    def walk_forward(self) -> pd.DataFrame:
+        """
+        For each window of the last run(): the combination with the best
+        in-sample Sharpe and how it did out of sample.
+        """
+        table = self.table
+        keys = list(self.grid)
+        rows = []
+        for i in range(1, self.splits + 1):
+            if f'Train_Sharpe_{i}' not in table:
+                break
+            best = table.loc[table[f'Train_Sharpe_{i}'].idxmax()]
+            rows.append({'Window': i, **{k: int(best[k]) for k in keys},
+                         'Train_Sharpe': best[f'Train_Sharpe_{i}'], 'Test_Sharpe': best[f'Test_Sharpe_{i}']})
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def best_config(table: pd.DataFrame, grid: dict = None) -> dict:
+        """The top-ranked row as a strategy_params dict."""
+        keys = list(grid or DEFAULT_GRID)
+        best = table.iloc[0]
+        return {key: int(best[key]) for key in keys if key in best}
+
+    @staticmethod
+    def push_best(table: pd.DataFrame, grid: dict = None, supabase_manager=None) -> bool:
+        """Saves the top-ranked combination to the strategy_params table."""
+        if supabase_manager is None:
+            from supabase_manager import SupabaseManager
+            supabase_manager = SupabaseManager()
+        config = ParamSweep.best_config(table, grid)
+        print(f"ℹ️ Pushing best parameters: {config}")
+        return supabase_manager.save_strategy_config(config)
+
+if __name__ == "__main__":
+    import argparse
+    from bar_store import BarStore
+
+    parser = argparse.ArgumentParser(description="Sweep strategy_params over cached history")
+    parser.add_argument("codes", nargs="*", default=["2330", "2317", "2454", "2308", "2303"])
+    parser.add_argument("--splits", type=int, default=0, help="walk-forward windows (0 = whole history)")
+    parser.add_argument("--train-bars", type=int, default=500)
+    parser.add_argument("--test-bars", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="param_sweep.csv")
+    parser.add_argument("--push", action="store_true", help="save the best combination to strategy_params")
+    args = parser.parse_args()
+
+    panel = BarStore().load_panel(args.codes)
+    if panel['Close'].empty:
+        print("Data file not found. Please run data_fetcher.py first.")
+    else:
+        sweep = ParamSweep(panel, splits=args.splits, train_bars=args.train_bars,
+                           test_bars=args.test_bars, workers=args.workers)
+        table = sweep.run()
+        table.to_csv(args.output, encoding='utf-8-sig')
+        print(table.head(10).round(4).to_string())
+        if args.splits:
+            print("\n--- Walk-forward picks ---")
+            print(sweep.walk_forward().round(4).to_string(index=False))
+        print(f"\n✅ Ranked table saved to {args.output}")
+        if args.push:
+            ParamSweep.push_best(table)
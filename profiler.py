@@ -0,0 +1,172 @@
+"""
+Opt-in sampling profiler for the daily job and the API server.
+
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    ...
+    profiler.stop()
+    profiler.save(Config.RUN_REPORT_DIR)  # profile-<time>.folded + profile-<time>.json
+
+A background thread snapshots every thread's stack (sys._current_frames())
+each `interval` seconds; threads that are not running code of this project
+(idle pool workers, the event loop's selector alone) are skipped. Each sample
+is attributed to a stage by the innermost project module on its stack
+that is listed in STAGE_MODULES, falling back to the thread's open metrics span, e.g.
+"save_results" while the event loop waits on Supabase. Samples are wall
+clock: a fetch thread sleeping on the rate limiter counts too, and stage
+seconds add up across threads.
+
+The .folded file has one "stage;outer;...;inner count" line per distinct
+stack (Brendan Gregg's folded format), ready for flamegraph.pl or
+speedscope. The .json file holds the per-stage sample counts and the top-N
+functions by self and total time.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from metrics import metrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Project module -> stage its frames belong to
+STAGE_MODULES = {
+    'data_fetcher': 'fetch',
+    'bar_store': 'fetch',
+    'rate_limiter': 'fetch',
+    'fake_shioaji': 'fetch',
+    'tech_indicators': 'indicators',
+    'indicator_kernels': 'indicators',
+    'indicator_state': 'indicators',
+    'strategy_analyzer': 'signals',
+    'supabase_manager': 'persistence',
+    'async_supabase_manager': 'persistence',
+    'line_notifier': 'notify',
+    'market_scanner': 'scan',
+    'chart_data': 'chart',
+}
+
+# metrics span -> stage, for threads with no mapped module on their stack
+SPAN_STAGES = {
+    'load_settings': 'persistence',
+    'save_results': 'persistence',
+    'signal_refresh': 'notify',
+    'line_push': 'notify',
+}
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.started = None
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread, frame in sys._current_frames().items():
+                if thread != me:
+                    self._sample(thread, frame)
+
+    def _sample(self, thread: int, frame):
+        codes = []
+        stage = None
+        in_project = False
+        while frame is not None:
+            code = frame.f_code
+            codes.append(code)
+            if not stage and os.path.dirname(code.co_filename) == ROOT:
+                in_project = True
+                stage = STAGE_MODULES.get(os.path.splitext(os.path.basename(code.co_filename))[0])
+            frame = frame.f_back
+        if not in_project:
+            return
+        if not stage:
+            span = metrics.current_span(thread)
+            stage = SPAN_STAGES.get(span, span) or "other"
+        self.samples[(stage, tuple(reversed(codes)))] += 1
+
+    @staticmethod
+    def _frame_name(code) -> str:
+        path = os.path.relpath(code.co_filename, ROOT) if code.co_filename.startswith(ROOT) else os.path.basename(code.co_filename)
+        return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+    def folded(self) -> str:
+        """Folded stacks, one "stage;frame;...;frame count" line per distinct stack."""
+        lines = Counter()
+        for (stage, codes), count in self.samples.items():
+            lines[";".join([stage] + [self._frame_name(code).replace(";", ",") for code in codes])] += count
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(lines.items()))
+
+    def summary(self, top: int = 20) -> dict:
+        """Samples per stage and the top-N functions by self (innermost frame) and total samples."""
+        stages = Counter()
+        own = Counter()
+        total = Counter()
+        for (stage, codes), count in self.samples.items():
+            stages[stage] += count
+            own[codes[-1]] += count
+            for code in set(codes):
+                total[code] += count
+
+        def ranked(counter):
+            return [{'function': self._frame_name(code), 'samples': count,
+                     'seconds': round(count * self.interval, 3)} for code, count in counter.most_common(top)]
+
+        return {
+            'seconds': round(self.seconds, 3),
+            'interval': self.interval,
+            'samples': sum(stages.values()),
+            'stages': {stage: {'samples': count, 'seconds': round(count * self.interval, 3)}
+                       for stage, count in stages.most_common()},
+            'top_self': ranked(own),
+            'top_total': ranked(total),
+        }
+
+    def save(self, report_dir: str, prefix: str = "profile", top: int = 20) -> tuple:
+        """Writes <prefix>-YYYYmmdd-HHMMSS.folded and .json to report_dir; returns both paths."""
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir)
+        base = os.path.join(report_dir, f"{prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        # Several profiles within one second (e.g. profiled requests) get -2, -3, ...
+        stem, n = base, 1
+        while os.path.exists(f"{base}.folded"):
+            n += 1
+            base = f"{stem}-{n}"
+        with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump(self.summary(top), f, ensure_ascii=False, indent=2)
+        return f"{base}.folded", f"{base}.json"
+
+    def print_summary(self, top: int = 10):
+        summary = self.summary(top)
+        print(f"\n📊 Profile: {summary['samples']} samples every {self.interval * 1000:g} ms over {summary['seconds']}s")
+        for stage, values in summary['stages'].items():
+            print(f"  {stage:<12} {values['seconds']:>8.2f}s  ({values['samples']} samples)")
+        print(f"  Top {top} functions by self time:")
+        for item in summary['top_self']:
+            print(f"  {item['seconds']:>8.2f}s  {item['function']}")
@@ -0,0 +1,55 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all fetch workers.
+    Allows `capacity` requests per `period` seconds with bursts up to `capacity`.
+    When the API reports throttling the refill rate is halved (multiplicative
+    decrease) and the bucket is drained; each successful request then nudges
+    the rate back towards its nominal value (additive increase).
+    `clock` and `sleep` default to time.monotonic / time.sleep (tests pass fakes).
+    """
+
+    def __init__(self, capacity: int, period: float, min_rate_ratio: float = 0.1,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.capacity = float(capacity)
+        self.nominal_rate = capacity / period # tokens per second
+        self.min_rate = self.nominal_rate * min_rate_ratio
+        self.rate = self.nominal_rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens: float = 1):
+        """Blocks until `tokens` are available, then consumes them."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def throttled(self):
+        """Call when the API rejected a request for exceeding its quota."""
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+        print(f"⚠️ Rate limited by API, slowing down to {self.rate:.2f} req/s")
+
+    def succeeded(self):
+        """Call after a successful request to recover the nominal rate."""
+        if self.rate >= self.nominal_rate:
+            return
+        with self.lock:
+            self.rate = min(self.nominal_rate, self.rate + self.nominal_rate / self.capacity)
@@ -1,14 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.responses import JSONResponse
-from supabase_manager import SupabaseManager
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from async_supabase_manager import AsyncSupabaseManager
+from signal_cache import LatestSignalCache
+from chart_data import ChartData
+from config_cache import ConfigCache
+from bar_store import BarStore
+from config import Config
+from metrics import metrics
+from profiler import SamplingProfiler
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import time
 import uvicorn
 import logging
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled Supabase connections on shutdown
+    await supabase_manager.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -19,6 +37,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Chart series are large and repetitive JSON
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route template (/api/chart/{stock_code}) keeps one series per endpoint
+    route = request.scope.get("route")
+    path = route.path if route else "unmatched"
+    metrics.observe("http_request", time.perf_counter() - started, method=request.method, route=path)
+    metrics.inc("http_responses", method=request.method, route=path, status=response.status_code)
+    return response
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    With Config.PROFILE_REQUESTS on, ?profile=1 or an X-Profile: 1 header
+    samples the request and saves the profile to Config.RUN_REPORT_DIR; the
+    X-Profile-Report response header names the .folded file. The sampler
+    sees the whole process, so profile while the server is otherwise idle.
+    """
+    if not Config.PROFILE_REQUESTS or "1" not in (request.query_params.get("profile"), request.headers.get("x-profile")):
+        return await call_next(request)
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    # Runs the file writes off the event loop
+    folded, _ = await asyncio.to_thread(profiler.save, Config.RUN_REPORT_DIR, "request-profile")
+    response.headers["X-Profile-Report"] = folded
+    return response
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     logging.error(f"Validation error: {exc}")
@@ -27,7 +81,20 @@ async def validation_exception_handler(request, exc):
         content={"detail": exc.errors(), "body": exc.body},
     )
 
-supabase_manager = SupabaseManager()
+# One pooled HTTP client shared by all requests
+supabase_manager = AsyncSupabaseManager()
+signal_cache = LatestSignalCache(partial(supabase_manager.fetch_latest_results, raise_errors=True),
+                                 ttl=Config.SIGNAL_CACHE_TTL)
+chart_data = ChartData()
+config_cache = ConfigCache({
+    "stock_list": partial(supabase_manager.fetch_all_stocks, raise_errors=True),
+    "strategy": partial(supabase_manager.fetch_strategy_config_full, raise_errors=True),
+}, ttl=Config.CONFIG_CACHE_TTL)
+
+async def strategy_config() -> dict:
+    """strategy_params as {param_key: value}, from the cached config payload."""
+    payload, _ = await config_cache.get()
+    return {item["Parameter"]: item["Value"] for item in payload["strategy"]}
 
 from typing import Union, Optional
 
@@ -42,24 +109,23 @@ class StrategyConfig(BaseModel):
     config: dict
 
 @app.get("/api/config")
-def get_config():
-    """Fetches current stock list and strategy config."""
+async def get_config(request: Request):
+    """
+    Fetches current stock list and strategy config.
+    Served from an in-process cache with an ETag; a matching If-None-Match gets 304.
+    """
     try:
-        # Fetch raw records including disabled ones
-        raw_stocks = supabase_manager.fetch_all_stocks()
-        
-        # Strategy
-        strategy = supabase_manager.fetch_strategy_config_full()
-        
-        return {
-            "stock_list": raw_stocks,
-            "strategy": strategy
-        }
+        payload, etag = await config_cache.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if ConfigCache.matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
 @app.post("/api/save_stock_list")
-def save_stock_list(items: list[StockItem]):
+async def save_stock_list(items: list[StockItem]):
     """Saves the full stock list."""
     # Convert Pydantic models to clean dicts
     data = []
@@ -69,19 +135,88 @@ def save_stock_list(items: list[StockItem]):
         # It handles conversion of Enabled
         data.append(row)
 
-    success = supabase_manager.save_stock_list(data)
+    success = await supabase_manager.save_stock_list(data)
+    config_cache.invalidate()
     if not success:
         raise HTTPException(status_code=500, detail="Failed to save stock list")
     return {"status": "success"}
 
 @app.post("/api/save_strategy")
-def save_strategy(data: StrategyConfig):
+async def save_strategy(data: StrategyConfig):
     """Saves strategy configuration."""
-    success = supabase_manager.save_strategy_config(data.config)
+    success = await supabase_manager.save_strategy_config(data.config)
+    config_cache.invalidate()
     if not success:
         raise HTTPException(status_code=500, detail="Failed to save strategy")
     return {"status": "success"}
 
+@app.get("/api/signals/latest")
+async def get_latest_signals(signal: Optional[str] = None,
+                             sort: str = "Stock",
+                             order: str = "asc",
+                             limit: int = Query(50, ge=1, le=500),
+                             cursor: Optional[str] = None):
+    """
+    Latest signal per stock, from the in-process cache.
+    Filter with signal=green|red|yellow, order with sort/order, and pass
+    next_cursor back as cursor for the following page.
+    """
+    try:
+        return await signal_cache.page(signal=signal, sort=sort, order=order, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/signals/refresh")
+async def refresh_signals():
+    """Reloads the latest-signal cache; called by main.py after a scan is saved."""
+    try:
+        count = await signal_cache.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refresh signals: {e}")
+    return {"status": "success", "stocks": count}
+
+@app.get("/api/chart/{stock_code}")
+async def get_chart(stock_code: str,
+              start: Optional[str] = None,
+              end: Optional[str] = None,
+              timeframe: str = "1d",
+              points: int = Query(500, ge=2, le=5000),
+              method: str = "ohlc",
+              format: str = "json"):
+    """
+    OHLCV plus MA/MACD/RSI/KD series for one stock from the local bar store,
+    downsampled to at most `points` bars (method=ohlc buckets or lttb).
+    format=json returns columnar JSON; format=arrow an Arrow IPC stream.
+    """
+    if timeframe not in BarStore.TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"timeframe must be one of {BarStore.TIMEFRAMES}")
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
+    try:
+        config = await strategy_config()
+    except Exception as e:
+        # The bars are local; a Supabase outage only costs the custom MA/MACD lengths
+        print(f"⚠️ Strategy config unavailable, charting {stock_code} with default params: {e}")
+        config = {}
+    try:
+        df = await asyncio.to_thread(chart_data.series, stock_code, start, end, timeframe=timeframe,
+                                     points=points, method=method, config=config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if df is None:
+        raise HTTPException(status_code=404, detail=f"No cached bars for {stock_code}")
+
+    if format == "arrow":
+        return Response(ChartData.to_arrow(df, stock_code, timeframe), media_type="application/vnd.apache.arrow.stream")
+    return ChartData.to_columns(df, stock_code, timeframe)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request timings, Supabase counters etc. of this process in Prometheus text format."""
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     print("🚀 Starting API Server on http://localhost:8000")
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,10 +1,26 @@
+import threading
+import time
 import gspread
 import pandas as pd
+from gspread.utils import rowcol_to_a1
 from config import Config
+from metrics import metrics
 
 class SheetManager:
+    # Worksheet records shared by every SheetManager of the process:
+    # (spreadsheet id, title) -> (revision, loaded_at, records). A cached set is
+    # used while its revision matches our write counter for that worksheet and it
+    # is at most Config.SHEET_CACHE_TTL seconds old (edits made in the browser).
+    records_cache = {}
+    revisions = {}
+    cache_lock = threading.Lock()
+
     def __init__(self):
         self.sh = None
+        # Opened worksheet handles by title
+        self.worksheets = {}
+        # Last grid written to (or read from) each worksheet, as cell strings
+        self.snapshots = {}
         
         if not Config.GOOGLE_SHEET_URL or "your_sheet_id" in Config.GOOGLE_SHEET_URL:
             print("⚠️ Warning: GOOGLE_SHEET_URL not set or valid in .env")
@@ -30,31 +46,147 @@ class SheetManager:
         try:
             # Select or Create Worksheet
             try:
-                ws = self.sh.worksheet(worksheet_name)
-                ws.clear()
+                ws = self._worksheet(worksheet_name)
             except gspread.exceptions.WorksheetNotFound:
                 ws = self.sh.add_worksheet(title=worksheet_name, rows=100, cols=20)
+                self.worksheets[worksheet_name] = ws
+                self.snapshots[worksheet_name] = []
                 print(f"Created new worksheet: {worksheet_name}")
 
             # Prepare Data
             # Convert DataFrame to list of lists (including header)
             data = [df.columns.values.tolist()] + df.values.tolist()
             
-            # Update Sheet
-            ws.update(data)
+            # Update Sheet (changed cells only)
+            rows_changed = self._write_grid(ws, data)
             print(f"✅ Updated '{worksheet_name}' with {len(df)} rows.")
             
-            # Formatting (Freeze Top Row)
-            try:
-                ws.freeze(rows=1)
-            except:
-                pass # Ignore if freeze fails
-            
-            self._apply_conditional_formatting(ws, len(df))
+            # Formatting only depends on the row count
+            if rows_changed:
+                # Formatting (Freeze Top Row)
+                try:
+                    ws.freeze(rows=1)
+                except:
+                    pass # Ignore if freeze fails
+
+                self._apply_conditional_formatting(ws, len(df))
 
         except Exception as e:
             print(f"❌ Failed to update sheet: {e}")
 
+    def _worksheet(self, title: str):
+        """Opens a worksheet once per manager (raises WorksheetNotFound)."""
+        if title not in self.worksheets:
+            self.worksheets[title] = self.sh.worksheet(title)
+        return self.worksheets[title]
+
+    def _records(self, title: str) -> list:
+        """ws.get_all_records() through the shared cache; returns copies of the rows."""
+        key = (self.sh.id, title)
+        with self.cache_lock:
+            revision = self.revisions.get(key, 0)
+            cached = self.records_cache.get(key)
+            if cached and cached[0] == revision and time.monotonic() - cached[1] <= Config.SHEET_CACHE_TTL:
+                metrics.inc("sheet_reads", worksheet=title, cache="hit")
+                return [dict(record) for record in cached[2]]
+
+            # Loaded under the lock, so concurrent readers share one request
+            metrics.inc("sheet_reads", worksheet=title, cache="miss")
+            records = self._worksheet(title).get_all_records()
+            self.records_cache[key] = (revision, time.monotonic(), records)
+        return [dict(record) for record in records]
+
+    def invalidate(self, title: str = None):
+        """Drops cached records of one worksheet (or all), e.g. after writing to it directly."""
+        with self.cache_lock:
+            for key in list(self.records_cache):
+                if key[0] == self.sh.id and title in (None, key[1]):
+                    del self.records_cache[key]
+
+    @staticmethod
+    def _cell(value) -> str:
+        """A written value as Google Sheets displays it (RAW input), e.g. True -> 'TRUE', 10.0 -> '10'."""
+        if value is None or (isinstance(value, float) and pd.isna(value)):
+            return ""
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    @staticmethod
+    def _changed_ranges(old: list, new: list, values: list = None) -> list:
+        """
+        A1 ranges where `new` differs from `old` (both grids of cell
+        strings), with the matching cells of `values` (default `new`) to
+        write. Cells only `old` has are blanked. Changed column runs of
+        consecutive rows are merged into one rectangle.
+        """
+        values = new if values is None else values
+        rows = max(len(old), len(new))
+        cols = max([len(row) for row in old + new] or [0])
+
+        def padded(grid, r):
+            row = list(grid[r]) if r < len(grid) else []
+            return row + [""] * (cols - len(row))
+
+        ranges = []
+        open_run = None  # [first_row, first_col, last_col, values]
+        for r in range(rows):
+            before, after, cells = padded(old, r), padded(new, r), padded(values, r)
+            runs = []
+            c = 0
+            while c < cols:
+                if before[c] != after[c]:
+                    start = c
+                    while c < cols and before[c] != after[c]:
+                        c += 1
+                    runs.append((start, c - 1))
+                c += 1
+            # A single run spanning the same columns as the previous row extends it
+            if open_run and len(runs) == 1 and runs[0] == (open_run[1], open_run[2]) and open_run[0] + len(open_run[3]) == r:
+                open_run[3].append(cells[runs[0][0]:runs[0][1] + 1])
+                continue
+            if open_run:
+                ranges.append(open_run)
+                open_run = None
+            for i, (start, end) in enumerate(runs):
+                run = [r, start, end, [cells[start:end + 1]]]
+                if i == len(runs) - 1:
+                    open_run = run
+                else:
+                    ranges.append(run)
+        if open_run:
+            ranges.append(open_run)
+
+        return [{'range': f"{rowcol_to_a1(r + 1, start + 1)}:{rowcol_to_a1(r + len(values), end + 1)}",
+                 'values': values} for r, start, end, values in ranges]
+
+    def _write_grid(self, ws, data: list) -> bool:
+        """
+        Writes `data` (header + rows) to the worksheet by sending only the
+        cells that differ from the last known grid, in one batch_update.
+        The first write to a worksheet in this process reads its current
+        values to start from. Returns True when the row count changed.
+        """
+        old = self.snapshots.get(ws.title)
+        if old is None:
+            old = ws.get_all_values()
+        new = [[self._cell(value) for value in row] for row in data]
+        # Typed values (numbers stay numbers), with NaN/None sent as blanks
+        values = [[value if cell else "" for value, cell in zip(row, cells)] for row, cells in zip(data, new)]
+
+        ranges = self._changed_ranges(old, new, values)
+        if ranges:
+            ws.batch_update(ranges)
+            key = (self.sh.id, ws.title)
+            with self.cache_lock:
+                self.revisions[key] = self.revisions.get(key, 0) + 1
+        self.snapshots[ws.title] = new
+        cells = sum(len(item['values']) * len(item['values'][0]) for item in ranges)
+        print(f"ℹ️ '{ws.title}': {cells} changed cells in {len(ranges)} ranges.")
+        return len(old) != len(new)
+
     def _apply_conditional_formatting(self, ws, row_count):
         """
         Applies basic conditional formatting for Signals.
@@ -76,8 +208,7 @@ class SheetManager:
             return []
 
         try:
-            ws = self.sh.worksheet("Stock List")
-            records = ws.get_all_records()
+            records = self._records("Stock List")
             
             # Filter Enabled == 'TRUE' (string comparison from GSheets)
             # Handle case sensitivity just in case
@@ -126,8 +257,7 @@ class SheetManager:
         }
 
         try:
-            ws = self.sh.worksheet("Strategy Config")
-            records = ws.get_all_records()
+            records = self._records("Strategy Config")
             
             # If sheet is empty or headers missing, it might crash get_all_records or return empty
             # But assuming it's initialized.
@@ -188,8 +318,7 @@ class SheetManager:
     def _update_whole_strategy_sheet(self, config_list: list):
         """Helper to overwrite the strategy sheet with new list."""
         try:
-            ws = self.sh.worksheet("Strategy Config")
-            ws.clear()
+            ws = self._worksheet("Strategy Config")
             
             df = pd.DataFrame(config_list)
             desired_columns = ["Parameter", "Value", "Description"]
@@ -200,7 +329,7 @@ class SheetManager:
             
             df = df[desired_columns]
             data = [df.columns.values.tolist()] + df.values.tolist()
-            ws.update(data)
+            self._write_grid(ws, data)
         except Exception as e:
             print(f"❌ Failed to update strategy sheet: {e}")
 
@@ -214,11 +343,11 @@ class SheetManager:
             return False
 
         try:
-            ws = self.sh.worksheet("Stock List")
-            ws.clear()
+            ws = self._worksheet("Stock List")
             
             if not stock_list:
                 print("⚠️ Stock list is empty, clearing sheet.")
+                self._write_grid(ws, [])
                 return True
 
             # Convert list of dicts to DataFrame for easy handling
@@ -237,7 +366,7 @@ class SheetManager:
             
             # Update
             data = [df.columns.values.tolist()] + df.values.tolist()
-            ws.update(data)
+            self._write_grid(ws, data)
             print(f"✅ Saved {len(stock_list)} stocks to Google Sheet.")
             return True
         except Exception as e:
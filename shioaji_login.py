@@ -1,5 +1,6 @@
-import shioaji as sj
+import time
 from config import Config
+from metrics import metrics
 
 class ShioajiLogin:
     _api_instance = None
@@ -7,7 +8,8 @@ class ShioajiLogin:
     @classmethod
     def get_api(cls):
         """
-        Returns a singleton instance of the logged-in Shioaji API.
+        Returns a singleton instance of the logged-in Shioaji API
+        (an offline FakeShioaji when MARKET_DATA_SOURCE=fake).
         """
         if cls._api_instance is None:
             cls._login()
@@ -15,16 +17,33 @@ class ShioajiLogin:
 
     @classmethod
     def _login(cls):
+        started = time.perf_counter()
+
+        def contracts_loaded(security_type):
+            # Contracts may finish downloading after login() has returned
+            metrics.observe("shioaji_contracts", time.perf_counter() - started, security_type=security_type)
+            print(f"✅ [Shioaji] Contracts loaded: {security_type}")
+
+        if Config.MARKET_DATA_SOURCE == "fake":
+            from fake_shioaji import FakeShioaji
+            print("Creating offline FakeShioaji instance...")
+            cls._api_instance = FakeShioaji.from_config()
+            with metrics.span("shioaji_login", source="fake"):
+                cls._api_instance.login(contracts_cb=contracts_loaded)
+            return
+
+        import shioaji as sj
         print("Creating Shioaji API instance (Simulation Mode)...")
         # Force simulation=True based on testing results
         cls._api_instance = sj.Shioaji(simulation=True)
         
         try:
-            cls._api_instance.login(
-                api_key=Config.SHIOAJI_API_KEY,
-                secret_key=Config.SHIOAJI_SECRET_KEY,
-                contracts_cb=lambda security_type: print(f"✅ [Shioaji] Contracts loaded: {security_type}")
-            )
+            with metrics.span("shioaji_login", source="shioaji"):
+                cls._api_instance.login(
+                    api_key=Config.SHIOAJI_API_KEY,
+                    secret_key=Config.SHIOAJI_SECRET_KEY,
+                    contracts_cb=contracts_loaded
+                )
             print("✅ [Shioaji] Login successful.")
             
             # CA Activation is skipped for now as per user instruction/testing
@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import bisect
+import json
+import time
+from datetime import datetime
+from config_cache import call_loader
+
+class LatestSignalCache:
+    """
+    In-process cache of the latest signal row per stock for the API server.
+    Rows come from `fetch()` (e.g. AsyncSupabaseManager.fetch_latest_results,
+    or a blocking function, which runs in a worker thread) and
+    are reloaded when refresh() is called after a scan, or at most `ttl`
+    seconds after the last load. `fetch()` must raise when the read fails:
+    the previous rows are then kept (and served until a reload succeeds) and
+    refresh() passes the error on. Pages are served with keyset cursors over
+    sorted copies of the rows, so a request never touches the database or
+    the stored history.
+    """
+
+    SORT_KEYS = ['Stock', 'Name', 'Date', 'Signal', 'Close', 'K', 'D', 'RSI', 'MA_SHORT', 'MA_LONG']
+    SIGNALS = {'green': '🟢', 'red': '🔴', 'yellow': '🟡'}
+
+    def __init__(self, fetch, ttl: float = 300):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.rows = None
+        self.loaded_at = None
+        self.loaded_monotonic = 0.0
+        self.views = {}
+        self.lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self.rows is None or time.monotonic() - self.loaded_monotonic > self.ttl
+
+    async def _load(self) -> int:
+        rows = await call_loader(self.fetch)
+        self.rows = rows
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.loaded_monotonic = time.monotonic()
+        self.views = {}
+        print(f"ℹ️ Signal cache refreshed with {len(rows)} stocks")
+        return len(rows)
+
+    async def refresh(self) -> int:
+        """Reloads the rows (call when a scan has saved new results). Returns the row count."""
+        async with self.lock:
+            return await self._load()
+
+    async def _ensure_fresh(self):
+        if self._stale():
+            async with self.lock:
+                # Another request may have reloaded it while we waited
+                if self._stale():
+                    try:
+                        await self._load()
+                    except Exception as e:
+                        if self.rows is None:
+                            raise
+                        print(f"⚠️ Signal cache reload failed, serving rows from {self.loaded_at}: {e}")
+
+    def _view(self, sort: str, signal: str):
+        """Rows matching `signal`, sorted ascending by (sort value, Stock), with their keys."""
+        view = self.views.get((sort, signal))
+        if view is None:
+            rows = [row for row in self.rows if signal is None or row.get('Signal') == signal]
+            keyed = sorted(((self.sort_key(row, sort), row) for row in rows), key=lambda item: item[0])
+            view = ([key for key, _ in keyed], [row for _, row in keyed])
+            self.views[(sort, signal)] = view
+        return view
+
+    @staticmethod
+    def sort_key(row: dict, sort: str) -> tuple:
+        # Missing values sort last (first when descending); the stock code
+        # breaks ties so keys are unique
+        value = row.get(sort)
+        return (value is None, value, str(row.get('Stock')))
+
+    @staticmethod
+    def encode_cursor(key: tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        try:
+            missing, value, stock = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except Exception:
+            raise ValueError("Invalid cursor")
+        return (bool(missing), value, str(stock))
+
+    async def page(self, signal: str = None, sort: str = 'Stock', order: str = 'asc',
+             limit: int = 50, cursor: str = None) -> dict:
+        """
+        One page of latest signals.
+        signal: 'green' / 'red' / 'yellow' (or the emoji) to filter, None for all.
+        sort: one of SORT_KEYS; order: 'asc' or 'desc'.
+        cursor: next_cursor of the previous page.
+        Returns {'items', 'next_cursor', 'total', 'as_of'}.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"sort must be one of {self.SORT_KEYS}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        if signal is not None:
+            signal = self.SIGNALS.get(signal.lower(), signal)
+            if signal not in self.SIGNALS.values():
+                raise ValueError(f"signal must be one of {list(self.SIGNALS)}")
+
+        await self._ensure_fresh()
+        keys, rows = self._view(sort, signal)
+        after = self.decode_cursor(cursor) if cursor else None
+        try:
+            if order == 'asc':
+                start = bisect.bisect_right(keys, after) if after else 0
+                end = min(start + limit, len(rows))
+                items, last = rows[start:end], end - 1
+                more = end < len(rows)
+            else:
+                end = bisect.bisect_left(keys, after) if after else len(rows)
+                start = max(end - limit, 0)
+                items, last = rows[start:end][::-1], start
+                more = start > 0
+        except TypeError:
+            # A cursor from another sort column
+            raise ValueError("Cursor does not match the sort column")
+
+        return {
+            'items': items,
+            'next_cursor': self.encode_cursor(keys[last]) if more and items else None,
+            'total': len(rows),
+            'as_of': self.loaded_at,
+        }
@@ -1,72 +1,198 @@
+import math
+import numpy as np
 import pandas as pd
 from tech_indicators import TechIndicators
 
 class StrategyAnalyzer:
-    
+    # analyze_latest(): relative weight the EMA/RSI history before the
+    # warm-up slice may still carry (their seed decays like (1 - alpha)^bars).
+    # Small enough that MACD_OSC keeps its sign on the bars where it crosses 0
+    WARMUP_TOLERANCE = 1e-6
+    # Inputs of signal_masks() / evaluate_snapshot()
+    SNAPSHOT_KEYS = ['Close', 'MA_SHORT', 'MA_LONG', 'MACD_OSC', 'RSI', 'K', 'D', 'K_PREV', 'D_PREV']
+
+    @staticmethod
+    def indicator_params(config: dict = {}) -> dict:
+        """
+        Maps strategy_params config keys to TechIndicators.calculate() arguments.
+        """
+        return {
+            'ma_short': int(config.get('MA_SHORT_DAYS', 10)),
+            'ma_long': int(config.get('MA_LONG_DAYS', 20)),
+            'macd_fast': int(config.get('MACD_FAST', 12)),
+            'macd_slow': int(config.get('MACD_SLOW', 26)),
+            'macd_signal': int(config.get('MACD_SIGNAL', 9)),
+        }
+
     @staticmethod
     def analyze(df: pd.DataFrame, config: dict = {}) -> pd.DataFrame:
         """
         Analyzes the DataFrame and determines the signal colors.
         Returns the DataFrame with 'Signal' and 'Signal_Memo' columns.
         """
-        # Load Config
-        ma_short = int(config.get('MA_SHORT_DAYS', 10))
-        ma_long = int(config.get('MA_LONG_DAYS', 20))
-        rsi_thresh = int(config.get('RSI_THRESHOLD', 80))
-        kd_thresh = int(config.get('KD_THRESHOLD', 50))
-        
-        macd_fast = int(config.get('MACD_FAST', 12))
-        macd_slow = int(config.get('MACD_SLOW', 26))
-        macd_signal = int(config.get('MACD_SIGNAL', 9))
-        
         # 1. Calculate Indicators
-        df = TechIndicators.calculate(df, 
-                                      ma_short=ma_short, ma_long=ma_long,
-                                      macd_fast=macd_fast, macd_slow=macd_slow, macd_signal=macd_signal)
+        df = TechIndicators.calculate(df, **StrategyAnalyzer.indicator_params(config))
+        memos = StrategyAnalyzer.signal_memos(config)
         
         # 2. Define Signal Columns initialized to 'Yellow'
         df['Signal'] = '🟡'
-        df['Signal_Memo'] = 'Hold/Observe'
+        df['Signal_Memo'] = memos['🟡']
         
         # 3. Vectorized Conditions
+        green_mask, red_mask = StrategyAnalyzer.signal_masks({
+            'Close': df['Close'], 'MA_SHORT': df['MA_SHORT'], 'MA_LONG': df['MA_LONG'],
+            'MACD_OSC': df['MACD_OSC'], 'RSI': df['RSI'],
+            'K': df['K'], 'D': df['D'], 'K_PREV': df['K'].shift(1), 'D_PREV': df['D'].shift(1)
+        }, config)
+        
+        # 4. Apply Signals (Red takes precedence over Green if conflicting, though rare)
+        df.loc[green_mask, 'Signal'] = '🟢'
+        df.loc[green_mask, 'Signal_Memo'] = memos['🟢']
+        
+        df.loc[red_mask, 'Signal'] = '🔴'
+        df.loc[red_mask, 'Signal_Memo'] = memos['🔴']
         
+        return df
+
+    @staticmethod
+    def signal_memos(config: dict = {}) -> dict:
+        """Signal_Memo text for each signal color."""
+        ma_short = int(config.get('MA_SHORT_DAYS', 10))
+        rsi_thresh = int(config.get('RSI_THRESHOLD', 80))
+        kd_thresh = int(config.get('KD_THRESHOLD', 50))
+        return {
+            '🟢': f'Buy: Trend Up + KD<{kd_thresh} Gold Cross',
+            '🔴': f'Sell: Below MA{ma_short} or RSI>{rsi_thresh}',
+            '🟡': 'Hold/Observe',
+        }
+
+    @staticmethod
+    def signal_masks(values: dict, config: dict = {}):
+        """
+        The strategy rules on Series or dates x symbols DataFrames.
+        `values` maps Close, MA_SHORT, MA_LONG, MACD_OSC, RSI, K, D, K_PREV and D_PREV.
+        Returns (green_mask, red_mask); where both are set, red wins.
+        """
+        rsi_thresh = int(config.get('RSI_THRESHOLD', 80))
+        kd_thresh = int(config.get('KD_THRESHOLD', 50))
+
         # --- Green Light Conditions (Buy) ---
         # 1. Price > MA_LONG (Trend is up)
-        cond_trend_up = df['Close'] > df['MA_LONG']
+        cond_trend_up = values['Close'] > values['MA_LONG']
         
         # 2. MACD Histogram > 0 (Momentum is positive)
-        cond_macd_pos = df['MACD_OSC'] > 0
+        cond_macd_pos = values['MACD_OSC'] > 0
         
         # 3. KD Golden Cross (Low level < Threshold)
         # Current K > D AND Previous K < D
-        cond_kd_cross = (df['K'] > df['D']) & (df['K'].shift(1) < df['D'].shift(1))
-        cond_kd_low = df['K'] < kd_thresh 
+        cond_kd_cross = (values['K'] > values['D']) & (values['K_PREV'] < values['D_PREV'])
+        cond_kd_low = values['K'] < kd_thresh 
         
         green_mask = cond_trend_up & cond_macd_pos & cond_kd_cross & cond_kd_low
         
         # --- Red Light Conditions (Sell) ---
         # 1. Price < MA_SHORT (Short term weakness)
-        cond_trend_weak = df['Close'] < df['MA_SHORT']
+        cond_trend_weak = values['Close'] < values['MA_SHORT']
         
         # 2. RSI Overbought
-        cond_rsi_high = df['RSI'] > rsi_thresh
+        cond_rsi_high = values['RSI'] > rsi_thresh
         
         red_mask = cond_trend_weak | cond_rsi_high
-        
-        # 4. Apply Signals (Red takes precedence over Green if conflicting, though rare)
-        df.loc[green_mask, 'Signal'] = '🟢'
-        df.loc[green_mask, 'Signal_Memo'] = f'Buy: Trend Up + KD<{kd_thresh} Gold Cross'
-        
-        df.loc[red_mask, 'Signal'] = '🔴'
-        df.loc[red_mask, 'Signal_Memo'] = f'Sell: Below MA{ma_short} or RSI>{rsi_thresh}'
-        
-        return df
+        return green_mask, red_mask
+
+    @staticmethod
+    def analyze_panel(panel: dict, config: dict = {}) -> dict:
+        """
+        Panel mode of analyze() for the whole watchlist at once.
+        `panel` is a BarStore.load_panel() dict of dates x symbols DataFrames.
+        Returns the TechIndicators.calculate_panel() frames plus a 'Signal'
+        frame of 🟢/🔴/🟡 (NaN where the stock did not trade).
+        """
+        result = TechIndicators.calculate_panel(panel, **StrategyAnalyzer.indicator_params(config))
+        close = panel['Close'].reindex(index=result['K'].index, columns=result['K'].columns)
+        traded = close.notna()
+
+        values = {name: result[name] for name in ['MA_SHORT', 'MA_LONG', 'MACD_OSC', 'RSI', 'K', 'D']}
+        values['Close'] = close
+        values['K_PREV'] = StrategyAnalyzer.previous_bar(result['K'], traded)
+        values['D_PREV'] = StrategyAnalyzer.previous_bar(result['D'], traded)
+        green_mask, red_mask = StrategyAnalyzer.signal_masks(values, config)
+
+        signal = np.select([red_mask.to_numpy(), green_mask.to_numpy()], ['🔴', '🟢'], default='🟡').astype(object)
+        signal[~traded.to_numpy()] = np.nan
+        result['Signal'] = pd.DataFrame(signal, index=close.index, columns=close.columns)
+        return result
+
+    @staticmethod
+    def previous_bar(frame: pd.DataFrame, traded: pd.DataFrame) -> pd.DataFrame:
+        """
+        Panel equivalent of Series.shift(1): each stock's value on its previous
+        trading day, skipping suspensions.
+        """
+        return frame.where(traded).ffill().shift(1)
+
+    @staticmethod
+    def warmup_bars(config: dict = {}, rsi_len: int = 14, kd_k: int = 9, kd_d: int = 3) -> int:
+        """
+        Number of trailing bars analyze_latest() needs for the last bar (and the
+        previous bar's K/D) to match a full-history analyze().
+        Window indicators (MA, KD) are exact once their window is covered;
+        the recursive ones (MACD EMAs, RSI) get extra bars until the weight
+        of the cut-off history drops below WARMUP_TOLERANCE.
+        """
+        params = StrategyAnalyzer.indicator_params(config)
+
+        def converged(first_value: int, alpha: float) -> int:
+            return first_value + math.ceil(math.log(StrategyAnalyzer.WARMUP_TOLERANCE) / math.log(1 - alpha))
+
+        return max(
+            params['ma_short'], params['ma_long'], 60,
+            # The slow EMA decays slowest; DEM starts macd_signal - 1 bars after DIF
+            converged(params['macd_slow'] + params['macd_signal'] - 1, 2 / (params['macd_slow'] + 1)),
+            converged(rsi_len + 1, 1 / rsi_len),
+            # K is smoothed over 3 bars, then D; +1 since the golden cross needs yesterday's K/D
+            kd_k + 3 - 1 + kd_d - 1 + 1
+        )
+
+    @staticmethod
+    def analyze_latest(df: pd.DataFrame, config: dict = {}) -> dict:
+        """
+        Latest-only mode of analyze(): computes the indicators over just the
+        trailing warmup_bars() rows and evaluates the last bar.
+        Returns a compact record with Date, Close, the indicator values,
+        K_PREV/D_PREV, Signal and Signal_Memo.
+        """
+        params = StrategyAnalyzer.indicator_params(config)
+        tail = df.iloc[-StrategyAnalyzer.warmup_bars(config):].copy()
+        tail = TechIndicators.calculate(tail, **params)
+
+        latest = tail.iloc[-1].to_dict()
+        latest['Date'] = tail.index[-1].strftime("%Y-%m-%d")
+        latest['K_PREV'] = tail['K'].iloc[-2] if len(tail) > 1 else float('nan')
+        latest['D_PREV'] = tail['D'].iloc[-2] if len(tail) > 1 else float('nan')
+        latest.update(StrategyAnalyzer.evaluate_snapshot(latest, config))
+        return latest
+
+    @staticmethod
+    def evaluate_snapshot(values: dict, config: dict = {}) -> dict:
+        """
+        Applies the same rules as analyze() to a single bar's indicator values
+        (e.g. from IndicatorStateStore.latest), without any history.
+        `values` needs Close, MA_SHORT, MA_LONG, MACD_OSC, RSI, K, D, K_PREV and D_PREV.
+        Returns {'Signal': ..., 'Signal_Memo': ...}.
+        """
+        # The vectorized rules on one-element arrays; None and NaN compare False
+        green, red = StrategyAnalyzer.signal_masks(
+            {name: np.array([values[name]], dtype=float) for name in StrategyAnalyzer.SNAPSHOT_KEYS}, config)
+
+        # Red takes precedence over Green
+        signal = '🔴' if red[0] else '🟢' if green[0] else '🟡'
+        return {'Signal': signal, 'Signal_Memo': StrategyAnalyzer.signal_memos(config)[signal]}
 
 if __name__ == "__main__":
-    import os
-    file_path = "data/2330.csv"
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path, index_col=0, parse_dates=True)
+    from bar_store import BarStore
+    df = BarStore().load("2330")
+    if df is not None:
         df = StrategyAnalyzer.analyze(df)
         
         # Show last 10 days
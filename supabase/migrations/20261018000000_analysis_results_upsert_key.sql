@@ -0,0 +1,10 @@
+-- save_analysis_result upserts on (date, stock_code), which needs a unique key.
+-- Drop duplicates left by earlier plain inserts, keeping the newest row.
+delete from analysis_results a
+using analysis_results b
+where a.date = b.date
+  and a.stock_code = b.stock_code
+  and (a.created_at, a.ctid) < (b.created_at, b.ctid);
+
+alter table analysis_results
+  add constraint analysis_results_date_stock_code_key unique (date, stock_code);
@@ -0,0 +1,32 @@
+-- Typed indicator columns instead of reading them out of the indicators JSON,
+-- and a latest-per-stock view so readers never page through history.
+alter table analysis_results
+  add column if not exists name text,
+  add column if not exists memo text,
+  add column if not exists k double precision,
+  add column if not exists d double precision,
+  add column if not exists rsi double precision,
+  add column if not exists ma_short double precision,
+  add column if not exists ma_long double precision;
+
+-- Backfill from the old JSON payload
+update analysis_results
+set name = indicators->>'Name',
+    memo = coalesce(indicators->>'Memo', indicators->>'Signal_Memo'),
+    k = (indicators->>'K')::double precision,
+    d = (indicators->>'D')::double precision,
+    rsi = (indicators->>'RSI')::double precision,
+    ma_short = (indicators->>'MA_SHORT')::double precision,
+    ma_long = (indicators->>'MA_LONG')::double precision
+where k is null and indicators is not null;
+
+create index if not exists analysis_results_stock_code_date_idx
+  on analysis_results (stock_code, date desc);
+
+-- security_invoker: reads go through the caller's RLS on analysis_results
+-- (Postgres 15+), not the view owner's rights
+create or replace view latest_analysis_results with (security_invoker = on) as
+select distinct on (stock_code)
+  stock_code, name, date, signal, price, memo, k, d, rsi, ma_short, ma_long, created_at
+from analysis_results
+order by stock_code, date desc;
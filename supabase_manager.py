@@ -1,6 +1,8 @@
 import os
+import time
 from supabase import create_client, Client
 from config import Config
+from metrics import metrics
 import pandas as pd
 from datetime import datetime
 
@@ -48,15 +50,7 @@ class SupabaseManager:
 
         try:
             response = self.client.table('stocks').select('*').order('code').execute()
-            result = []
-            for item in response.data:
-                result.append({
-                    "Stock": item['code'],
-                    "Name": item['name'],
-                    "Enabled": item['enabled'], # Keep as boolean for API, or convert if frontend needs string
-                    "Memo": item['memo'] or ""
-                })
-            return result
+            return [self._stock_row(item) for item in response.data]
         except Exception as e:
             print(f"❌ Failed to fetch all stocks: {e}")
             return []
@@ -93,71 +87,114 @@ class SupabaseManager:
             # The frontend previously expected: Parameter, Value, Description
             # DB has: param_key, param_value, description
             
-            result = []
-            for item in response.data:
-                result.append({
-                    "Parameter": item['param_key'],
-                    "Value": item['param_value'],
-                    "Description": item['description'] or ""
-                })
-            return result
+            return [self._strategy_row(item) for item in response.data]
         except Exception as e:
             print(f"❌ Failed to fetch config full: {e}")
             return []
 
-    def save_analysis_result(self, df: pd.DataFrame):
+    def save_analysis_result(self, df: pd.DataFrame, batch_size: int = None) -> dict:
         """
         Saves analysis results to 'analysis_results' table.
         Replaces update_daily_report.
+        Rows are upserted on (date, stock_code) in chunks of `batch_size`
+        (Config.SUPABASE_BATCH_SIZE), so re-running a day overwrites instead of
+        duplicating. Failed chunks are retried with backoff.
+        Returns a write report: {'rows', 'written', 'chunks', 'failed_chunks', 'retries', 'seconds'}.
+        """
+        batch_size = batch_size or Config.SUPABASE_BATCH_SIZE
+        report = {'rows': len(df), 'written': 0, 'chunks': 0, 'failed_chunks': 0, 'retries': 0, 'seconds': 0.0}
+        if not self.client or df.empty:
+            return report
+
+        started = time.perf_counter()
+        records = self._analysis_records(df)
+        report['rows'] = len(records)
+        for i in range(0, len(records), batch_size):
+            chunk = records[i:i + batch_size]
+            report['chunks'] += 1
+            for attempt in range(Config.SUPABASE_MAX_RETRIES + 1):
+                try:
+                    self.client.table('analysis_results').upsert(chunk, on_conflict='date,stock_code').execute()
+                    report['written'] += len(chunk)
+                    break
+                except Exception as e:
+                    if attempt == Config.SUPABASE_MAX_RETRIES:
+                        report['failed_chunks'] += 1
+                        print(f"❌ Failed to save analysis results {i + 1}-{i + len(chunk)}: {e}")
+                        break
+                    report['retries'] += 1
+                    time.sleep(0.5 * 2 ** attempt)
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        metrics.inc("supabase_rows_written", report['written'], table='analysis_results')
+        metrics.inc("supabase_retries", report['retries'], table='analysis_results')
+        metrics.inc("supabase_failed_chunks", report['failed_chunks'], table='analysis_results')
+
+        if report['failed_chunks']:
+            print(f"⚠️ Saved {report['written']}/{len(records)} analysis results to Supabase ({report['failed_chunks']} chunks failed).")
+        else:
+            print(f"✅ Saved {report['written']} analysis results to Supabase in {report['chunks']} chunks ({report['seconds']}s).")
+        return report
+
+    # Summary row columns stored in typed analysis_results columns
+    TYPED_COLUMNS = {'Name': 'name', 'Memo': 'memo', 'K': 'k', 'D': 'd', 'RSI': 'rsi',
+                     'MA_SHORT': 'ma_short', 'MA_LONG': 'ma_long'}
+
+    @staticmethod
+    def _analysis_records(df: pd.DataFrame) -> list:
+        """
+        Builds analysis_results rows column-wise: date, stock_code, signal,
+        price, the typed indicator columns, and any other summary fields in
+        the indicators JSON.
+        Later rows win if the same (date, stock_code) appears twice, since one
+        upsert statement cannot update a row twice.
+        """
+        close = df['Close'] if 'Close' in df else pd.Series(0, index=df.index)
+        if not pd.api.types.is_numeric_dtype(close):
+            close = close.astype(str).str.replace(',', '', regex=False)
+        price = pd.to_numeric(close, errors='coerce').fillna(0).astype(float)
+        dates = df['Date'].astype(str) if 'Date' in df else pd.Series(None, index=df.index)
+        signals = df['Signal'] if 'Signal' in df else pd.Series('HOLD', index=df.index)
+
+        # JSON has no NaN; typed columns and fields already stored above are not repeated
+        typed = df.reindex(columns=list(SupabaseManager.TYPED_COLUMNS)).rename(columns=SupabaseManager.TYPED_COLUMNS)
+        typed = typed.astype(object).where(typed.notna(), None).to_dict('records')
+        extra = df.drop(columns=['Stock', 'Date', 'Close', 'Signal', *SupabaseManager.TYPED_COLUMNS], errors='ignore')
+        if extra.columns.empty:
+            extra = [{} for _ in range(len(df))]
+        else:
+            extra = extra.astype(object).where(extra.notna(), None).to_dict('records')
+
+        now = datetime.now().isoformat()
+        records = {}
+        for date_val, stock_code, signal, price_val, columns, indicators in zip(
+                dates.tolist(), df['Stock'].astype(str).tolist(), signals.tolist(), price.tolist(), typed, extra):
+            records[(date_val, stock_code)] = {
+                "date": date_val,
+                "stock_code": stock_code,
+                "signal": signal,
+                "price": price_val,
+                **columns,
+                "indicators": indicators,
+                "created_at": now
+            }
+        return list(records.values())
+
+    def fetch_latest_results(self) -> list:
+        """
+        Fetches the latest analysis row per stock from the 'latest_analysis_results' view.
+        Returns:
+            list: [{'Stock': '2330', 'Name': ..., 'Date': ..., 'Signal': ..., 'Close': ..., 'Memo': ...,
+                    'K': ..., 'D': ..., 'RSI': ..., 'MA_SHORT': ..., 'MA_LONG': ...}, ...]
         """
         if not self.client:
-            return
+            return []
 
         try:
-            # Prepare data for insertion
-            # df columns might be: Stock, Name, Date, Close, Signal, etc.
-            # match with table: date, stock_code, signal, price, indicators(json)
-            
-            records = []
-            now = datetime.now().isoformat()
-            
-            for _, row in df.iterrows():
-                # Extract main fields
-                stock_code = str(row.get('Stock'))
-                signal = row.get('Signal', 'HOLD')
-                try:
-                    price = float(str(row.get('Close', 0)).replace(',',''))
-                except:
-                    price = 0
-                
-                # Assume 'Date' in df is string or datetime
-                date_val = row.get('Date')
-                
-                # Bundle everything else into indicators json
-                indicators = row.to_dict()
-                # Remove extracted fields to save space/duplication if desired, 
-                # but keeping them in JSON is also fine for flexible querying.
-                
-                record = {
-                    "date": date_val,
-                    "stock_code": stock_code,
-                    "signal": signal,
-                    "price": price,
-                    "indicators": indicators,
-                    "created_at": now
-                }
-                records.append(record)
-            
-            if records:
-                # Upsert based on some criteria? 
-                # For now just insert. If we run multiple times same day, might want to delete old first?
-                # Or maybe user just wants to append.
-                # Let's try insert.
-                self.client.table('analysis_results').insert(records).execute()
-                print(f"✅ Saved {len(records)} analysis results to Supabase.")
-                
+            response = self.client.table('latest_analysis_results').select('*').order('stock_code').execute()
+            return [self._latest_row(item) for item in response.data]
         except Exception as e:
-            print(f"❌ Failed to save analysis results: {e}")
+            print(f"❌ Failed to fetch latest analysis results: {e}")
+            return []
 
     def save_stock_list(self, stock_list: list) -> bool:
         """
@@ -171,15 +208,7 @@ class SupabaseManager:
             # Upsert stocks
             # Map frontend keys to DB columns
             # DB: code, name, enabled, memo
-            upsert_data = []
-            for item in stock_list:
-                enabled = str(item.get('Enabled')).upper() == 'TRUE'
-                upsert_data.append({
-                    "code": item.get('Stock'),
-                    "name": item.get('Name'),
-                    "enabled": enabled,
-                    "memo": item.get('Memo', '')
-                })
+            upsert_data = self._stock_upserts(stock_list)
             
             if upsert_data:
                 # on_conflict='code'
@@ -199,12 +228,7 @@ class SupabaseManager:
             return False
             
         try:
-            upsert_data = []
-            for key, val in config_dict.items():
-                upsert_data.append({
-                    "param_key": key,
-                    "param_value": val
-                })
+            upsert_data = self._strategy_upserts(config_dict)
             
             if upsert_data:
                 # Need to be careful not to wipe descriptions if we just upsert value.
@@ -223,6 +247,58 @@ class SupabaseManager:
             print(f"❌ Failed to save strategy config: {e}")
             return False
 
+    # Row mapping shared with AsyncSupabaseManager
+
+    @staticmethod
+    def _stock_row(item: dict) -> dict:
+        return {
+            "Stock": item['code'],
+            "Name": item['name'],
+            "Enabled": item['enabled'], # Keep as boolean for API, or convert if frontend needs string
+            "Memo": item['memo'] or ""
+        }
+
+    @staticmethod
+    def _strategy_row(item: dict) -> dict:
+        # The frontend expects: Parameter, Value, Description
+        # DB has: param_key, param_value, description
+        return {
+            "Parameter": item['param_key'],
+            "Value": item['param_value'],
+            "Description": item['description'] or ""
+        }
+
+    @staticmethod
+    def _latest_row(item: dict) -> dict:
+        return {
+            "Stock": item['stock_code'],
+            "Name": item.get('name') or "",
+            "Date": item['date'],
+            "Signal": item['signal'],
+            "Close": item['price'],
+            "Memo": item.get('memo') or "",
+            "K": item.get('k'),
+            "D": item.get('d'),
+            "RSI": item.get('rsi'),
+            "MA_SHORT": item.get('ma_short'),
+            "MA_LONG": item.get('ma_long'),
+        }
+
+    @staticmethod
+    def _stock_upserts(stock_list: list) -> list:
+        # Map frontend keys to DB columns
+        # DB: code, name, enabled, memo
+        return [{
+            "code": item.get('Stock'),
+            "name": item.get('Name'),
+            "enabled": str(item.get('Enabled')).upper() == 'TRUE',
+            "memo": item.get('Memo', '')
+        } for item in stock_list]
+
+    @staticmethod
+    def _strategy_upserts(config_dict: dict) -> list:
+        return [{"param_key": key, "param_value": val} for key, val in config_dict.items()]
+
 if __name__ == "__main__":
     # Test connection
     mgr = SupabaseManager()
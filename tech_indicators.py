@@ -1,7 +1,24 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import indicator_kernels as kernels
 
 class TechIndicators:
+    @staticmethod
+    def _compute(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 ma_short: int, ma_long: int, rsi_len: int, kd_k: int, kd_d: int,
+                 macd_fast: int, macd_slow: int, macd_signal: int) -> dict:
+        """Runs every indicator kernel on (dates x symbols) arrays."""
+        result = {
+            'MA_SHORT': kernels.sma(close, ma_short),
+            'MA_LONG': kernels.sma(close, ma_long),
+            'MA60': kernels.sma(close, 60),
+        }
+        result['MACD_DIF'], result['MACD_DEM'], result['MACD_OSC'] = kernels.macd(close, macd_fast, macd_slow, macd_signal)
+        result['RSI'] = kernels.rsi(close, rsi_len)
+        # pandas_ta.stoch default smooth_k=3
+        result['K'], result['D'] = kernels.stoch(high, low, close, k=kd_k, d=kd_d)
+        return result
+
     @staticmethod
     def calculate(df: pd.DataFrame, 
                   ma_short: int = 10, ma_long: int = 20, 
@@ -11,6 +28,8 @@ class TechIndicators:
         """
         Calculates technical indicators: MA, MACD, RSI, KD.
         Appends columns to the input DataFrame.
+        Values follow pandas_ta 0.4.71b0's sma/macd/rsi/stoch (smooth_k=3): MACD
+        and RSI bit-identical, MAs and KD to within rounding (see indicator_kernels).
         """
         if df.empty:
             return df
@@ -19,50 +38,69 @@ class TechIndicators:
         if 'Close' not in df.columns:
             raise ValueError("DataFrame must contain 'Close' column")
 
-        # 1. Moving Averages
-        df['MA_SHORT'] = ta.sma(df['Close'], length=ma_short) 
-        df['MA_LONG'] = ta.sma(df['Close'], length=ma_long)  
-        df['MA60'] = ta.sma(df['Close'], length=60) 
+        # Single-column arrays run the kernels' scalar fast path
+        result = TechIndicators._compute(
+            df[['Close']].to_numpy(dtype='float64'),
+            df[['High']].to_numpy(dtype='float64'),
+            df[['Low']].to_numpy(dtype='float64'),
+            ma_short=ma_short, ma_long=ma_long, rsi_len=rsi_len, kd_k=kd_k, kd_d=kd_d,
+            macd_fast=macd_fast, macd_slow=macd_slow, macd_signal=macd_signal
+        )
+        for name, values in result.items():
+            df[name] = values[:, 0]
 
-        # 2. MACD
-        macd = ta.macd(df['Close'], fast=macd_fast, slow=macd_slow, signal=macd_signal)
-        if macd is not None:
-            # pandas_ta columns: MACD_{fast}_{slow}_{signal}
-            # We need to construct dynamic column names
-            col_main = f'MACD_{macd_fast}_{macd_slow}_{macd_signal}'
-            col_signal = f'MACDs_{macd_fast}_{macd_slow}_{macd_signal}'
-            col_hist = f'MACDh_{macd_fast}_{macd_slow}_{macd_signal}'
+        return df
 
-            # Check if columns exist (pandas_ta creates them)
-            if col_main in macd.columns:
-                df['MACD_DIF'] = macd[col_main]
-                df['MACD_DEM'] = macd[col_signal]
-                df['MACD_OSC'] = macd[col_hist]
+    @staticmethod
+    def apply_panel(func, close: np.ndarray, high: np.ndarray, low: np.ndarray) -> dict:
+        """
+        Runs func(close, high, low) -> {name: array} on dates x symbols arrays.
+        Stocks with missing bars after their first trade (suspensions) are
+        recomputed on their own trading days only, like the per-stock path.
+        """
+        result = func(close, high, low)
 
-        # 3. RSI
-        df['RSI'] = ta.rsi(df['Close'], length=rsi_len)
+        traded = ~np.isnan(close)
+        first_trade = traded.argmax(axis=0)
+        last_trade = len(close) - 1 - traded[::-1].argmax(axis=0)
+        gapped = np.flatnonzero(traded.any(axis=0) & (traded.sum(axis=0) < last_trade - first_trade + 1))
+        for j in gapped:
+            rows = np.flatnonzero(traded[:, j])
+            single = func(close[rows, j:j + 1], high[rows, j:j + 1], low[rows, j:j + 1])
+            for name, values in single.items():
+                result[name][:, j] = np.nan
+                result[name][rows, j] = values[:, 0]
+        return result
 
-        # 4. KD (Stochastic Oscillator)
-        stoch = ta.stoch(df['High'], df['Low'], df['Close'], k=kd_k, d=kd_d)
-        if stoch is not None:
-             # pandas_ta columns: STOCHk_{k}_{d}_{3}, STOCHd_{k}_{d}_{3} (Wait, stoch default smooth_k=3)
-             # Let's handle the default column naming or use iloc if needed, but names are safer.
-             # Default STOCH function in pandas_ta: k=14, d=3, smooth_k=3. 
-             # We passed k=kd_k, d=kd_d. 
-             # Assumption: smooth_k is 3 by default in pandas_ta stoch unless specified.
-             # Let's check keys if needed, but for now we try to construct them.
-             # Actually, simpler is to just take the first and second columns if we are sure.
-             df['K'] = stoch.iloc[:, 0]
-             df['D'] = stoch.iloc[:, 1]
+    @staticmethod
+    def calculate_panel(panel: dict,
+                        ma_short: int = 10, ma_long: int = 20,
+                        rsi_len: int = 14,
+                        kd_k: int = 9, kd_d: int = 3,
+                        macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9) -> dict:
+        """
+        Panel mode of calculate(): computes every indicator for the whole universe at once.
+        `panel` maps 'Close', 'High' and 'Low' to DataFrames of dates x symbols
+        (e.g. from BarStore.load_panel). Returns a dict of the same indicator
+        column names (MA_SHORT, MACD_OSC, K, ...) to dates x symbols DataFrames,
+        bit-identical to running calculate() on each stock separately.
+        """
+        close_df = panel['Close']
+        index, columns = close_df.index, close_df.columns
+        close = close_df.to_numpy(dtype='float64')
+        high = panel['High'].reindex(index=index, columns=columns).to_numpy(dtype='float64')
+        low = panel['Low'].reindex(index=index, columns=columns).to_numpy(dtype='float64')
+        params = dict(ma_short=ma_short, ma_long=ma_long, rsi_len=rsi_len, kd_k=kd_k, kd_d=kd_d,
+                      macd_fast=macd_fast, macd_slow=macd_slow, macd_signal=macd_signal)
 
-        return df
+        result = TechIndicators.apply_panel(lambda c, h, l: TechIndicators._compute(c, h, l, **params), close, high, low)
+        return {name: pd.DataFrame(values, index=index, columns=columns) for name, values in result.items()}
 
 if __name__ == "__main__":
     # Simple test
-    import os
-    file_path = "data/2330.csv"
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path, index_col=0, parse_dates=True)
+    from bar_store import BarStore
+    df = BarStore().load("2330")
+    if df is not None:
         print("Original columns:", df.columns.tolist())
         
         df = TechIndicators.calculate(df)
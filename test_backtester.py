@@ -0,0 +1,91 @@
+"""
+Checks the vectorized Backtester against a plain bar-by-bar replay.
+
+Run with: python -m pytest test_backtester.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from param_sweep import ParamSweep
+from strategy_analyzer import StrategyAnalyzer
+from test_tech_indicators import make_bars
+
+def replay(df: pd.DataFrame, config: dict = {}):
+    """Reference loop: buy on 🟢, sell on 🔴, returns (total return, trade returns)."""
+    signals = StrategyAnalyzer.analyze(df.copy(), config)['Signal'].tolist()
+    closes = df['Close'].tolist()
+    held, equity, trades = 0, 1.0, []
+    for i, signal in enumerate(signals):
+        if i > 0:
+            equity *= 1 + held * (closes[i] / closes[i - 1] - 1)
+        if signal == '🟢' and not held:
+            held, entry_equity = 1, equity
+            equity *= 1 - Backtester.FEE_RATE
+        elif signal == '🔴' and held:
+            held = 0
+            equity *= 1 - Backtester.FEE_RATE - Backtester.TAX_RATE
+            trades.append(equity / entry_equity - 1)
+    if held:
+        trades.append(equity / entry_equity - 1)
+    return equity - 1, trades
+
+@pytest.mark.parametrize("config", [{}, {'KD_THRESHOLD': 80, 'RSI_THRESHOLD': 70}])
+def test_run_matches_bar_by_bar_replay(config):
+    frames = {str(1000 + seed): make_bars(days=750, seed=seed) for seed in range(8)}
+    frames['1001'] = frames['1001'].iloc[200:]                           # listed later
+    frames['1002'] = frames['1002'].drop(frames['1002'].index[300:305])  # suspended for a week
+    panel = {field: pd.DataFrame({code: df[field] for code, df in frames.items()})
+             for field in ['Open', 'High', 'Low', 'Close', 'Volume']}
+
+    result = Backtester.run(panel, config)
+    for code, df in frames.items():
+        total_return, trades = replay(df, config)
+        assert result['summary'].loc[code, 'Total_Return'] == pytest.approx(total_return, rel=1e-9)
+        actual = result['trades'].loc[result['trades']['Stock'] == code, 'Return'].to_numpy()
+        np.testing.assert_allclose(actual, trades, rtol=1e-9)
+        assert result['summary'].loc[code, 'Trades'] == len(trades)
+
+def test_analyze_panel_matches_analyze():
+    frames = {str(2000 + seed): make_bars(seed=seed) for seed in range(3)}
+    frames['2001'] = frames['2001'].drop(frames['2001'].index[150])
+    panel = {field: pd.DataFrame({code: df[field] for code, df in frames.items()})
+             for field in ['High', 'Low', 'Close']}
+    signal = StrategyAnalyzer.analyze_panel(panel)['Signal']
+    for code, df in frames.items():
+        expected = StrategyAnalyzer.analyze(df.copy())['Signal']
+        assert (signal[code].reindex(df.index) == expected).all(), code
+
+@pytest.mark.parametrize("config", [{}, {'KD_THRESHOLD': 80, 'RSI_THRESHOLD': 70}])
+def test_evaluate_snapshot_matches_analyze(config):
+    df = StrategyAnalyzer.analyze(make_bars(seed=5), config)
+    df['K_PREV'], df['D_PREV'] = df['K'].shift(1), df['D'].shift(1)
+    for _, row in df.iterrows():
+        snapshot = StrategyAnalyzer.evaluate_snapshot(row.to_dict(), config)
+        assert snapshot == {'Signal': row['Signal'], 'Signal_Memo': row['Signal_Memo']}
+
+def test_param_sweep_reuses_backtester():
+    frames = {str(3000 + seed): make_bars(days=600, seed=seed) for seed in range(4)}
+    frames['3001'] = frames['3001'].drop(frames['3001'].index[100:103])
+    panel = {field: pd.DataFrame({code: df[field] for code, df in frames.items()})
+             for field in ['Open', 'High', 'Low', 'Close', 'Volume']}
+    grid = {'MA_SHORT_DAYS': [5, 10], 'MA_LONG_DAYS': [20], 'KD_THRESHOLD': [50, 80],
+            'MACD_FAST': [8, 12], 'MACD_SLOW': [26]}
+
+    inline = ParamSweep(panel, grid=grid, workers=0).run()
+    pooled = ParamSweep(panel, grid=grid, workers=2).run()
+    pd.testing.assert_frame_equal(inline, pooled)
+
+    for _, row in inline.iterrows():
+        config = {key: int(row[key]) for key in grid}
+        expected = Backtester.run(panel, config)
+        assert row['Test_Return'] == pytest.approx(expected['portfolio'].iloc[-1] - 1, rel=1e-9)
+        assert row['Trades'] == len(expected['trades'])
+
+def test_param_sweep_walk_forward_windows():
+    sweep = ParamSweep({}, splits=3, train_bars=200, test_bars=50)
+    assert sweep.windows(500) == [((150, 350), (350, 400)), ((200, 400), (400, 450)), ((250, 450), (450, 500))]
+    assert sweep.windows(300) == [((0, 200), (200, 250)), ((50, 250), (250, 300))]  # too short for the first split
+    with pytest.raises(ValueError):
+        sweep.windows(240)
@@ -0,0 +1,103 @@
+"""
+Tests for the chart downsampling and Arrow output of ChartData.
+
+Run with: python -m pytest test_chart_data.py
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from bar_store import BarStore
+from chart_data import ChartData
+from config_cache import ConfigCache
+from tech_indicators import TechIndicators
+from test_tech_indicators import make_bars
+
+def chart_bars(days: int = 300, seed: int = 0) -> pd.DataFrame:
+    df = make_bars(days, seed)
+    # Opens off the previous close, so first-open is distinguishable from last-close
+    df['Open'] = np.r_[df['Close'].iloc[0], df['Close'].to_numpy()[:-1]]
+    return TechIndicators.calculate(df)[ChartData.COLUMNS]
+
+@pytest.mark.parametrize("n, points", [(1000, 50), (1000, 3), (101, 100), (10, 10), (10, 2)])
+def test_lttb_keeps_endpoints_and_order(n, points):
+    y = np.random.default_rng(n).normal(size=n).cumsum()
+    indices = ChartData.lttb_indices(y, points)
+    assert len(indices) == min(points, n)
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+def test_lttb_keeps_spikes_and_handles_nan():
+    y = np.zeros(500)
+    y[123], y[321] = 10.0, -10.0
+    y[:30] = np.nan
+    indices = ChartData.lttb_indices(y, 20)
+    assert {123, 321} <= set(indices.tolist())
+    np.testing.assert_array_equal(ChartData.lttb_indices(y[:5], 10), np.arange(5))
+
+@pytest.mark.parametrize("points", [7, 40, 299])
+def test_bucket_ohlc_invariants(points):
+    df = chart_bars()
+    out = ChartData.bucket_ohlc(df, points)
+    assert len(out) == points
+    # Buckets are the runs of bars between consecutive bucket stamps
+    bucket = np.searchsorted(out.index, df.index, side='right') - 1
+    groups = df.groupby(bucket)
+    np.testing.assert_array_equal(out['Open'], groups['Open'].first())
+    np.testing.assert_array_equal(out['High'], groups['High'].max())
+    np.testing.assert_array_equal(out['Low'], groups['Low'].min())
+    np.testing.assert_array_equal(out['Close'], groups['Close'].last())
+    np.testing.assert_array_equal(out['Volume'], groups['Volume'].sum())
+    assert out['Volume'].sum() == df['Volume'].sum()
+    assert out.index[0] == df.index[0]
+    # Indicator lines take the value at the bucket's close
+    np.testing.assert_array_equal(out['RSI'], groups['RSI'].apply(lambda s: s.iloc[-1]))
+
+def test_arrow_round_trip():
+    df = chart_bars(120)
+    table = pa.ipc.open_stream(ChartData.to_arrow(df, "2330", "1d")).read_all()
+    assert table.schema.metadata == {b'symbol': b'2330', b'timeframe': b'1d'}
+    assert table.schema.field('t').type == pa.timestamp('s')
+    assert table.schema.field('volume').type == pa.int64()
+    assert table.schema.field('close').type == pa.float32()
+
+    np.testing.assert_array_equal(table['t'].to_numpy(), df.index.to_numpy().astype('datetime64[s]'))
+    np.testing.assert_array_equal(table['volume'].to_numpy(), df['Volume'].to_numpy())
+    for column in ChartData.COLUMNS:
+        if column == 'Volume':
+            continue
+        values = table[column.lower()]
+        # Warm-up NaNs become nulls
+        assert values.null_count == df[column].isna().sum()
+        np.testing.assert_allclose(values.to_numpy(zero_copy_only=False), df[column], rtol=1e-6, equal_nan=True)
+
+def test_series_reads_the_store_and_downsamples(tmp_path):
+    df = make_bars(400)
+    BarStore(str(tmp_path)).merge("2330", df, "2024-01-01", "2025-07-31")
+    chart = ChartData(str(tmp_path))
+    full = chart.series("2330")
+    assert len(full) == 400
+    for method in ChartData.METHODS:
+        out = chart.series("2330", "2024-06-01", None, points=50, method=method)
+        assert len(out) == 50
+        assert out.index[0] == full.loc["2024-06-01":].index[0]
+    assert chart.series("9999") is None
+    with pytest.raises(ValueError):
+        chart.series("2330", method="mean")
+
+def test_chart_endpoint_falls_back_to_default_params(tmp_path, monkeypatch):
+    pytest.importorskip("uvicorn")
+    from fastapi.testclient import TestClient
+    import server
+
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    BarStore(str(tmp_path)).merge("2330", make_bars(100), "2024-01-01", "2024-05-17")
+    monkeypatch.setattr(server, "chart_data", ChartData(str(tmp_path)))
+    monkeypatch.setattr(server, "config_cache", ConfigCache({"stock_list": unavailable, "strategy": unavailable}))
+    response = TestClient(server.app).get("/api/chart/2330", params={'points': 20})
+    assert response.status_code == 200
+    expected = ChartData(str(tmp_path)).series("2330", points=20)
+    assert response.json()['ma_short'] == ChartData.to_columns(expected, "2330", "1d")['ma_short']
@@ -0,0 +1,60 @@
+"""
+Tests for the offline Shioaji stand-in.
+
+Run with: python -m pytest test_fake_shioaji.py
+"""
+import pandas as pd
+
+from config import Config
+from data_fetcher import DataFetcher
+from fake_shioaji import FakeShioaji
+from rate_limiter import TokenBucket
+
+def test_synthetic_bars_do_not_depend_on_the_range():
+    api = FakeShioaji(seed=7)
+    contract = api.Contracts.Stocks["2330"]
+    whole = api.kbars(contract, "2025-03-03", "2025-03-14")
+    part = api.kbars(contract, "2025-03-10", "2025-03-10")
+    assert len(whole['ts']) == 10 * FakeShioaji.MINUTES_PER_DAY
+    start = whole['ts'].index(part['ts'][0])
+    for name in ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']:
+        assert whole[name][start:start + len(part[name])] == part[name]
+    assert all(low <= min(o, c) and high >= max(o, c) for o, high, low, c in
+               zip(whole['Open'], whole['High'], whole['Low'], whole['Close']))
+    assert FakeShioaji(seed=8).kbars(contract, "2025-03-10", "2025-03-10")['Close'] != part['Close']
+
+def test_fetcher_recovers_from_throttling_and_replays_recordings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "STORE_INTRADAY_BARS", True)
+    # Enough retries for the backoff to outlast the fake's 1s window
+    monkeypatch.setattr(Config, "FETCH_MAX_RETRIES", 8)
+    api = FakeShioaji(quota_requests=3, quota_period=1)
+    # A limiter looser than the fake's quota, so some requests get rejected
+    fetcher = DataFetcher(TokenBucket(50, 1, min_rate_ratio=0.02), api=api)
+    codes = ["1101", "1102", "1103", "1104", "1105"]
+    # Use up the quota first, so the first fetch is throttled even on a slow machine
+    for _ in range(3):
+        api.kbars(api.Contracts.Stocks["1101"], "2025-03-03", "2025-03-03")
+    frames = {code: fetcher.fetch_daily_k(code, "2025-03-03", "2025-03-14") for code in codes}
+    assert api.throttled_count > 0
+    assert all(len(df) == 10 for df in frames.values())
+
+    # A second fake replays the 1-minute bars the first fetcher stored
+    recorded = FakeShioaji(data_dir=str(tmp_path / "data"))
+    assert recorded.Contracts.Stocks["9999"] is None
+    replay_dir = tmp_path / "replay"
+    replay_dir.mkdir()
+    monkeypatch.chdir(replay_dir)
+    replayed = DataFetcher(api=recorded, rate_limiter=TokenBucket(50, 1))
+    df = replayed.fetch_daily_k("1101", "2025-03-03", "2025-03-14")
+    pd.testing.assert_frame_equal(df, frames["1101"])
+
+def test_fetches_fill_the_gap_to_the_cached_range(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetcher = DataFetcher(TokenBucket(50, 1), api=FakeShioaji())
+    # Later, then earlier than the cached week, each leaving a week in between
+    fetcher.fetch_daily_k("2330", "2025-03-17", "2025-03-21")
+    assert len(fetcher.fetch_daily_k("2330", "2025-03-31", "2025-04-03")) == 4
+    assert len(fetcher.fetch_daily_k("2330", "2025-03-03", "2025-03-07")) == 5
+    assert fetcher._missing_ranges("2330", "2025-03-03", "2025-04-02") == []
+    assert len(fetcher.fetch_daily_k("2330", "2025-03-03", "2025-04-03")) == 24
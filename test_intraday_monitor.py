@@ -0,0 +1,85 @@
+"""
+Replay tests for the intraday monitor.
+
+Run with: python -m pytest test_intraday_monitor.py
+Recorded-style ticks are generated on top of random-walk daily bars and
+fed through TickReplaySource; every per-tick signal must match a full
+StrategyAnalyzer.analyze() over the history plus the forming bar.
+"""
+import numpy as np
+import pandas as pd
+
+from intraday_monitor import IntradayMonitor, TickReplaySource
+from strategy_analyzer import StrategyAnalyzer
+from test_tech_indicators import make_bars
+
+def make_ticks(codes, dates, per_day: int = 40, seed: int = 0, start_prices: dict = None) -> list:
+    """Interleaved ticks for `codes` over `dates`, each a random walk from the previous close."""
+    rng = np.random.default_rng(seed)
+    prices = dict(start_prices)
+    ticks = []
+    for date in dates:
+        session = pd.Timestamp(date) + pd.Timedelta(hours=9)
+        for i in range(per_day):
+            for code in codes:
+                prices[code] = round(prices[code] * (1 + rng.normal(0, 0.01)), 1)
+                ticks.append({'code': code, 'datetime': session + pd.Timedelta(seconds=30 * i),
+                              'close': prices[code], 'volume': int(rng.integers(1, 50))})
+    return ticks
+
+def reference_signal(history: pd.DataFrame, session_ticks: list, config: dict) -> str:
+    """Signal of analyze() over history + daily bars built from the ticks seen so far."""
+    ticks = pd.DataFrame(session_ticks)
+    ticks['Date'] = ticks['datetime'].dt.normalize()
+    bars = ticks.groupby('Date').agg(Open=('close', 'first'), High=('close', 'max'), Low=('close', 'min'),
+                                      Close=('close', 'last'), Volume=('volume', 'sum'))
+    df = pd.concat([history, bars])
+    return StrategyAnalyzer.analyze(df, config)['Signal'].iloc[-1]
+
+def test_replay_matches_full_analysis(tmp_path):
+    codes = ['1101', '2330', '2454']
+    config = {'KD_THRESHOLD': 80}
+    histories = {code: make_bars(200, seed=i) for i, code in enumerate(codes)}
+    session_dates = pd.bdate_range(histories[codes[0]].index[-1] + pd.Timedelta(days=1), periods=2)
+    ticks = make_ticks(codes, session_dates, start_prices={code: df['Close'].iloc[-1] for code, df in histories.items()})
+
+    monitor = IntradayMonitor(config, state_dir=str(tmp_path))
+    for code, df in histories.items():
+        monitor.prime(code, df, session_dates[0].strftime("%Y-%m-%d"))
+
+    expected_events = []
+    previous = {code: StrategyAnalyzer.analyze(df, config)['Signal'].iloc[-1] for code, df in histories.items()}
+    assert monitor.signals == previous
+    seen = {code: [] for code in codes}
+    for tick in ticks:
+        seen[tick['code']].append(tick)
+        expected = reference_signal(histories[tick['code']], seen[tick['code']], config)
+        event = monitor.on_tick(tick)
+        assert monitor.signals[tick['code']] == expected
+        if expected != previous[tick['code']]:
+            expected_events.append((tick['code'], tick['datetime'], expected))
+            assert event is not None and event['Previous'] == previous[tick['code']]
+        else:
+            assert event is None
+        previous[tick['code']] = expected
+
+    assert expected_events, "the random walk should change some signals"
+    assert monitor.stats()['ticks'] == len(ticks)
+
+def test_run_emits_only_changes(tmp_path):
+    codes = ['2330']
+    history = make_bars(120, seed=3)
+    session_dates = pd.bdate_range(history.index[-1] + pd.Timedelta(days=1), periods=1)
+    ticks = make_ticks(codes, session_dates, per_day=200, seed=4, start_prices={'2330': history['Close'].iloc[-1]})
+
+    received = []
+    monitor = IntradayMonitor(on_change=received.append, state_dir=str(tmp_path))
+    monitor.prime('2330', history, session_dates[0].strftime("%Y-%m-%d"))
+    baseline = monitor.signals['2330']
+    events = monitor.run(TickReplaySource(ticks))
+
+    assert events == received
+    signals = [baseline] + [event['Signal'] for event in events]
+    assert all(a != b for a, b in zip(signals, signals[1:]))
+    # Ticks for stocks that were not primed are ignored
+    assert monitor.on_tick({'code': '9999', 'datetime': ticks[-1]['datetime'], 'close': 1.0}) is None
@@ -0,0 +1,60 @@
+"""
+Tests for the MarketScanner fetch -> analysis pipeline.
+
+Run with: python -m pytest test_market_scanner.py
+Fetching is replaced by random-walk bars, so no market data source is used.
+"""
+import threading
+
+from config import Config
+from market_scanner import MarketScanner
+from test_tech_indicators import make_bars
+
+def scanner(monkeypatch, tmp_path, codes, fetch, **kwargs) -> MarketScanner:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "MARKET_DATA_SOURCE", "fake")
+    monkeypatch.setattr(Config, "SCAN_ANALYSIS_MODE", "full")
+    instance = MarketScanner(stock_list=codes, **kwargs)
+    instance._fetch = fetch
+    return instance
+
+def test_rows_stream_to_sink_before_the_scan_ends(monkeypatch, tmp_path):
+    codes = ["1101", "1102", "1103", "9999"]
+    streamed = threading.Event()
+    rows = []
+
+    def fetch(code):
+        if code == "9999":
+            # The last stock arrives only after the others reached the sink (or 10s passed)
+            assert streamed.wait(10), "no row was streamed while the scan was running"
+        return code, code, make_bars(seed=int(code))
+
+    def sink(row):
+        rows.append(row['Stock'])
+        if len(rows) == 3:
+            streamed.set()
+
+    df = scanner(monkeypatch, tmp_path, codes, fetch, analysis_workers=1, queue_size=32).run_scan(sink)
+    assert sorted(rows[:3]) == codes[:3]
+    assert sorted(df['Stock']) == codes
+
+def test_failing_sink_does_not_hang_on_blocked_fetch_workers(monkeypatch, tmp_path):
+    codes = [str(1101 + i) for i in range(20)]
+    instance = scanner(monkeypatch, tmp_path, codes, lambda code: (code, code, make_bars(days=80)),
+                       max_workers=4, analysis_workers=0, queue_size=1)
+
+    def sink(row):
+        raise RuntimeError("sink failed")
+
+    outcome = []
+    def run():
+        try:
+            instance.run_scan(sink)
+        except RuntimeError as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "run_scan hung after the sink raised"
+    assert str(outcome[0]) == "sink failed"
@@ -0,0 +1,53 @@
+"""
+Tests for the run metrics registry.
+
+Run with: python -m pytest test_metrics.py
+"""
+import json
+
+import pytest
+
+from metrics import Metrics
+
+def test_spans_counters_and_report(tmp_path):
+    m = Metrics()
+    with m.span("fetch", symbol="2330"):
+        pass
+    m.observe("analyze", 0.5, symbol="2330")
+    m.observe("analyze", 0.25, symbol="2317")
+    with pytest.raises(ValueError):
+        with m.span("fetch", symbol="2317"):
+            raise ValueError("boom")
+    m.inc("shioaji_requests", endpoint="kbars")
+    m.inc("shioaji_requests", 2, endpoint="kbars")
+
+    report = json.load(open(m.save_report(str(tmp_path / "reports"), status="ok"), encoding='utf-8'))
+    stages = {(s['name'], tuple(s['labels'].items())): s for s in report['stages']}
+    assert stages[("analyze", ())]['count'] == 2
+    assert stages[("analyze", ())]['seconds'] == 0.75
+    assert stages[("fetch", ())]['count'] == 1
+    assert stages[("fetch", (("error", "true"),))]['count'] == 1
+    assert report['counters'] == [{'name': 'shioaji_requests', 'labels': {'endpoint': 'kbars'}, 'value': 3}]
+    assert report['slowest_symbols'][0]['symbol'] == "2330"
+    assert set(report['symbols']) == {"2330", "2317"}
+
+def test_prometheus_families_are_contiguous():
+    m = Metrics()
+    m.observe("http_request", 0.1, route="/api/config")
+    m.observe("http_request", 0.3, route='/a"b')
+    m.inc("http_responses", route="/api/config", status=200)
+    text = m.prometheus()
+
+    assert 'stock_assistant_http_request_seconds_count{route="/api/config"} 1' in text
+    assert 'stock_assistant_http_request_seconds_max{route="/a\\"b"} 0.300000' in text
+    assert 'stock_assistant_http_responses_total{route="/api/config",status="200"} 1' in text
+    # No symbol label, and every family's samples follow its TYPE line without interruption
+    assert "symbol" not in text
+    families = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(families) == len(set(families))
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE"):
+            current = line.split()[2]
+        else:
+            assert line.split('{')[0].split()[0].startswith(current)
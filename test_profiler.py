@@ -0,0 +1,41 @@
+"""
+Tests for the sampling profiler.
+
+Run with: python -m pytest test_profiler.py
+"""
+import json
+import time
+
+import numpy as np
+
+from metrics import metrics
+from profiler import SamplingProfiler
+import indicator_kernels
+
+def busy(seconds, work=lambda: np.sqrt(np.arange(1000.0)).sum()):
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        work()
+
+def test_samples_are_attributed_to_stages_and_saved(tmp_path):
+    with SamplingProfiler(interval=0.002) as profiler:
+        with metrics.span("save_results"):
+            busy(0.2)
+        with metrics.span("line_push"):
+            busy(0.1)
+            # Frames of indicator modules map to "indicators" whatever the open span
+            close = np.random.default_rng(0).random((2000, 4))
+            busy(0.1, lambda: indicator_kernels.rsi(close))
+
+    summary = profiler.summary(top=100)
+    assert summary['stages']['persistence']['samples'] > summary['stages']['notify']['samples'] > 0
+    assert summary['stages']['indicators']['samples'] > 0
+    assert any(item['function'].startswith("busy (test_profiler.py:") for item in summary['top_total'])
+
+    folded, report = profiler.save(str(tmp_path))
+    again, _ = profiler.save(str(tmp_path))
+    assert folded != again
+    lines = open(folded, encoding='utf-8').read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert {line.split(";")[0] for line in lines} == {"persistence", "notify", "indicators"}
+    assert json.load(open(report, encoding='utf-8'))['samples'] == sum(int(line.rsplit(" ", 1)[1]) for line in lines)
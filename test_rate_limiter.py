@@ -0,0 +1,101 @@
+"""
+Tests for the shared TokenBucket and DataFetcher's throttle retries.
+
+Run with: python -m pytest test_rate_limiter.py
+The bucket runs on a fake clock, so nothing actually sleeps.
+"""
+import pytest
+
+from config import Config
+from data_fetcher import DataFetcher
+from rate_limiter import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FlakyApi:
+    """api.kbars that fails with `errors` (in order) before returning bars."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def kbars(self, contract, start, end):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'ts': [], 'Open': [], 'High': [], 'Low': [], 'Close': [], 'Volume': []}
+
+def bucket(capacity=5, period=1.0, **kwargs):
+    clock = FakeClock()
+    return TokenBucket(capacity, period, clock=clock, sleep=clock.sleep, **kwargs), clock
+
+def test_bursts_up_to_capacity_then_waits_for_the_refill():
+    limiter, clock = bucket()
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.2)]
+
+    # An idle bucket refills to its capacity, not beyond
+    clock.now += 60
+    for _ in range(5):
+        limiter.acquire()
+    assert len(clock.sleeps) == 1
+    limiter.acquire()
+    assert clock.sleeps[1] == pytest.approx(0.2)
+
+def test_throttling_halves_the_rate_and_successes_restore_it():
+    limiter, clock = bucket(min_rate_ratio=0.1)
+    limiter.throttled()
+    assert (limiter.rate, limiter.tokens) == (2.5, 0.0)
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.4)]
+
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.rate == pytest.approx(0.5)
+
+    # Additive increase of nominal_rate / capacity per success, capped at nominal
+    limiter.succeeded()
+    assert limiter.rate == pytest.approx(1.5)
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.rate == 5.0
+
+def test_request_kbars_retries_throttled_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    api = FlakyApi(Exception("429 Too Many Requests"), Exception("Rate limit exceeded"))
+    limiter, clock = bucket()
+    fetcher = DataFetcher(limiter, api=api)
+
+    assert fetcher._request_kbars(None, "2025-03-03", "2025-03-07")['ts'] == []
+    assert api.calls == 3
+    # Each throttle drains the bucket at the halved rate: 1 / 2.5, then 1 / 1.25
+    assert clock.sleeps == [pytest.approx(0.4), pytest.approx(0.8)]
+    assert limiter.rate == pytest.approx(1.25 + 1)
+
+def test_request_kbars_gives_up_after_the_retries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "FETCH_MAX_RETRIES", 2)
+    api = FlakyApi(*[Exception("429 Too Many Requests")] * 5)
+    fetcher = DataFetcher(bucket()[0], api=api)
+    with pytest.raises(Exception, match="429"):
+        fetcher._request_kbars(None, "2025-03-03", "2025-03-07")
+    assert api.calls == 3
+
+    # Other errors are not retried
+    api = FlakyApi(ValueError("Contract not found"))
+    fetcher = DataFetcher(bucket()[0], api=api)
+    with pytest.raises(ValueError):
+        fetcher._request_kbars(None, "2025-03-03", "2025-03-07")
+    assert api.calls == 1
@@ -0,0 +1,126 @@
+"""
+Tests for SheetManager's diff-based worksheet writes (no Google API calls).
+
+Run with: python -m pytest test_sheet_manager.py
+"""
+import itertools
+
+import pandas as pd
+import pytest
+
+gspread = pytest.importorskip("gspread")
+from gspread.utils import a1_to_rowcol
+
+from config import Config
+from sheet_manager import SheetManager
+
+spreadsheet_ids = itertools.count()
+
+class FakeWorksheet:
+    def __init__(self, title, values=None):
+        self.title = title
+        self.values = [list(row) for row in values or []]
+        self.calls = []
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return [[SheetManager._cell(v) for v in row] for row in self.values]
+
+    def get_all_records(self):
+        self.calls.append("get_all_records")
+        header, *rows = [[SheetManager._cell(v) for v in row] for row in self.values]
+        return [dict(zip(header, row)) for row in rows if any(row)]
+
+    def batch_update(self, data):
+        self.calls.append(("batch_update", [item['range'] for item in data]))
+        for item in data:
+            first, last = item['range'].split(":")
+            (r0, c0), (r1, c1) = a1_to_rowcol(first), a1_to_rowcol(last)
+            assert (r1 - r0 + 1, c1 - c0 + 1) == (len(item['values']), len(item['values'][0]))
+            for r, row in enumerate(item['values'], r0 - 1):
+                while len(self.values) <= r:
+                    self.values.append([])
+                for c, value in enumerate(row, c0 - 1):
+                    self.values[r] += [""] * (c + 1 - len(self.values[r]))
+                    self.values[r][c] = value
+
+    def freeze(self, rows):
+        self.calls.append("freeze")
+
+class FakeSpreadsheet:
+    def __init__(self, *worksheets):
+        self.id = f"sheet-{next(spreadsheet_ids)}"
+        self.worksheets = {ws.title: ws for ws in worksheets}
+
+    def worksheet(self, title):
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.worksheets[title] = FakeWorksheet(title)
+        return self.worksheets[title]
+
+def manager(*worksheets):
+    sm = SheetManager.__new__(SheetManager)
+    sm.sh = FakeSpreadsheet(*worksheets)
+    sm.worksheets = {}
+    sm.snapshots = {}
+    return sm
+
+def test_changed_ranges_merge_rows_and_blank_removed_cells():
+    old = [["Stock", "Signal"], ["2330", "🟢"], ["2317", "🟡"], ["1101", "🔴"]]
+    new = [["Stock", "Signal"], ["2330", "🔴"], ["2317", "🟢"]]
+    assert SheetManager._changed_ranges(old, new) == [
+        {'range': "B2:B3", 'values': [["🔴"], ["🟢"]]},
+        {'range': "A4:B4", 'values': [["", ""]]},
+    ]
+    assert SheetManager._changed_ranges(new, new) == []
+
+def test_daily_report_writes_only_changes_and_formats_on_row_count_change():
+    sm = manager()
+    df = pd.DataFrame({'Stock': ["2330", "2317"], 'Close': [1010.0, 210.5], 'Signal': ["🟢", "🟡"]})
+    sm.update_daily_report(df)
+    ws = sm.sh.worksheet("Daily Report")
+    assert ws.calls == [("batch_update", ["A1:C3"]), "freeze"]
+    assert ws.values[1] == ["2330", 1010.0, "🟢"]
+
+    ws.calls.clear()
+    df.loc[1, 'Signal'] = "🔴"
+    sm.update_daily_report(df)
+    assert ws.calls == [("batch_update", ["C3:C3"])]
+
+    ws.calls.clear()
+    sm.update_daily_report(df.iloc[:1])
+    assert ws.calls == [("batch_update", ["A3:C3"]), "freeze"]
+    assert ws.values[2] == ["", "", ""]
+
+def test_first_write_diffs_against_the_current_sheet():
+    ws = FakeWorksheet("Stock List", [["Stock", "Name", "Enabled", "Memo"], ["2330", "台積電", "TRUE", ""]])
+    sm = manager(ws)
+    sm.save_stock_list([{'Stock': "2330", 'Name': "台積電", 'Enabled': "TRUE"},
+                        {'Stock': "2317", 'Name': "鴻海", 'Enabled': "FALSE", 'Memo': None}])
+    assert ws.calls == ["get_all_values", ("batch_update", ["A3:C3"])]
+    assert ws.values[2] == ["2317", "鴻海", "FALSE"]
+
+def test_reads_are_cached_until_we_write_or_the_ttl_passes(monkeypatch):
+    ws = FakeWorksheet("Strategy Config", [["Parameter", "Value", "Description"],
+                                           ["MA_SHORT_DAYS", 10, "short"], ["RSI_THRESHOLD", 80, ""]])
+    sm = manager(ws)
+    # The missing RSI description is written back once
+    assert sm.fetch_strategy_config() == {'MA_SHORT_DAYS': 10, 'RSI_THRESHOLD': 80}
+    assert ws.calls == ["get_all_records", "get_all_values", ("batch_update", ["C3:C3"])]
+
+    ws.calls.clear()
+    # Another manager of the process shares the records; the write forced one reload
+    other = manager()
+    other.sh = sm.sh
+    for _ in range(3):
+        assert other.fetch_strategy_config_full()[1]['Description']
+        assert sm.fetch_strategy_config()['RSI_THRESHOLD'] == 80
+    assert ws.calls == ["get_all_records"]
+
+    ws.calls.clear()
+    monkeypatch.setattr(Config, "SHEET_CACHE_TTL", 0)
+    sm.fetch_strategy_config()
+    assert ws.calls == ["get_all_records"]
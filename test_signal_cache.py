@@ -0,0 +1,99 @@
+"""
+Tests for the latest-signal cache behind /api/signals/latest.
+
+Run with: python -m pytest test_signal_cache.py
+"""
+import asyncio
+
+import pytest
+
+from signal_cache import LatestSignalCache
+
+def make_rows():
+    # Ties on Close and Signal, and a missing Close
+    closes = [50.0, 20.0, 50.0, None, 20.0, 35.5, 50.0]
+    signals = ['🟢', '🔴', '🟡', '🟢', '🟢', '🔴', '🟡']
+    return [{'Stock': str(1101 + i), 'Close': close, 'Signal': signal}
+            for i, (close, signal) in enumerate(zip(closes, signals))]
+
+def pages(cache, **kwargs):
+    """Follows next_cursor through all pages; returns the stock codes in order."""
+    codes, cursor = [], None
+    while True:
+        page = asyncio.run(cache.page(cursor=cursor, **kwargs))
+        codes += [row['Stock'] for row in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return codes
+
+def expected(rows, sort, order='asc', signal=None):
+    rows = [row for row in rows if signal is None or row['Signal'] == signal]
+    ordered = sorted(rows, key=lambda row: LatestSignalCache.sort_key(row, sort))
+    return [row['Stock'] for row in (ordered[::-1] if order == 'desc' else ordered)]
+
+@pytest.mark.parametrize("sort", ['Stock', 'Close', 'Signal'])
+@pytest.mark.parametrize("order", ['asc', 'desc'])
+@pytest.mark.parametrize("limit", [1, 2, 3, 50])
+def test_cursor_pages_cover_every_row_once(sort, order, limit):
+    rows = make_rows()
+    cache = LatestSignalCache(lambda: rows)
+    assert pages(cache, sort=sort, order=order, limit=limit) == expected(rows, sort, order)
+
+def test_ties_sort_by_stock_and_missing_values_last():
+    cache = LatestSignalCache(make_rows)
+    assert pages(cache, sort='Close', limit=2) == ['1102', '1105', '1106', '1101', '1103', '1107', '1104']
+    assert pages(cache, sort='Close', order='desc', limit=2)[0] == '1104'
+
+@pytest.mark.parametrize("signal", ['green', 'red', 'yellow', '🟢'])
+def test_signal_filter(signal):
+    rows = make_rows()
+    cache = LatestSignalCache(lambda: rows)
+    emoji = LatestSignalCache.SIGNALS.get(signal, signal)
+    page = asyncio.run(cache.page(signal=signal, sort='Close', limit=1))
+    assert page['total'] == sum(row['Signal'] == emoji for row in rows)
+    assert pages(cache, signal=signal, sort='Close', order='desc', limit=1) == \
+        expected(rows, 'Close', 'desc', emoji)
+
+@pytest.mark.parametrize("kwargs", [
+    {'cursor': "not a cursor"},
+    {'cursor': LatestSignalCache.encode_cursor((False, 50.0, '1101')), 'sort': 'Signal'},
+    {'sort': 'Volume'},
+    {'order': 'up'},
+    {'signal': 'blue'},
+])
+def test_invalid_arguments_raise_value_error(kwargs):
+    cache = LatestSignalCache(make_rows)
+    with pytest.raises(ValueError):
+        asyncio.run(cache.page(**kwargs))
+
+def test_failed_reload_keeps_the_previous_rows():
+    results = [make_rows()]
+    def fetch():
+        if not results:
+            raise ConnectionError("database unavailable")
+        return results.pop(0)
+
+    cache = LatestSignalCache(fetch, ttl=0)
+    assert asyncio.run(cache.page())['total'] == 7
+    # The TTL reload fails: the cached rows are served, refresh() reports the error
+    assert asyncio.run(cache.page())['total'] == 7
+    with pytest.raises(ConnectionError):
+        asyncio.run(cache.refresh())
+    assert len(cache.rows) == 7
+
+    # Nothing cached yet: the error reaches the caller
+    with pytest.raises(ConnectionError):
+        asyncio.run(LatestSignalCache(fetch).page())
+
+def test_invalid_cursor_is_a_bad_request(monkeypatch):
+    pytest.importorskip("uvicorn")
+    from fastapi.testclient import TestClient
+    import server
+
+    monkeypatch.setattr(server, "signal_cache", LatestSignalCache(make_rows))
+    client = TestClient(server.app)
+    assert client.get("/api/signals/latest", params={'cursor': "not a cursor"}).status_code == 400
+    page = client.get("/api/signals/latest", params={'sort': 'Close', 'limit': 3}).json()
+    assert [row['Stock'] for row in page['items']] == ['1102', '1105', '1106']
+    following = client.get("/api/signals/latest", params={'sort': 'Close', 'limit': 3, 'cursor': page['next_cursor']})
+    assert [row['Stock'] for row in following.json()['items']] == ['1101', '1103', '1107']
@@ -0,0 +1,117 @@
+"""
+Tests for the chunked analysis_results upserts of SupabaseManager and
+AsyncSupabaseManager, against fake clients (no Supabase project needed).
+
+Run with: python -m pytest test_supabase_manager.py
+"""
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+
+supabase = pytest.importorskip("supabase")
+if not hasattr(supabase, "create_client"):
+    # Without the package, supabase/ (the migrations) imports as an empty namespace
+    pytest.skip("supabase is not installed", allow_module_level=True)
+import async_supabase_manager
+import supabase_manager
+from async_supabase_manager import AsyncSupabaseManager
+from config import Config
+from supabase_manager import SupabaseManager
+
+def make_results() -> pd.DataFrame:
+    codes = ["1101", "1102", "1103", "1104", "1105", "1106", "1107"]
+    df = pd.DataFrame({
+        'Stock': codes, 'Name': [f"name {code}" for code in codes], 'Date': "2026-10-16",
+        'Close': ["1,010.5", "20", "30", "40", "50", "60", "70"], 'Signal': "🟡",
+        'K': [25.0, np.nan, 30.0, 40.0, 50.0, 60.0, 70.0], 'Volume': 1000,
+    })
+    # A re-run row for 1101: the later one is kept
+    rerun = df.iloc[[0]].assign(Signal="🟢")
+    return pd.concat([df, rerun], ignore_index=True)
+
+class Outcomes:
+    """Fails upserts of a chunk (by its first stock) a set number of times."""
+    def __init__(self, failures: dict):
+        self.failures = dict(failures)
+        self.chunks = []
+
+    def upsert(self, chunk: list):
+        first = chunk[0]['stock_code']
+        if self.failures.get(first, 0) > 0:
+            self.failures[first] -= 1
+            raise ConnectionError(f"chunk {first} failed")
+        self.chunks.append([row['stock_code'] for row in chunk])
+
+class FakeClient:
+    def __init__(self, outcomes: Outcomes):
+        self.outcomes = outcomes
+
+    def table(self, name):
+        assert name == 'analysis_results'
+        return self
+
+    def upsert(self, chunk, on_conflict):
+        assert on_conflict == 'date,stock_code'
+        self.chunk = chunk
+        return self
+
+    def execute(self):
+        self.outcomes.upsert(self.chunk)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    monkeypatch.setattr(Config, "SUPABASE_MAX_RETRIES", 2)
+    delays = []
+    async def async_sleep(seconds):
+        delays.append(seconds)
+    monkeypatch.setattr(supabase_manager.time, "sleep", delays.append)
+    monkeypatch.setattr(async_supabase_manager.asyncio, "sleep", async_sleep)
+    return delays
+
+def check_report(report, outcomes, sleeps):
+    assert report['rows'] == 7
+    assert report['chunks'] == 3
+    # The second chunk succeeds on its retry; the last one fails for good
+    assert sorted(outcomes.chunks) == [["1101", "1102", "1103"], ["1104", "1105", "1106"]]
+    assert (report['written'], report['failed_chunks'], report['retries']) == (6, 1, 3)
+    assert sorted(sleeps) == [0.5, 0.5, 1.0]
+
+def test_analysis_records():
+    records = SupabaseManager._analysis_records(make_results())
+    assert [record['stock_code'] for record in records] == ["1101", "1102", "1103", "1104", "1105", "1106", "1107"]
+    first = records[0]
+    assert (first['date'], first['signal'], first['price']) == ("2026-10-16", "🟢", 1010.5)
+    assert (first['name'], first['k'], first['rsi']) == ("name 1101", 25.0, None)
+    assert first['indicators'] == {'Volume': 1000}
+    assert records[1]['k'] is None
+    json.dumps(records, allow_nan=False)
+
+def test_save_analysis_result_chunks_and_retries(sleeps):
+    manager = SupabaseManager.__new__(SupabaseManager)
+    outcomes = Outcomes({"1104": 1, "1107": 5})
+    manager.client = FakeClient(outcomes)
+    check_report(manager.save_analysis_result(make_results(), batch_size=3), outcomes, sleeps)
+
+def test_async_save_analysis_result_chunks_and_retries(sleeps, monkeypatch):
+    monkeypatch.setattr(Config, "SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setattr(Config, "SUPABASE_KEY", "key")
+    outcomes = Outcomes({"1104": 1, "1107": 5})
+
+    def handler(request):
+        assert request.url.path == "/rest/v1/analysis_results"
+        assert request.url.params['on_conflict'] == 'date,stock_code'
+        try:
+            outcomes.upsert(json.loads(request.content))
+        except ConnectionError:
+            return httpx.Response(503)
+        return httpx.Response(201)
+
+    async def save():
+        async with AsyncSupabaseManager(transport=httpx.MockTransport(handler)) as manager:
+            return await manager.save_analysis_result(make_results(), batch_size=3)
+
+    check_report(asyncio.run(save()), outcomes, sleeps)
@@ -0,0 +1,209 @@
+"""
+Parity tests for the built-in indicator kernels.
+
+Run with: python -m pytest test_tech_indicators.py
+The kernels mirror pandas_ta 0.4.71b0 (Python >= 3.12, pinned in
+requirements.txt and run in CI); those comparisons are skipped when it is
+not installed. The kernel-vs-pandas and batch-vs-stream checks always run.
+"""
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicator_kernels as kernels
+from indicator_state import IndicatorState, IndicatorStateStore
+from strategy_analyzer import StrategyAnalyzer
+from tech_indicators import TechIndicators
+
+COLUMNS = ['MA_SHORT', 'MA_LONG', 'MA60', 'MACD_DIF', 'MACD_DEM', 'MACD_OSC', 'RSI', 'K', 'D']
+
+def make_bars(days: int = 300, seed: int = 0, flat_from: int = None) -> pd.DataFrame:
+    """Random-walk daily bars rounded to a 0.1 tick, optionally with a flat stretch."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, days))), 1)
+    high = close + np.round(rng.uniform(0.1, 2, days), 1)
+    low = close - np.round(rng.uniform(0.1, 2, days), 1)
+    if flat_from is not None:
+        close[flat_from:flat_from + 5] = close[flat_from]
+    return pd.DataFrame({
+        'Open': close, 'High': high, 'Low': low, 'Close': close,
+        'Volume': rng.integers(100, 10000, days)
+    }, index=pd.date_range('2024-01-01', periods=days, freq='B', name='Date'))
+
+def assert_identical(actual, expected, name: str = ""):
+    actual = np.asarray(actual, dtype='float64')
+    expected = np.asarray(expected, dtype='float64')
+    assert np.array_equal(actual, expected, equal_nan=True), f"{name} differs"
+
+def assert_matches_pandas_ta(actual, expected, name: str = ""):
+    """Same NaNs; ema/macd/rsi bit-identical, sma-based columns within rounding (BLAS sums in pandas_ta)."""
+    actual = np.asarray(actual, dtype='float64')
+    expected = np.asarray(expected, dtype='float64')
+    if name.startswith(('MACD', 'RSI')):
+        assert_identical(actual, expected, name)
+    else:
+        assert np.allclose(actual, expected, rtol=1e-12, atol=1e-12, equal_nan=True), f"{name} differs"
+
+def pandas_ta_calculate(df: pd.DataFrame, ma_short=10, ma_long=20, rsi_len=14, kd_k=9, kd_d=3,
+                        macd_fast=12, macd_slow=26, macd_signal=9) -> pd.DataFrame:
+    """The original pandas_ta implementation of TechIndicators.calculate()."""
+    ta = pytest.importorskip("pandas_ta")
+    if ta.version != "0.4.71b0":
+        pytest.skip(f"kernels mirror pandas_ta 0.4.71b0, not {ta.version}")
+    df = df.copy()
+    # pandas_ta returns None for series too short for an indicator
+    df['MA_SHORT'] = ta.sma(df['Close'], length=ma_short)
+    df['MA_LONG'] = ta.sma(df['Close'], length=ma_long)
+    df['MA60'] = ta.sma(df['Close'], length=60)
+    macd = ta.macd(df['Close'], fast=macd_fast, slow=macd_slow, signal=macd_signal)
+    suffix = f'{macd_fast}_{macd_slow}_{macd_signal}'
+    df['MACD_DIF'] = macd[f'MACD_{suffix}'] if macd is not None else np.nan
+    df['MACD_DEM'] = macd[f'MACDs_{suffix}'] if macd is not None else np.nan
+    df['MACD_OSC'] = macd[f'MACDh_{suffix}'] if macd is not None else np.nan
+    df['RSI'] = ta.rsi(df['Close'], length=rsi_len)
+    stoch = ta.stoch(df['High'], df['Low'], df['Close'], k=kd_k, d=kd_d)
+    df['K'] = stoch.iloc[:, 0] if stoch is not None else np.nan
+    df['D'] = stoch.iloc[:, 1] if stoch is not None else np.nan
+    return df.astype({column: 'float64' for column in COLUMNS})
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("params", [
+    {},
+    {'ma_short': 5, 'ma_long': 60, 'macd_fast': 8, 'macd_slow': 21, 'macd_signal': 5},
+])
+def test_calculate_matches_pandas_ta(seed, params):
+    df = make_bars(seed=seed, flat_from=100)
+    expected = pandas_ta_calculate(df, **params)
+    actual = TechIndicators.calculate(df.copy(), **params)
+    for column in COLUMNS:
+        assert_matches_pandas_ta(actual[column], expected[column], column)
+
+def test_calculate_matches_pandas_ta_with_zero_range():
+    df = make_bars(seed=3)
+    df.iloc[40:50, df.columns.get_indexer(['High', 'Low', 'Close'])] = 88.0
+    expected = pandas_ta_calculate(df)
+    actual = TechIndicators.calculate(df.copy())
+    for column in ['K', 'D']:
+        assert_matches_pandas_ta(actual[column], expected[column], column)
+
+@pytest.mark.parametrize("days", [14, 15, 16, 33, 34, 61])
+def test_calculate_matches_pandas_ta_on_short_series(days):
+    # pandas_ta returns nothing for RSI < 15, KD < 15 and MACD < 34 bars
+    df = make_bars(days=days, seed=7)
+    expected = pandas_ta_calculate(df)
+    actual = TechIndicators.calculate(df.copy())
+    for column in COLUMNS:
+        if expected[column].isna().all():
+            assert actual[column].isna().all(), f"{column} differs"
+        else:
+            assert_matches_pandas_ta(actual[column], expected[column], column)
+
+@pytest.mark.parametrize("window", [1, 3, 10, 60])
+def test_rolling_mean_matches_pandas(window):
+    values = make_bars(seed=4)[['Close', 'High', 'Low']].to_numpy(copy=True)
+    values[::17, 1] = np.nan
+    values[50:80, 2] = -values[50:80, 2]
+    expected = pd.DataFrame(values).rolling(window).mean()
+    assert_identical(kernels.rolling_mean(values, window), expected)
+    assert_identical(kernels.rolling_mean(values[:, 1:2], window), expected[[1]])
+
+@pytest.mark.parametrize("adjust", [True, False])
+def test_ewm_mean_matches_pandas(adjust):
+    values = make_bars(seed=5)[['Close', 'High']].to_numpy(copy=True)
+    values[:7, 0] = np.nan
+    values[100:104, 1] = np.nan
+    expected = pd.DataFrame(values).ewm(com=6.5, adjust=adjust, min_periods=14).mean()
+    assert_identical(kernels.ewm_mean(values, 6.5, adjust, 14), expected)
+    assert_identical(kernels.ewm_mean(values[:, 1:2], 6.5, adjust, 14), expected[[1]])
+
+def test_panel_matches_per_stock():
+    frames = {code: make_bars(seed=seed) for seed, code in enumerate(['2330', '2317', '2454'])}
+    frames['2317'] = frames['2317'].iloc[40:]                     # listed later
+    frames['2454'] = frames['2454'].drop(frames['2454'].index[120])  # one suspended day
+    panel = {field: pd.DataFrame({code: df[field] for code, df in frames.items()})
+             for field in ['High', 'Low', 'Close']}
+
+    result = TechIndicators.calculate_panel(panel)
+    for code, df in frames.items():
+        expected = TechIndicators.calculate(df.copy())
+        for column in COLUMNS:
+            assert_identical(result[column][code].reindex(df.index), expected[column], f"{code} {column}")
+
+def test_incremental_state_matches_batch():
+    df = make_bars(seed=6, flat_from=150)
+    expected = TechIndicators.calculate(df.copy())
+
+    # Early bars: the batch result over the bars seen so far (short-series rule)
+    prefixes = {i: TechIndicators.calculate(df.iloc[:i + 1].copy()).iloc[-1] for i in range(40)}
+
+    state = IndicatorState()
+    for i, (date, bar) in enumerate(df.iterrows()):
+        if i == 200:
+            # Checkpoint round trip in the middle of the series
+            state = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+        peeked = state.update(str(date.date()), bar['High'], bar['Low'], bar['Close'], commit=False)
+        values = state.update(str(date.date()), bar['High'], bar['Low'], bar['Close'])
+        for column in COLUMNS:
+            assert_identical(peeked[column], values[column], f"peek {column}")
+            batch = prefixes[i][column] if i in prefixes else expected[column].iloc[i]
+            assert_identical(values[column], batch, f"{column} at {i}")
+
+def test_checkpoint_is_rebuilt_when_folded_history_changes(tmp_path, monkeypatch):
+    store = IndicatorStateStore(str(tmp_path))
+    df = make_bars(seed=8)
+    builds = []
+    original = IndicatorState.from_history.__func__
+    monkeypatch.setattr(IndicatorState, "from_history",
+                        classmethod(lambda cls, *args, **kw: builds.append(1) or original(cls, *args, **kw)))
+
+    store.advance("2330", df.iloc[:250])
+    store.advance("2330", df.iloc[:260])   # new bars only: reuses the checkpoint
+    assert len(builds) == 1
+
+    # A dividend adjustment rewrites the past: the checkpoint must not be reused
+    adjusted = df.copy()
+    adjusted.loc[adjusted.index[:255], ['Open', 'High', 'Low', 'Close']] *= 0.97
+    state = store.advance("2330", adjusted.iloc[:270])
+    assert len(builds) == 2
+    rebuilt = IndicatorState.from_history(adjusted.iloc[:270])
+    assert state.rsi.positive.weighted == rebuilt.rsi.positive.weighted
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("config", [{}, {'MA_SHORT_DAYS': 5, 'MA_LONG_DAYS': 60, 'KD_THRESHOLD': 80}])
+def test_analyze_latest_matches_full_history(seed, config):
+    df = make_bars(days=400, seed=seed)
+    full = StrategyAnalyzer.analyze(df.copy(), config).iloc[-1]
+    latest = StrategyAnalyzer.analyze_latest(df, config)
+    assert latest['Signal'] == full['Signal']
+    assert latest['Signal_Memo'] == full['Signal_Memo']
+    for column in ['MA_SHORT', 'MA_LONG', 'MA60', 'K', 'D']:
+        assert latest[column] == pytest.approx(full[column], rel=1e-12), column
+    # EMA/RSI only converge: the cut-off history weighs at most WARMUP_TOLERANCE
+    for column in ['MACD_DIF', 'MACD_DEM', 'MACD_OSC', 'RSI']:
+        assert latest[column] == pytest.approx(full[column], abs=full['Close'] * StrategyAnalyzer.WARMUP_TOLERANCE), column
+
+def test_analyze_latest_matches_full_history_where_macd_crosses_zero():
+    # KD_THRESHOLD 100 lets the MACD_OSC > 0 condition decide more green signals
+    config = {'KD_THRESHOLD': 100}
+    checked = 0
+    for seed in range(20):
+        df = make_bars(days=500, seed=seed)
+        full = StrategyAnalyzer.analyze(df.copy(), config)
+        osc = full['MACD_OSC'].to_numpy()
+        crossings = np.flatnonzero(np.sign(osc[1:]) != np.sign(osc[:-1])) + 1
+        for i in crossings[crossings > StrategyAnalyzer.warmup_bars(config)]:
+            latest = StrategyAnalyzer.analyze_latest(df.iloc[:i + 1], config)
+            assert np.sign(latest['MACD_OSC']) == np.sign(osc[i]), (seed, i)
+            assert latest['Signal'] == full['Signal'].iloc[i], (seed, i)
+            checked += 1
+    assert checked > 200
+
+def test_analyze_latest_short_history_is_exact():
+    df = make_bars(days=StrategyAnalyzer.warmup_bars() - 10, seed=7)
+    full = StrategyAnalyzer.analyze(df.copy())
+    latest = StrategyAnalyzer.analyze_latest(df)
+    for column in COLUMNS:
+        assert_identical(latest[column], full[column].iloc[-1], column)
+    assert_identical(latest['K_PREV'], full['K'].iloc[-2], 'K_PREV')
+    assert latest['Signal'] == full['Signal'].iloc[-1]